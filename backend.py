@@ -0,0 +1,705 @@
+"""
+The window system behind BorderX.
+
+Everything that talks to Win32 or psutil goes through a WindowBackend, so
+the rest of the code can run against `FakeBackend`, an in-memory desktop,
+when measuring or testing off Windows.
+"""
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Optional, Protocol
+
+from monitors import Monitor
+from procsnap import ProcessInfo
+from windowlist import WindowList
+
+GWL_STYLE = -16
+GWL_EXSTYLE = -20
+WS_CAPTION = 0x00C00000
+WS_THICKFRAME = 0x00040000
+WS_VISIBLE = 0x10000000
+WS_OVERLAPPEDWINDOW = 0x00CF0000
+WS_EX_TOOLWINDOW = 0x00000080
+DWMWA_CLOAKED = 14
+MONITORINFOF_PRIMARY = 1
+MDT_EFFECTIVE_DPI = 0
+WM_DPICHANGED = 0x02E0
+HWND_NOTOPMOST = -2
+SWP_FRAMECHANGED = 0x0020
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+
+class WindowBackend(Protocol):
+    def enum_windows(self) -> list[tuple[int, str]]:
+        """
+        Return (hwnd, title) for every visible top-level window.
+        """
+
+    def list_windows(self) -> WindowList:
+        """
+        Return hwnd, pid, title, class and rect of every visible, titled
+        top-level window that isn't a tool window or cloaked, in one pass.
+        """
+
+    def get_pid(self, hwnd: int) -> int: ...
+
+    def get_title(self, hwnd: int) -> str: ...
+
+    def get_class(self, hwnd: int) -> str: ...
+
+    def is_window(self, hwnd: int) -> bool: ...
+
+    def is_visible(self, hwnd: int) -> bool: ...
+
+    def is_cloaked(self, hwnd: int) -> bool:
+        """
+        True if DWM hides the window although it is visible, e.g. it is
+        on another virtual desktop.
+        """
+
+    def get_style(self, hwnd: int) -> int: ...
+
+    def set_style(self, hwnd: int, style: int) -> None: ...
+
+    def get_exstyle(self, hwnd: int) -> int: ...
+
+    def set_exstyle(self, hwnd: int, exstyle: int) -> None: ...
+
+    def set_position(self, hwnd: int, x: int, y: int, width: int, height: int) -> None:
+        """
+        Move and resize the window, applying any pending frame change.
+        """
+
+    def set_positions(self, moves: list[tuple[int, int, int, int, int]]) -> None:
+        """
+        Apply several (hwnd, x, y, width, height) moves as one batch, so
+        the windows repaint once.
+        """
+
+    def get_window_rect(self, hwnd: int) -> tuple[int, int, int, int]:
+        """
+        Return the window's (x, y, width, height).
+        """
+
+    def get_foreground(self) -> int:
+        """
+        Return the window the user is working in, or 0 if there is none.
+        """
+
+    def screen_size(self) -> tuple[int, int]: ...
+
+    def monitors(self) -> list[Monitor]: ...
+
+    def watch_display_changes(self, callback) -> None:
+        """
+        Call `callback()`, from any thread, whenever the monitor layout,
+        work areas or DPI change.
+        """
+
+    def icon_bits(self, path: str) -> Optional[tuple[bytes, Optional[bytes]]]:
+        """
+        Return the raw 16x16 icon of an executable as (BGRA bits, AND mask
+        bits or None), or None if it has no icon.
+        """
+
+    def icon_bits_many(self, paths: list[str]) -> list[Optional[tuple[bytes, Optional[bytes]]]]:
+        """
+        `icon_bits()` for each of `paths`, sharing whatever can be set up
+        once for the batch.
+        """
+
+    def file_stamp(self, path: str) -> Optional[tuple[int, int]]:
+        """
+        Return (size, mtime in ns) of a file, or None if it can't be read.
+        """
+
+    def list_processes(self) -> Iterable[tuple[int, float]]:
+        """
+        Return (pid, create_time) for every running process.
+        """
+
+    def describe_process(self, pid: int) -> Optional[ProcessInfo]:
+        """
+        Return the ProcessInfo for `pid`, or None if it has exited.
+        """
+
+    def process_started(self, pid: int) -> Optional[float]:
+        """
+        Return the start time of `pid` without the cost of a full
+        `describe_process()`, or None. It may differ from psutil's
+        create_time in the last digits.
+        """
+
+    def process_image(self, pid: int) -> Optional[str]:
+        """
+        Return the executable path of `pid` using only the limited access
+        elevated processes still grant, or None.
+        """
+
+
+class Win32Backend:
+    """
+    The real desktop, through pywin32, ctypes and psutil.
+    """
+
+    def __init__(self):
+        import win32api
+        import win32con
+        import win32gui
+        import win32process
+        self.win32api = win32api
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.win32process = win32process
+        self.processes = {}  # pid -> psutil.Process from the last list_processes()
+
+    def enum_windows(self):
+        windows = []
+        win32gui = self.win32gui
+
+        def found(hwnd, _):
+            if win32gui.IsWindowVisible(hwnd):
+                windows.append((hwnd, win32gui.GetWindowText(hwnd)))
+            return True
+
+        win32gui.EnumWindows(found, None)
+        return windows
+
+    def list_windows(self):
+        # Straight ctypes rather than win32gui: the cheap checks run first
+        # and only the windows that pass get their strings read
+        import ctypes
+        from ctypes.wintypes import DWORD, RECT
+        user32, dwmapi = _enum_api()
+        windows = WindowList()
+        title = ctypes.create_unicode_buffer(256)
+        window_class = ctypes.create_unicode_buffer(256)
+        pid = DWORD()
+        rect = RECT()
+        cloaked = DWORD()
+
+        def found(hwnd, _):
+            if not user32.IsWindowVisible(hwnd):
+                return True
+            if user32.GetWindowLongW(hwnd, GWL_EXSTYLE) & WS_EX_TOOLWINDOW:
+                return True
+            length = user32.GetWindowTextLengthW(hwnd)
+            if not length:
+                return True
+            if dwmapi is not None and dwmapi.DwmGetWindowAttribute(
+                    hwnd, DWMWA_CLOAKED, ctypes.byref(cloaked), ctypes.sizeof(cloaked)) == 0 and cloaked.value:
+                return True  # On another virtual desktop, or a suspended app
+            text = title if length < len(title) else ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, text, len(text))
+            user32.GetClassNameW(hwnd, window_class, len(window_class))
+            user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            user32.GetWindowRect(hwnd, ctypes.byref(rect))
+            windows.append(hwnd, pid.value, text.value, window_class.value,
+                           (rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top))
+            return True
+
+        user32.EnumWindows(_WNDENUMPROC()(found), 0)
+        return windows
+
+    def get_pid(self, hwnd):
+        _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_title(self, hwnd):
+        return self.win32gui.GetWindowText(hwnd)
+
+    def get_class(self, hwnd):
+        return self.win32gui.GetClassName(hwnd)
+
+    def is_window(self, hwnd):
+        return bool(self.win32gui.IsWindow(hwnd))
+
+    def is_visible(self, hwnd):
+        return bool(self.win32gui.IsWindowVisible(hwnd))
+
+    def is_cloaked(self, hwnd):
+        import ctypes
+        from ctypes.wintypes import DWORD
+        _, dwmapi = _enum_api()
+        if dwmapi is None:
+            return False
+        cloaked = DWORD()
+        if dwmapi.DwmGetWindowAttribute(hwnd, DWMWA_CLOAKED, ctypes.byref(cloaked), ctypes.sizeof(cloaked)):
+            return False
+        return bool(cloaked.value)
+
+    def get_style(self, hwnd):
+        return self.win32gui.GetWindowLong(hwnd, GWL_STYLE)
+
+    def set_style(self, hwnd, style):
+        self.win32gui.SetWindowLong(hwnd, GWL_STYLE, style)
+
+    def get_exstyle(self, hwnd):
+        return self.win32gui.GetWindowLong(hwnd, GWL_EXSTYLE)
+
+    def set_exstyle(self, hwnd, exstyle):
+        self.win32gui.SetWindowLong(hwnd, GWL_EXSTYLE, exstyle)
+
+    def set_position(self, hwnd, x, y, width, height):
+        self.win32gui.SetWindowPos(hwnd, self.win32con.HWND_NOTOPMOST, x, y, width, height,
+                                   self.win32con.SWP_FRAMECHANGED)
+
+    def set_positions(self, moves):
+        user32 = _defer_api()
+        hdwp = user32.BeginDeferWindowPos(len(moves))
+        for hwnd, x, y, width, height in moves:
+            if not hdwp:
+                break
+            hdwp = user32.DeferWindowPos(hdwp, hwnd, HWND_NOTOPMOST, x, y, width, height, SWP_FRAMECHANGED)
+        if not hdwp:
+            # A failed DeferWindowPos frees the whole batch, including the
+            # moves already deferred; make every move one by one
+            for move in moves:
+                self.set_position(*move)
+            return
+        user32.EndDeferWindowPos(hdwp)
+
+    def get_window_rect(self, hwnd):
+        left, top, right, bottom = self.win32gui.GetWindowRect(hwnd)
+        return left, top, right - left, bottom - top
+
+    def get_foreground(self):
+        return self.win32gui.GetForegroundWindow()
+
+    def screen_size(self):
+        return (self.win32api.GetSystemMetrics(self.win32con.SM_CXSCREEN),
+                self.win32api.GetSystemMetrics(self.win32con.SM_CYSCREEN))
+
+    def monitors(self):
+        monitors = []
+        for hmonitor, _, _ in self.win32api.EnumDisplayMonitors():
+            info = self.win32api.GetMonitorInfo(hmonitor)
+            left, top, right, bottom = info['Monitor']
+            work_left, work_top, work_right, work_bottom = info['Work']
+            monitors.append(Monitor(
+                0,
+                (left, top, right - left, bottom - top),
+                (work_left, work_top, work_right - work_left, work_bottom - work_top),
+                self._monitor_dpi(hmonitor),
+                bool(info['Flags'] & MONITORINFOF_PRIMARY),
+            ))
+        return monitors
+
+    def _monitor_dpi(self, hmonitor):
+        import ctypes
+        from ctypes.wintypes import UINT
+        dpi_x, dpi_y = UINT(), UINT()
+        try:
+            # Windows 8.1 and later
+            result = ctypes.windll.shcore.GetDpiForMonitor(
+                int(hmonitor), MDT_EFFECTIVE_DPI, ctypes.byref(dpi_x), ctypes.byref(dpi_y))
+        except (AttributeError, OSError):
+            return 96
+        return dpi_x.value if result == 0 else 96
+
+    def watch_display_changes(self, callback):
+        win32api, win32con, win32gui = self.win32api, self.win32con, self.win32gui
+
+        def wndproc(hwnd, msg, wparam, lparam):
+            if (msg in (win32con.WM_DISPLAYCHANGE, WM_DPICHANGED)
+                    or (msg == win32con.WM_SETTINGCHANGE and wparam == win32con.SPI_SETWORKAREA)):
+                callback()
+            return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
+
+        def run():
+            # A hidden top-level window, since message-only windows don't
+            # receive the broadcasts
+            wc = win32gui.WNDCLASS()
+            wc.lpfnWndProc = wndproc
+            wc.lpszClassName = 'BorderXDisplayWatcher'
+            wc.hInstance = win32api.GetModuleHandle(None)
+            win32gui.RegisterClass(wc)
+            win32gui.CreateWindow(wc.lpszClassName, 'BorderX display watcher', 0, 0, 0, 0, 0,
+                                  0, 0, wc.hInstance, None)
+            win32gui.PumpMessages()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def icon_bits(self, path):
+        return self.icon_bits_many([path])[0]
+
+    def icon_bits_many(self, paths):
+        # One DC and set of buffers for the whole batch
+        from winicon import extract_dibs
+        return extract_dibs(paths)
+
+    def file_stamp(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def list_processes(self):
+        import psutil
+        processes = {}
+        result = []
+        for proc in psutil.process_iter(['create_time']):
+            processes[proc.pid] = proc
+            result.append((proc.pid, proc.info['create_time']))
+        self.processes = processes
+        return result
+
+    def describe_process(self, pid):
+        import psutil
+        try:
+            proc = self.processes.get(pid) or psutil.Process(pid)
+            with proc.oneshot():
+                create_time = proc.create_time()
+                name = proc.name()
+                try:
+                    exe = proc.exe()
+                except psutil.AccessDenied:
+                    exe = None
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            return None
+        except psutil.AccessDenied:
+            return ProcessInfo(pid, None, None, None)
+        return ProcessInfo(pid, name, exe, create_time)
+
+    def process_started(self, pid):
+        # GetProcessTimes directly instead of psutil. The result is close
+        # to, but not always equal to, psutil's create_time; the journal
+        # saves and checks start times from here only
+        import ctypes
+        from ctypes.wintypes import FILETIME
+        kernel32 = _kernel32_api()
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            created, exited, kernel, user = FILETIME(), FILETIME(), FILETIME(), FILETIME()
+            if not kernel32.GetProcessTimes(handle, ctypes.byref(created), ctypes.byref(exited),
+                                            ctypes.byref(kernel), ctypes.byref(user)):
+                return None
+        finally:
+            kernel32.CloseHandle(handle)
+        # 100 ns ticks since 1601 to seconds since 1970, in integers until the last step
+        ticks = created.dwHighDateTime << 32 | created.dwLowDateTime
+        return (ticks - 116444736000000000) / 1e7
+
+    def process_image(self, pid):
+        import ctypes
+        from ctypes.wintypes import DWORD
+        kernel32 = _kernel32_api()
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            size = DWORD(32768)
+            path = ctypes.create_unicode_buffer(size.value)
+            if not kernel32.QueryFullProcessImageNameW(handle, 0, path, ctypes.byref(size)):
+                return None
+        finally:
+            kernel32.CloseHandle(handle)
+        return path.value
+
+
+_kernel32 = None
+
+
+def _kernel32_api():
+    global _kernel32
+    if _kernel32 is None:
+        import ctypes
+        from ctypes.wintypes import BOOL, DWORD, HANDLE, LPDWORD, LPFILETIME, LPWSTR
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.OpenProcess.argtypes = [DWORD, BOOL, DWORD]
+        kernel32.OpenProcess.restype = HANDLE
+        kernel32.GetProcessTimes.argtypes = [HANDLE, LPFILETIME, LPFILETIME, LPFILETIME, LPFILETIME]
+        kernel32.GetProcessTimes.restype = BOOL
+        kernel32.QueryFullProcessImageNameW.argtypes = [HANDLE, DWORD, LPWSTR, LPDWORD]
+        kernel32.QueryFullProcessImageNameW.restype = BOOL
+        kernel32.CloseHandle.argtypes = [HANDLE]
+        kernel32.CloseHandle.restype = BOOL
+        _kernel32 = kernel32
+    return _kernel32
+
+
+_enum_user32 = None
+_dwmapi = None
+
+
+def _WNDENUMPROC():
+    import ctypes
+    from ctypes.wintypes import BOOL, HWND, LPARAM
+    return ctypes.WINFUNCTYPE(BOOL, HWND, LPARAM)
+
+
+def _enum_api():
+    global _enum_user32, _dwmapi
+    if _enum_user32 is None:
+        import ctypes
+        from ctypes.wintypes import BOOL, DWORD, HWND, LPARAM, LPDWORD, LPRECT, LPWSTR
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        user32.EnumWindows.argtypes = [_WNDENUMPROC(), LPARAM]
+        user32.EnumWindows.restype = BOOL
+        user32.IsWindowVisible.argtypes = [HWND]
+        user32.IsWindowVisible.restype = BOOL
+        user32.GetWindowLongW.argtypes = [HWND, ctypes.c_int]
+        user32.GetWindowLongW.restype = ctypes.c_long
+        user32.GetWindowTextLengthW.argtypes = [HWND]
+        user32.GetWindowTextLengthW.restype = ctypes.c_int
+        user32.GetWindowTextW.argtypes = [HWND, LPWSTR, ctypes.c_int]
+        user32.GetWindowTextW.restype = ctypes.c_int
+        user32.GetClassNameW.argtypes = [HWND, LPWSTR, ctypes.c_int]
+        user32.GetClassNameW.restype = ctypes.c_int
+        user32.GetWindowThreadProcessId.argtypes = [HWND, LPDWORD]
+        user32.GetWindowThreadProcessId.restype = DWORD
+        user32.GetWindowRect.argtypes = [HWND, LPRECT]
+        user32.GetWindowRect.restype = BOOL
+        try:
+            dwmapi = ctypes.WinDLL('dwmapi')
+            dwmapi.DwmGetWindowAttribute.argtypes = [HWND, DWORD, ctypes.c_void_p, DWORD]
+            dwmapi.DwmGetWindowAttribute.restype = ctypes.c_long
+        except OSError:
+            dwmapi = None  # No DWM, so nothing is cloaked
+        _enum_user32, _dwmapi = user32, dwmapi
+    return _enum_user32, _dwmapi
+
+
+_user32 = None
+
+
+def _defer_api():
+    global _user32
+    if _user32 is None:
+        import ctypes
+        from ctypes.wintypes import BOOL, HANDLE, HWND, UINT
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        user32.BeginDeferWindowPos.argtypes = [ctypes.c_int]
+        user32.BeginDeferWindowPos.restype = HANDLE
+        user32.DeferWindowPos.argtypes = [HANDLE, HWND, HWND, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                          ctypes.c_int, UINT]
+        user32.DeferWindowPos.restype = HANDLE
+        user32.EndDeferWindowPos.argtypes = [HANDLE]
+        user32.EndDeferWindowPos.restype = BOOL
+        _user32 = user32
+    return _user32
+
+
+class FakeWindow:
+    __slots__ = ('hwnd', 'pid', 'title', 'window_class', 'style', 'rect', 'visible', 'exstyle', 'cloaked')
+
+    def __init__(self, hwnd, pid, title, window_class, style, rect, visible=True, exstyle=0, cloaked=False):
+        self.hwnd = hwnd
+        self.pid = pid
+        self.title = title
+        self.window_class = window_class
+        self.style = style
+        self.rect = rect
+        self.visible = visible
+        self.exstyle = exstyle
+        self.cloaked = cloaked
+
+
+class FakeBackend:
+    """
+    An in-memory desktop of `windows` top-level windows spread over
+    `processes` processes. Every call sleeps for `latency` seconds (to
+    stand in for the real API cost) and is tallied in `calls`;
+    `icon_latency` maps executables to an extra delay for their icon, like
+    a program on a slow network share.
+    """
+
+    def __init__(self, windows=100, processes=None, latency=0.0, screen=(1920, 1080), seed=0, icon_latency=None):
+        rng = random.Random(seed)
+        self.latency = latency
+        self.icon_latency = icon_latency or {}
+        self.screen = screen
+        self.monitor_layout = [Monitor(0, (0, 0) + screen, (0, 0, screen[0], screen[1] - 40), 96, True)]
+        self.display_callbacks = []
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.windows = {}
+        self.processes = {}
+        processes = processes or max(1, windows // 4)
+        for i in range(processes):
+            pid = 1000 + i * 4
+            name = f'app{i}.exe'
+            self.processes[pid] = ProcessInfo(pid, name, f'C:\\Program Files\\App{i}\\{name}', 1.7e9 + i)
+        pids = list(self.processes)
+        for i in range(windows):
+            hwnd = 0x10000 + i * 2
+            x, y = rng.randrange(0, screen[0] // 2), rng.randrange(0, screen[1] // 2)
+            self.add_window(FakeWindow(hwnd, rng.choice(pids), f'Window {i}', 'FakeWindowClass',
+                                       WS_OVERLAPPEDWINDOW | WS_VISIBLE, (x, y, 800, 600)))
+        self.icons = {info.exe: (bytes([i % 256, 0, 0, 255]) * 256, None)
+                      for i, info in enumerate(self.processes.values())}
+        self.foreground = next(iter(self.windows), 0)
+        self.denied = set()  # pids that refuse describe_process, like elevated apps
+
+    def add_window(self, window):
+        self.windows[window.hwnd] = window
+
+    def remove_window(self, hwnd):
+        self.windows.pop(hwnd, None)
+
+    def _call(self, name):
+        with self.lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def enum_windows(self):
+        self._call('enum_windows')
+        return [(w.hwnd, w.title) for w in list(self.windows.values()) if w.visible]
+
+    def list_windows(self):
+        self._call('list_windows')
+        windows = WindowList()
+        for w in list(self.windows.values()):
+            if w.visible and w.title and not w.cloaked and not w.exstyle & WS_EX_TOOLWINDOW:
+                windows.append(w.hwnd, w.pid, w.title, w.window_class, w.rect)
+        return windows
+
+    def get_pid(self, hwnd):
+        self._call('get_pid')
+        window = self.windows.get(hwnd)
+        return window.pid if window else 0
+
+    def get_title(self, hwnd):
+        self._call('get_title')
+        window = self.windows.get(hwnd)
+        return window.title if window else ''
+
+    def get_class(self, hwnd):
+        self._call('get_class')
+        window = self.windows.get(hwnd)
+        return window.window_class if window else ''
+
+    def is_window(self, hwnd):
+        self._call('is_window')
+        return hwnd in self.windows
+
+    def is_visible(self, hwnd):
+        self._call('is_visible')
+        window = self.windows.get(hwnd)
+        return bool(window and window.visible)
+
+    def is_cloaked(self, hwnd):
+        self._call('is_cloaked')
+        window = self.windows.get(hwnd)
+        return bool(window and window.cloaked)
+
+    def get_style(self, hwnd):
+        self._call('get_style')
+        window = self.windows.get(hwnd)
+        return window.style if window else 0
+
+    def set_style(self, hwnd, style):
+        self._call('set_style')
+        window = self.windows.get(hwnd)
+        if window:
+            window.style = style
+
+    def get_exstyle(self, hwnd):
+        self._call('get_exstyle')
+        window = self.windows.get(hwnd)
+        return window.exstyle if window else 0
+
+    def set_exstyle(self, hwnd, exstyle):
+        self._call('set_exstyle')
+        window = self.windows.get(hwnd)
+        if window:
+            window.exstyle = exstyle
+
+    def set_position(self, hwnd, x, y, width, height):
+        self._call('set_position')
+        window = self.windows.get(hwnd)
+        if window:
+            window.rect = (x, y, width, height)
+
+    def set_positions(self, moves):
+        self._call('set_positions')
+        for hwnd, x, y, width, height in moves:
+            window = self.windows.get(hwnd)
+            if window:
+                window.rect = (x, y, width, height)
+
+    def get_window_rect(self, hwnd):
+        self._call('get_window_rect')
+        window = self.windows.get(hwnd)
+        return window.rect if window else (0, 0, 0, 0)
+
+    def get_foreground(self):
+        self._call('get_foreground')
+        return self.foreground if self.foreground in self.windows else 0
+
+    def screen_size(self):
+        self._call('screen_size')
+        return self.screen
+
+    def monitors(self):
+        self._call('monitors')
+        return list(self.monitor_layout)
+
+    def watch_display_changes(self, callback):
+        self.display_callbacks.append(callback)
+
+    def set_monitors(self, monitors):
+        """
+        Swap in a new monitor layout and send a display-change notification.
+        """
+        self.monitor_layout = list(monitors)
+        for callback in self.display_callbacks:
+            callback()
+
+    def icon_bits(self, path):
+        self._call('icon_bits')
+        time.sleep(self.icon_latency.get(path, 0.0))
+        return self.icons.get(path)
+
+    def icon_bits_many(self, paths):
+        self._call('icon_bits_many')
+        return [self.icon_bits(path) for path in paths]
+
+    def file_stamp(self, path):
+        self._call('file_stamp')
+        return (1024, 0) if path in self.icons else None
+
+    def list_processes(self):
+        self._call('list_processes')
+        return [(pid, info.create_time) for pid, info in self.processes.items()]
+
+    def describe_process(self, pid):
+        self._call('describe_process')
+        if pid in self.denied:
+            return ProcessInfo(pid, None, None, None)  # As psutil's AccessDenied
+        return self.processes.get(pid)
+
+    def process_started(self, pid):
+        self._call('process_started')
+        info = self.processes.get(pid)
+        return info.create_time if info else None
+
+    def process_image(self, pid):
+        self._call('process_image')
+        info = self.processes.get(pid)
+        return info.exe if info else None
+
+
+_backend = None
+
+
+def get_backend():
+    """
+    Return the backend in use, creating the Win32 one on first use.
+    """
+    global _backend
+    if _backend is None:
+        _backend = Win32Backend()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
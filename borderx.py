@@ -1,107 +1,53 @@
-import pygetwindow as gw
-import psutil
-import win32process
-from ctypes import Array, byref, c_char, memset, sizeof
-from ctypes import c_int, c_void_p, POINTER
-from ctypes.wintypes import *
-from enum import Enum
-import ctypes
-from PIL import Image, ImageTk, ImageDraw
+from functools import lru_cache
 import tkinter as tk
 from tkinter import ttk
-import win32gui
-import win32con
-from pystray import Icon as icon, MenuItem as item, Menu
 import threading
-
-BI_RGB = 0
-DIB_RGB_COLORS = 0
+import ntpath
+import os
+import sys
+import time
+from classifier import load_filters
+from iconcache import BackendIconExtractor, IconCache, IconStore
+from iconpool import IconPool
+from icondecode import LIST_SIZE
+from paths import data_dir
+from procsnap import ProcessSnapshot
+import winops
+from winops import get_process_id
+from treediff import Row, TreeModel
+from viewport import LazyIcons
+from pipeline import RefreshPipeline
+from winevents import EventCoalescer, WinEventSource, apply_changes
+from registry import WindowRecord, WindowRegistry
+from rules import load_rules
+from journal import StyleJournal
+from profiler import profiler
+from tracing import trace
+from searchindex import SearchIndex
+from uiqueue import ONCE, TOGGLE, UiQueue
+
+# For the startup-time report
+started_at = time.perf_counter()
 
 # Define a dictionary to track borderless state for each window
 borderless_windows = {}
-
-class ICONINFO(ctypes.Structure):
-    _fields_ = [
-        ("fIcon", BOOL),
-        ("xHotspot", DWORD),
-        ("yHotspot", DWORD),
-        ("hbmMask", HBITMAP),
-        ("hbmColor", HBITMAP)
-    ]
-
-
-class RGBQUAD(ctypes.Structure):
-    _fields_ = [
-        ("rgbBlue", BYTE),
-        ("rgbGreen", BYTE),
-        ("rgbRed", BYTE),
-        ("rgbReserved", BYTE),
-    ]
-
-
-class BITMAPINFOHEADER(ctypes.Structure):
-    _fields_ = [
-        ("biSize", DWORD),
-        ("biWidth", LONG),
-        ("biHeight", LONG),
-        ("biPlanes", WORD),
-        ("biBitCount", WORD),
-        ("biCompression", DWORD),
-        ("biSizeImage", DWORD),
-        ("biXPelsPerMeter", LONG),
-        ("biYPelsPerMeter", LONG),
-        ("biClrUsed", DWORD),
-        ("biClrImportant", DWORD)
-    ]
-
-
-class BITMAPINFO(ctypes.Structure):
-    _fields_ = [
-        ("bmiHeader", BITMAPINFOHEADER),
-        ("bmiColors", RGBQUAD * 1),
-    ]
-
-
-shell32 = ctypes.WinDLL("shell32", use_last_error=True)
-user32 = ctypes.WinDLL("user32", use_last_error=True)
-gdi32 = ctypes.WinDLL("gdi32", use_last_error=True)
-
-gdi32.CreateCompatibleDC.argtypes = [HDC]
-gdi32.CreateCompatibleDC.restype = HDC
-gdi32.GetDIBits.argtypes = [
-    HDC, HBITMAP, UINT, UINT, LPVOID, c_void_p, UINT
-]
-gdi32.GetDIBits.restype = c_int
-gdi32.DeleteObject.argtypes = [HGDIOBJ]
-gdi32.DeleteObject.restype = BOOL
-shell32.ExtractIconExW.argtypes = [
-    LPCWSTR, c_int, POINTER(HICON), POINTER(HICON), UINT
-]
-shell32.ExtractIconExW.restype = UINT
-user32.GetIconInfo.argtypes = [HICON, POINTER(ICONINFO)]
-user32.GetIconInfo.restype = BOOL
-user32.DestroyIcon.argtypes = [HICON]
-user32.DestroyIcon.restype = BOOL
-
-
-class IconSize(Enum):
-    SMALL = 1
-    LARGE = 2
-
-    @classmethod
-    def to_wh(cls, size: "IconSize") -> tuple[int, int]:
-        """
-        Return the actual (width, height) values for the specified icon size.
-        """
-        size_table = {
-            cls.SMALL: (16, 16),
-            cls.LARGE: (32, 32)
-        }
-        return size_table[size]
-
-
+# Windows currently in the list, keyed by hwnd
+window_registry = WindowRegistry()
+# hwnds of the rows selected in the tree
+selected_windows = []
+# Work other threads (the tray, the control endpoint) need done on the Tk
+# thread; Tk must not be touched from anywhere else
+ui_queue = UiQueue()
+# Longest the Tk thread runs queued commands before handling its own events
+UI_SLICE = 0.008
+UI_POLL_MS = 5
+
+
+@lru_cache(maxsize=None)
 def create_image():
     # Create a simple black and white image for the tray icon.
+    # Drawn once and shared by the window icon and the tray.
+    from PIL import Image, ImageDraw
     image = Image.new('RGB', (64, 64), color='black')
     dc = ImageDraw.Draw(image)
 
@@ -113,202 +59,558 @@ def create_image():
     return image
 
 
-def extract_icon(filename: str, size: IconSize) -> Array[c_char]:
-    """
-    Extract the icon from the specified `filename`, which might be
-    either an executable or an `.ico` file.
-    """
-    dc: HDC = gdi32.CreateCompatibleDC(0)
-    if dc == 0:
-        raise ctypes.WinError()
-
-    hicon: HICON = HICON()
-    extracted_icons: UINT = shell32.ExtractIconExW(
-        filename,
-        0,
-        byref(hicon) if size == IconSize.LARGE else None,
-        byref(hicon) if size == IconSize.SMALL else None,
-        1
-    )
-    if extracted_icons != 1:
-        print(f"Error extracting icon from {filename}, returned {extracted_icons} icons instead of one.")
-        return
+process_snapshot = ProcessSnapshot()
+# The pack file's index is read on first use, not here
+icon_cache = IconCache(BackendIconExtractor(), IconStore(os.path.join(data_dir(), 'icons.pack')))
 
-    def cleanup() -> None:
-        if icon_info.hbmColor != 0:
-            gdi32.DeleteObject(icon_info.hbmColor)
-        if icon_info.hbmMask != 0:
-            gdi32.DeleteObject(icon_info.hbmMask)
-        user32.DestroyIcon(hicon)
-
-    icon_info: ICONINFO = ICONINFO(0, 0, 0, 0, 0)
-    if not user32.GetIconInfo(hicon, byref(icon_info)):
-        cleanup()
-        raise ctypes.WinError()
-
-    w, h = IconSize.to_wh(size)
-    bmi: BITMAPINFO = BITMAPINFO()
-    memset(byref(bmi), 0, sizeof(bmi))
-    bmi.bmiHeader.biSize = sizeof(BITMAPINFOHEADER)
-    bmi.bmiHeader.biWidth = w
-    bmi.bmiHeader.biHeight = -h
-    bmi.bmiHeader.biPlanes = 1
-    bmi.bmiHeader.biBitCount = 32
-    bmi.bmiHeader.biCompression = BI_RGB
-    bmi.bmiHeader.biSizeImage = w * h * 4
-    bits = ctypes.create_string_buffer(bmi.bmiHeader.biSizeImage)
-    copied_lines = gdi32.GetDIBits(
-        dc, icon_info.hbmColor, 0, h, bits, byref(bmi), DIB_RGB_COLORS
-    )
-    if copied_lines == 0:
-        cleanup()
-        raise RuntimeError(f"Error copying bitmap bits from icon in {filename}.")
-
-    cleanup()
-    return bits
-
-
-def get_open_windows():
-    windows = gw.getAllWindows()
-    return windows
-
-
-def get_process_id(hwnd):
-    _, pid = win32process.GetWindowThreadProcessId(hwnd)
-    return pid
-
-
-def is_system_process(pid):
-    try:
-        process = psutil.Process(pid)
-        return process.name().lower() in {'system', 'idle'} or 'system32' in process.exe().lower()
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return True  # Treat as system process if it fails to retrieve process information
+# Read from the data directory by load_settings() once the window is up:
+# original styles and rects of the windows we changed, for exact
+# restores; which processes and window classes are listed (see
+# classifier.py); and the rules that make new windows borderless
+style_journal = None
+process_filter = None
+rules = None
 
 
-def get_executable_path(pid):
-    try:
-        process = psutil.Process(pid)
-        return process.exe()
-    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-        return None
+def load_settings():
+    global style_journal, process_filter, rules
+    style_journal = StyleJournal(os.path.join(data_dir(), 'windows.journal'))
+    winops.set_journal(style_journal)
+    process_filter = load_filters(os.path.join(data_dir(), 'filters.json'))
+    rules = load_rules(os.path.join(data_dir(), 'rules.json'))
+
+
+def make_icon_photo(rgba):
+    from PIL import Image, ImageTk
+    # Icons come out of the cache already decoded and sized for the list;
+    # wrap the cached bytes rather than copying them
+    image = Image.frombuffer('RGBA', (LIST_SIZE, LIST_SIZE), rgba, 'raw', 'RGBA', 0, 1)
+    # Convert image to PhotoImage
+    return ImageTk.PhotoImage(image=image)
+
+
+@lru_cache(maxsize=None)
+def placeholder_icon():
+    # Shown on every row whose icon is still loading
+    from PIL import Image, ImageDraw, ImageTk
+    image = Image.new('RGBA', (LIST_SIZE, LIST_SIZE), (0, 0, 0, 0))
+    ImageDraw.Draw(image).rectangle((2, 2, LIST_SIZE - 3, LIST_SIZE - 3), outline=(160, 160, 160, 255))
+    return ImageTk.PhotoImage(image=image)
+
+
+# Extracts icons off the Tk thread in batches; a slow executable only
+# delays the rows of its own batch
+icon_pool = IconPool(icon_cache.get_bitmaps)
 
 
 def load_icon(executable_path):
-    # Extract icon from executable path
-    icon_data = extract_icon(executable_path, IconSize.SMALL)
-    if icon_data is not None:
-        # Convert icon data to an image
-        image = Image.frombytes('RGBA', (16, 16), icon_data, 'raw', 'BGRA', 0, 1)
-        # Resize image to fit the list
-        image = image.resize((15, 15))
-        # Convert image to PhotoImage
-        return ImageTk.PhotoImage(image=image)
-    else:
+    # Icons are cached per executable, so windows of the same program
+    # share one extraction and one PhotoImage. Icons not extracted yet
+    # are queued on the pool and shown as the placeholder meanwhile.
+    if executable_path is None:
+        return None
+    with profiler.stage('load_icon', exe=executable_path):
+        bitmap = icon_cache.peek(executable_path)
+        if bitmap is None:
+            icon_pool.request(executable_path)
+            return placeholder_icon()
+        return icon_cache.get_photo(executable_path, make_icon_photo) if bitmap else None
+
+
+def on_icon_ready(executable_path, bitmap):
+    if bitmap:
+        # Swap the placeholder for the real icon
+        lazy_icons.reload(executable_path)
+        update_icons()
+        return
+    # Windows of executables without an icon don't belong in the list
+    gone = {str(record.hwnd) for record in window_registry.with_exe(executable_path)}
+    if not gone:
+        return
+    for iid in gone:
+        forget_window(int(iid))
+    refresh_rows[:] = [row for row in refresh_rows if row.iid not in gone]
+    sync_rows([row for row in list_rows if row.iid not in gone])
+
+
+def on_icon_timeout(executable_path):
+    print(f"Icon for {executable_path} is taking more than {icon_pool.timeout:.0f} s; "
+          f"showing a placeholder")
+
+
+def poll_icons():
+    icon_pool.drain(on_icon_ready, on_icon_timeout)
+    root.after(30, poll_icons)
+
+
+def scan_windows(cancelled):
+    # Runs on the refresh worker thread: everything here is Win32/psutil
+    # work, only PhotoImages are left for the Tk thread. Icons are left to
+    # icon_pool, so rows go in without waiting for them.
+    with trace.mark('refresh'):
+        # One pass gives each window's pid and class too
+        windows = winops.get_window_list()
+        # Gather every process once instead of querying psutil per window
+        with profiler.stage('process_snapshot'):
+            process_snapshot.refresh()
+        process_filter.prune(process_snapshot.processes)
+        for hwnd, pid, title, window_class, _ in windows.rows():
+            if cancelled.is_set():
+                return
+            record = classify_window(hwnd, title, pid, window_class)
+            if record:
+                yield record
+
+
+def classify_window(hwnd, title, pid, window_class):
+    # Return a WindowRecord if the process filter lets the window through
+    # and it has an icon, else None
+    with profiler.stage('resolve_process', window=title):
+        verdict = process_filter.classify(process_snapshot.resolve(pid), window_class)
+    return make_record(hwnd, title, pid, verdict.exe, window_class) if verdict.allowed else None
+
+
+def make_record(hwnd, title, pid, executable_path, window_class):
+    # Return a WindowRecord unless the executable is known to have no icon
+    if icon_cache.peek(executable_path) == b'':
         return None
+    return WindowRecord(hwnd, pid, executable_path, title, window_class)
 
 
-def populate_list():
-    tree.delete(*tree.get_children())
-    open_windows = get_open_windows()
-    for window in open_windows:
-        hwnd = window._hWnd
+def describe_window(hwnd, title):
+    # The same decision for a single window named by an event, looking up
+    # what get_window_list() would have gathered
+    if not title or not winops.is_listable_window(hwnd):
+        return None
+    with profiler.stage('get_process_id', window=title):
         pid = get_process_id(hwnd)
-        if not is_system_process(pid):
-            executable_path = get_executable_path(pid)
-            if executable_path and window.title:
-                # Load icon
-                icon = load_icon(executable_path)
-                if icon:
-                    # Create a label to display the icon
-                    icon_label = ttk.Label(tree, image=icon, compound='left', padding=(5, 0, 0, 0))
-                    icon_label.image = icon  # Keep a reference to the image to prevent garbage collection
-                    # Insert program with icon into the treeview
-                    tree.insert('', 'end', values=(window.title,), image=icon, tags=('custom',))
-
-
-def make_borderless_fullscreen(window_title):
+    return classify_window(hwnd, title, pid, winops.get_class_name(hwnd))
+
+
+def add_window(record):
+    # Register the window and return its tree row. The icon is attached by
+    # lazy_icons once the row scrolls into view.
+    old = window_registry.get(record.hwnd)
+    window_registry.add(record)
+    if old is None and style_journal.get(record.hwnd):
+        borderless_windows[record.hwnd] = True  # Made borderless by us earlier
+    if old is None or old.title != record.title:
+        publish(dict(describe_record(record), event='window'))
+    if old is None:
+        apply_rules(record)
+    lazy_icons.track(str(record.hwnd), record.exe)
+    search_index.add(str(record.hwnd), record.title, ntpath.basename(record.exe), record.pid)
+    return Row(str(record.hwnd), (record.title,), None)
+
+
+def apply_rules(record):
+    # Make a newly seen window borderless if a rule asks for it
+    rule = rules.match(record.exe, record.title, record.window_class)
+    if rule is None or borderless_windows.get(record.hwnd, False):
+        return
     try:
-        screen_width = root.winfo_screenwidth()
-        screen_height = root.winfo_screenheight()
-        window = gw.getWindowsWithTitle(window_title)[0]
-        hwnd = window._hWnd
-        style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
+        rect = rule.rect or winops.fullscreen_rect(record.hwnd, rule.monitor)
+        winops.make_borderless(record.hwnd, rect)
+        set_borderless(record.hwnd, True)
+        print(f'Rule {rule.index + 1} made "{record.title}" borderless.')
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def forget_window(hwnd):
+    if window_registry.remove(hwnd) is not None:
+        publish({'event': 'closed', 'hwnd': hwnd})
+    borderless_windows.pop(hwnd, None)
+    lazy_icons.forget(str(hwnd))
+    search_index.remove(str(hwnd))
+    if not winops.window_exists(hwnd):
+        style_journal.forget(hwnd)
+
+
+refresh_pipeline = RefreshPipeline(scan_windows)
+refresh_rows = []
+
+
+def on_refresh_batch(batch):
+    for record in batch:
+        with profiler.stage('add_window', exe=record.exe, window=record.title):
+            row = add_window(record)
+        if row:
+            refresh_rows.append(row)
+    # Rows not reached yet by this refresh stay at the bottom until it ends
+    seen = {row.iid for row in refresh_rows}
+    sync_rows(refresh_rows + [row for row in list_rows if row.iid not in seen])
+
+
+def on_refresh_done():
+    live = {int(row.iid) for row in refresh_rows}
+    for hwnd in [hwnd for hwnd in window_registry.by_hwnd if hwnd not in live]:
+        forget_window(hwnd)
+    sync_rows(refresh_rows)
+    stats = refresh_pipeline.stats()
+    if profiler.enabled:
+        profiler.record('refresh', stats['total_ms'] / 1000)
+    print("Window list refreshed:", stats)
+    print("Icons:", lazy_icons.stats())
+
+
+# Every row of the list, in order; the tree shows those matching the filter
+list_rows = []
+# Title, executable name and pid of every row, for the filter box
+search_index = SearchIndex()
+filter_query = ''
+filter_after = None
+# Typing pauses this long before the list is filtered
+FILTER_DELAY_MS = 60
+
+
+def filter_rows(rows):
+    # Rows matching the filter, best match first
+    if not filter_query.strip():
+        return rows
+    by_iid = {row.iid: row for row in rows}
+    return [by_iid[iid] for iid in search_index.search(filter_query) if iid in by_iid]
+
+
+def on_filter_change(*args):
+    global filter_after
+    if filter_after is not None:
+        root.after_cancel(filter_after)
+    filter_after = root.after(FILTER_DELAY_MS, apply_filter)
+
+
+def apply_filter():
+    global filter_after, filter_query
+    filter_after = None
+    filter_query = filter_text.get()
+    with profiler.stage('filter'):
+        sync_rows(list_rows)
+
+
+def sync_rows(rows):
+    list_rows[:] = rows
+    shown = filter_rows(rows)
+    # Keep the row at the top of the view in place across the update
+    top = tree.identify_row(1)
+    with profiler.stage('tree_sync'):
+        tree_model.sync(shown)
+    if top and tree.exists(top) and shown:
+        tree.yview_moveto(tree.index(top) / len(shown))
+    update_icons()
+
+
+icons_pending = False
+
+
+def on_tree_scroll(first, last):
+    # Called by the tree whenever its view moves; icons follow once idle
+    global icons_pending
+    if not icons_pending:
+        icons_pending = True
+        root.after_idle(update_icons)
+
+
+def update_icons():
+    global icons_pending
+    icons_pending = False
+    with profiler.stage('lazy_icons'):
+        lazy_icons.update([row.iid for row in tree_model.rows])
+
+
+def poll_refresh():
+    if refresh_pipeline.drain(on_refresh_batch, on_refresh_done):
+        root.after(16, poll_refresh)
+
+
+window_events = WinEventSource()
+event_coalescer = EventCoalescer()
+
+
+def on_window_event(event):
+    # Called on the event hook's thread
+    trace.event(event)
+    event_coalescer.push(event)
+
+
+def poll_window_events():
+    # Fold window create/destroy/rename/show/hide bursts into the list.
+    # While a full refresh runs the events stay queued for after it.
+    if not refresh_pipeline.running:
+        batch = event_coalescer.flush()
+        if batch:
+            removed, dirty = batch
+            for hwnd in removed:
+                forget_window(hwnd)
+            resolved = {}
+            for hwnd in dirty:
+                row = None
+                if winops.is_live_window(hwnd):
+                    record = describe_window(hwnd, winops.get_window_text(hwnd))
+                    row = add_window(record) if record else None
+                if row is None:
+                    forget_window(hwnd)
+                resolved[str(hwnd)] = row
+            sync_rows(apply_changes(list_rows, {str(hwnd) for hwnd in removed}, resolved))
+    root.after(50, poll_window_events)
+
+
+def populate_list():
+    # Enumerate on a worker thread and stream rows in; a refresh already
+    # in flight is cancelled.
+    polling = refresh_pipeline.running
+    refresh_pipeline.start()
+    # Icons queued for the old list may not be needed any more. Rows
+    # showing a placeholder for one are reloaded on the next update, which
+    # queues it again if it is still on screen.
+    for executable_path in icon_pool.cancel():
+        lazy_icons.reload(executable_path)
+    refresh_rows.clear()
+    if not polling:
+        root.after(0, poll_refresh)
+
+
+def set_borderless(hwnd, borderless):
+    if borderless_windows.get(hwnd, False) != borderless:
+        publish({'event': 'borderless', 'hwnd': hwnd, 'borderless': borderless})
+    borderless_windows[hwnd] = borderless
+
+
+def make_borderless_fullscreen(hwnd):
+    record = window_registry.get(hwnd)
+    window_title = record.title if record else hwnd
+    with profiler.stage('toggle', exe=record.exe if record else None, window=window_title):
+        toggle_borderless(hwnd, window_title)
+
+
+def toggle_borderless(hwnd, window_title):
+    try:
+        # Fill the monitor the window is on
+        with profiler.stage('fullscreen_rect'):
+            rect = winops.fullscreen_rect(hwnd)
 
         # Check if the window is already borderless
         if borderless_windows.get(hwnd, False):
             # If already borderless, revert the style changes
-            style |= (win32con.WS_CAPTION | win32con.WS_THICKFRAME)
-            win32gui.SetWindowLong(hwnd, win32con.GWL_STYLE, style)
-            win32gui.SetWindowPos(hwnd, win32con.HWND_NOTOPMOST, 0, 0, screen_width, screen_height,
-                                  win32con.SWP_FRAMECHANGED)
-            borderless_windows[hwnd] = False
+            winops.restore_borders(hwnd, rect)
+            set_borderless(hwnd, False)
             print(f'Restored borders for "{window_title}".')
         else:
             # If not borderless, make it borderless
-            style &= ~(win32con.WS_CAPTION | win32con.WS_THICKFRAME)
-            win32gui.SetWindowLong(hwnd, win32con.GWL_STYLE, style)
-            win32gui.SetWindowPos(hwnd, win32con.HWND_NOTOPMOST, 0, 0, screen_width, screen_height,
-                                  win32con.SWP_FRAMECHANGED)
-            borderless_windows[hwnd] = True
+            winops.make_borderless(hwnd, rect)
+            set_borderless(hwnd, True)
             print(f'Made "{window_title}" borderless and fullscreen.')
     except Exception as e:
         print(f"Error: {e}")
 
-def on_select(event):
-    global selected_window
-    selected_item = event.widget.selection()[0]
-    selected_window = event.widget.item(selected_item, 'values')[0]
 
-    # Update button text based on borderless state
-    if borderless_windows.get(selected_window, False):
-        borderless_button.config(text="Restore Borders")
+def update_borderless_button():
+    # Update button text based on borderless state; with several windows
+    # selected the button restores only if they are all borderless
+    if selected_windows and all(borderless_windows.get(hwnd, False) for hwnd in selected_windows):
+        text = "Restore Borders"
     else:
-        borderless_button.config(text="Make Borderless Fullscreen")
-
-    print("Selected program:", selected_window)
-
+        text = "Make Borderless Fullscreen"
+    if len(selected_windows) > 1:
+        text += f" ({len(selected_windows)} windows)"
+    borderless_button.config(text=text)
 
-def on_button_click():
-    global selected_window
-    if selected_window:
-        make_borderless_fullscreen(selected_window)
-
-        # Update button text based on borderless state
-        if borderless_button.cget("text") == "Make Borderless Fullscreen":
-            borderless_button.config(text="Restore Borders")
-        else:
-            borderless_button.config(text="Make Borderless Fullscreen")
 
-        print(f'Window "{selected_window}" borderless state toggled.')
+def on_select(event):
+    global selected_windows
+    selection = event.widget.selection()
+    # Rows are keyed by hwnd
+    selected_windows = [int(iid) for iid in selection]
+    update_borderless_button()
 
+    if selection:
+        print("Selected program:", event.widget.item(selection[0], 'values')[0])
 
 
-def toggle_window_visibility(icon, item=None):
+def on_button_click():
+    hwnds = [hwnd for hwnd in selected_windows if hwnd in window_registry]
+    if len(hwnds) == 1:
+        make_borderless_fullscreen(hwnds[0])
+        print(f'Window "{window_registry.get(hwnds[0]).title}" borderless state toggled.')
+    elif hwnds:
+        started = time.perf_counter()
+        try:
+            with profiler.stage('toggle_many'):
+                if all(borderless_windows.get(hwnd, False) for hwnd in hwnds):
+                    changed = winops.restore_many(hwnds)
+                    borderless = False
+                else:
+                    changed = winops.apply_many(hwnds)
+                    borderless = True
+        except Exception as e:
+            print(f"Error: {e}")
+            return
+        for hwnd in hwnds:
+            set_borderless(hwnd, borderless)
+        print(f"{'Made' if borderless else 'Restored'} {len(changed)} of {len(hwnds)} windows "
+              f"in {(time.perf_counter() - started) * 1000:.1f} ms.")
+    update_borderless_button()
+
+
+def describe_record(record):
+    return {
+        'hwnd': record.hwnd,
+        'pid': record.pid,
+        'exe': record.exe,
+        'title': record.title,
+        'borderless': borderless_windows.get(record.hwnd, False),
+    }
+
+
+# Control endpoint for scripts (see rpc.py). These run on the Tk thread.
+def rpc_list():
+    return [describe_record(window_registry.get(int(row.iid))) for row in list_rows]
+
+
+def rpc_apply(hwnd, monitor=None, rect=None):
+    if not winops.window_exists(hwnd):
+        raise ValueError(f"No window {hwnd}")
+    winops.make_borderless(hwnd, rect or winops.fullscreen_rect(hwnd, monitor))
+    set_borderless(hwnd, True)
+    update_borderless_button()
+    return {'hwnd': hwnd, 'borderless': True}
+
+
+def rpc_restore(hwnd):
+    if not winops.window_exists(hwnd):
+        raise ValueError(f"No window {hwnd}")
+    winops.restore_borders(hwnd, winops.fullscreen_rect(hwnd))
+    set_borderless(hwnd, False)
+    update_borderless_button()
+    return {'hwnd': hwnd, 'borderless': False}
+
+
+def rpc_apply_many(hwnds, monitor=None):
+    hwnds = [hwnd for hwnd in hwnds if winops.window_exists(hwnd)]
+    changed = winops.apply_many(hwnds, monitor)
+    for hwnd in hwnds:
+        set_borderless(hwnd, True)
+    update_borderless_button()
+    return {'changed': changed}
+
+
+# Started by finish_startup; rpc pulls in asyncio, which the window
+# shouldn't wait for
+rpc_server = None
+
+
+def start_control_endpoint():
+    global rpc_server
+    from rpc import RpcServer
+    rpc_server = RpcServer({
+        'list': rpc_list,
+        'apply': rpc_apply,
+        'restore': rpc_restore,
+        'apply_many': rpc_apply_many,
+    }, notify=lambda: ui_queue.post('rpc'))
+    ui_queue.register('rpc', drain_rpc, ONCE)
+    rpc_server.start()
+
+
+def drain_rpc():
+    # Run control calls only for what is left of the UI slice; the rest
+    # wait for the next one
+    if rpc_server.drain(ui_queue.remaining()):
+        ui_queue.post('rpc')
+
+
+def publish(event):
+    # Send a window event to control endpoint subscribers, once it is up
+    if rpc_server is not None:
+        rpc_server.publish(event)
+
+
+def toggle_window_visibility():
     if root.state() == 'withdrawn':
         root.deiconify()  # Show the window
     else:
         root.withdraw()  # Hide the window
 
 
+def restore_all_windows():
+    try:
+        changed = winops.restore_all()
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    for hwnd in changed:
+        set_borderless(hwnd, False)
+    update_borderless_button()
+    print(f"Restored borders on {len(changed)} windows.")
+
+
 def exit_application(icon, item):
     icon.stop()  # Stop the tray icon
+    ui_queue.post('exit')
+
+
+def shutdown():
+    window_events.stop()
+    if rpc_server is not None:
+        rpc_server.stop()
+    style_journal.close()
+    icon_pool.shutdown()
+    print("Icon cache:", icon_cache.stats())
+    print("Icon pool:", icon_pool.stats())
+    print("Process filter:", process_filter.stats())
+    if rpc_server is not None:
+        print("Control endpoint:", rpc_server.stats())
+    print("UI queue:", ui_queue.stats())
+    if 'winicon' in sys.modules:
+        # Anything but zero here is a leaked GDI/USER handle
+        print("Icon handles still open:", dict(sys.modules['winicon'].live_handles))
+    if profiler.counts:
+        dump_profile()
+    if trace.enabled:
+        trace.stop()
+        print(f"Trace written: {trace.records} records")
+    root.quit()
+
 
-    # Define a function to call root.quit() on the main thread
-    def quit_on_main_thread():
-        root.quit()
+def dump_profile():
+    filename = os.path.join(data_dir(), 'profile.json')
+    if profiler.dump(filename):
+        print(f"Profile written to {filename}")
 
-    # Schedule the quit_on_main_thread function to be run on the main thread
-    root.after(0, quit_on_main_thread)
+
+def toggle_profiling():
+    # Switching profiling off writes out what was gathered so far
+    profiler.enabled = not profiler.enabled
+    if not profiler.enabled:
+        dump_profile()
+
+
+ui_queue.register('refresh', populate_list, ONCE)
+ui_queue.register('toggle_window', toggle_window_visibility, TOGGLE)
+ui_queue.register('toggle_profiling', toggle_profiling, TOGGLE)
+ui_queue.register('restore_all', restore_all_windows, ONCE)
+ui_queue.register('exit', shutdown, ONCE)
+
+
+def poll_ui_queue():
+    more = ui_queue.drain(UI_SLICE)
+    root.after(1 if more else UI_POLL_MS, poll_ui_queue)
 
 
 def run_tray_icon():
-    tray = icon('Window Manager', create_image(), menu=Menu(item('Toggle Window', toggle_window_visibility), item('Exit', exit_application)))
+    # Runs on the tray thread: every action is posted to the Tk thread
+    from pystray import Icon as icon, MenuItem as item, Menu
+    tray = icon('Window Manager', create_image(), menu=Menu(
+        item('Toggle Window', lambda icon, item: ui_queue.post('toggle_window')),
+        item('Restore All Borders', lambda icon, item: ui_queue.post('restore_all')),
+        item('Profiling', lambda icon, item: ui_queue.post('toggle_profiling'),
+             checked=lambda item: profiler.enabled),
+        item('Exit', exit_application)))
     tray.run()
 
 
 def set_icon(window, image):
     # Convert PIL image to PhotoImage and set as Tkinter window icon
+    from PIL import ImageTk
     photo = ImageTk.PhotoImage(image)
     window.iconphoto(False, photo)
     return photo  # Return photo to keep a reference
@@ -321,21 +623,32 @@ def main():
     root.title("BorderX")
 
     root.geometry("400x400")
-    # Generate the icon image and set it as the window icon
-    icon_image = create_image()
-    icon_photo = set_icon(root, icon_image)
+
+    # Typing here narrows the list to matching windows
+    global filter_text
+    filter_text = tk.StringVar()
+    filter_text.trace_add('write', on_filter_change)
+    filter_entry = ttk.Entry(root, textvariable=filter_text)
+    filter_entry.pack(fill='x', padx=5, pady=(5, 0))
 
     # Create treeview widget
     global tree
-    tree = ttk.Treeview(root)
+    tree = ttk.Treeview(root, selectmode='extended')  # Several windows can be toggled at once
     tree['columns'] = ('Icon', 'Window')  # Two columns: Icon and Program
     tree.heading('#0', text='')  # Heading for icon column
     tree.heading('#1', text='Window')  # Heading for program column
     tree.column('#0', width=50, stretch=False)  # Set width of icon column
     tree.column('#1', stretch=True)  # Set stretch=True to make the program column fill the window width
     tree.pack(fill='both', expand=True)
+    global tree_model
+    tree_model = TreeModel(tree)
+    # Only rows near the view carry an icon
+    global lazy_icons
+    lazy_icons = LazyIcons(tree, load_icon)
+    tree.configure(yscrollcommand=on_tree_scroll)
     tree.bind('<<TreeviewSelect>>', on_select)
-    refresh_button = ttk.Button(root, text="Refresh Window List", command=populate_list)
+    # Clicks while a refresh is queued fold into it
+    refresh_button = ttk.Button(root, text="Refresh Window List", command=lambda: ui_queue.post('refresh'))
     refresh_button.pack(pady=5)
 
     global borderless_button
@@ -350,16 +663,59 @@ def main():
     # Bind window resize event to update_column_width function
     root.bind("<Configure>", update_column_width)
 
-    # Populate treeview with program list and icons
+    # Everything that needs PIL, pystray or the window hooks waits until
+    # the window is on screen
+    root.after_idle(finish_startup)
+
+    # Start Tkinter event loop
+    root.mainloop()
+
+
+def finish_startup():
+    print(f"Window shown after {(time.perf_counter() - started_at) * 1000:.0f} ms")
+
+    # Generate the icon image and set it as the window icon
+    global icon_photo
+    icon_photo = set_icon(root, create_image())
+
+    load_settings()
+
+    # Forget saved styles of windows that closed since the last run
+    stale = len(style_journal)
+    live = winops.reconcile_journal()
+    print(f"Window journal: {len(live)} borderless windows, {stale - len(live)} stale entries dropped")
+
+    # Start filling the treeview; rows stream in as they are found
     populate_list()
 
+    # Keep the list up to date as windows come and go
+    window_events.start(on_window_event)
+    root.after(50, poll_window_events)
+    root.after(30, poll_icons)
+
+    # Commands from the tray and the control endpoint
+    root.after(UI_POLL_MS, poll_ui_queue)
+
+    # Let scripts drive this instance instead of starting another
+    start_control_endpoint()
+
     # Run the tray icon in a separate thread
     thread = threading.Thread(target=run_tray_icon)
     thread.start()
 
-    # Start Tkinter event loop
-    root.mainloop()
-
 
 if __name__ == "__main__":
+    if sys.argv[1:] == ['--profile']:
+        # Time each refresh and toggle stage; written to profile.json on exit
+        profiler.enabled = True
+    elif len(sys.argv) == 3 and sys.argv[1] == '--record':
+        # Capture every backend call and window event for replay.py
+        from backend import get_backend, set_backend
+        from tracing import RecordingBackend
+        trace.start(sys.argv[2])
+        set_backend(RecordingBackend(get_backend()))
+    elif len(sys.argv) > 1:
+        # Subcommands go to the headless CLI without starting the GUI
+        import cli
+        sys.exit(cli.main())
     main()
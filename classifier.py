@@ -0,0 +1,226 @@
+"""
+Decides which processes' windows belong in the window list.
+
+The filters file is JSON with optional "allow" and "deny" sections, each
+listing executable names, path prefixes and window classes:
+
+    {
+        "allow": {"names": ["mstsc.exe"]},
+        "deny": {"paths": ["C:\\Program Files\\Launcher"], "classes": ["ConsoleWindowClass"]}
+    }
+
+These add to the defaults, which hide System, Idle and everything under
+the Windows System32 directory. An allow of any kind beats a deny; among
+path prefixes the longest one decides. Run this module to time it:
+
+    python classifier.py
+"""
+import json
+import ntpath
+import os
+from collections import namedtuple
+
+# allowed is the decision; exe is the executable path, filled in by the
+# fallback when the process denied us its details; reason says why
+Verdict = namedtuple('Verdict', ['allowed', 'exe', 'reason'])
+
+ALLOW = 'allow'
+DENY = 'deny'
+DEFAULT_DENY_NAMES = ('system', 'idle')
+
+
+def default_deny_paths():
+    return (ntpath.join(os.environ.get('SystemRoot', 'C:\\Windows'), 'System32'),)
+
+
+def _components(path):
+    return [part for part in ntpath.normcase(path).split('\\') if part]
+
+
+class PathTrie:
+    """
+    Path prefixes keyed component by component, so a lookup costs one dict
+    step per directory and "C:\\Windows\\System32" never matches
+    "C:\\Windows\\System32x".
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix, value):
+        node = self.root
+        for part in _components(prefix):
+            node = node.setdefault(part, {})
+        node[None] = value  # None can't collide with a path component
+
+    def match(self, path):
+        """
+        Return the value of the longest prefix of `path`, or None.
+        """
+        node = self.root
+        found = node.get(None)
+        for part in _components(path):
+            node = node.get(part)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+
+class ProcessClassifier:
+    """
+    Filters compiled into hash sets (names, classes) and a PathTrie, with
+    each process's verdict memoized per (pid, create_time). Call
+    `prune()` after a process snapshot refresh to drop exited processes.
+
+    When a process won't give us its name and executable (an elevated app,
+    say) the backend's cheaper `process_image()` is tried before giving up
+    on it.
+    """
+
+    def __init__(self, allow=None, deny=None, backend=None):
+        self.backend = backend
+        self.names = {}
+        self.classes = {}
+        self.paths = PathTrie()
+        self._add(DENY, {'names': DEFAULT_DENY_NAMES, 'paths': default_deny_paths()})
+        self._add(DENY, deny or {})
+        self._add(ALLOW, allow or {})  # Last, so allow wins over deny
+        self.verdicts = {}  # pid -> (create_time, Verdict)
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def _add(self, value, section):
+        for name in section.get('names', ()):
+            self.names[name.lower()] = value
+        for window_class in section.get('classes', ()):
+            self.classes[window_class] = value
+        for prefix in section.get('paths', ()):
+            self.paths.add(prefix, value)
+
+    def _backend(self):
+        if self.backend is None:
+            from backend import get_backend
+            return get_backend()
+        return self.backend
+
+    def classify(self, info, window_class=None):
+        """
+        Return the Verdict for a window of the process described by
+        ProcessInfo `info` (None if it has exited) with `window_class`.
+        """
+        if info is None:
+            return Verdict(False, None, 'exited')
+        verdict = self._process_verdict(info)
+        by_class = self.classes.get(window_class)
+        if by_class == ALLOW and not verdict.allowed and verdict.exe:
+            return Verdict(True, verdict.exe, 'class allowed')
+        if by_class == DENY and verdict.allowed and verdict.reason != 'allowed':
+            return Verdict(False, verdict.exe, 'class denied')
+        return verdict
+
+    def _process_verdict(self, info):
+        cached = self.verdicts.get(info.pid)
+        if cached is not None and cached[0] == info.create_time:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        verdict = self._decide(info)
+        self.verdicts[info.pid] = (info.create_time, verdict)
+        return verdict
+
+    def _decide(self, info):
+        name, exe = info.name, info.exe
+        if exe is None:
+            self.fallbacks += 1
+            exe = self._backend().process_image(info.pid)
+            if exe is None:
+                return Verdict(False, None, 'access denied')
+            name = name or ntpath.basename(exe)
+        by_name = self.names.get(name.lower()) if name else None
+        by_path = self.paths.match(exe)
+        if ALLOW in (by_name, by_path):
+            # Explicitly allowed; a class deny can't override it
+            return Verdict(True, exe, 'allowed')
+        if DENY in (by_name, by_path):
+            return Verdict(False, exe, 'name denied' if by_name == DENY else 'path denied')
+        return Verdict(True, exe, 'default')
+
+    def prune(self, processes):
+        """
+        Forget the verdicts of processes not in `processes` (pid ->
+        ProcessInfo), or whose pid now belongs to a new process.
+        """
+        stale = [pid for pid, (create_time, _) in self.verdicts.items()
+                 if pid not in processes or processes[pid].create_time != create_time]
+        for pid in stale:
+            del self.verdicts[pid]
+        return len(stale)
+
+    def stats(self):
+        return {'cached': len(self.verdicts), 'hits': self.hits, 'misses': self.misses,
+                'fallbacks': self.fallbacks}
+
+
+def load_filters(filename, backend=None):
+    """
+    Load the filters file; a missing or invalid file gives the defaults.
+    """
+    try:
+        with open(filename, encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("expected an object with allow and deny sections")
+        return ProcessClassifier(data.get('allow'), data.get('deny'), backend)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        print(f"Error loading filters from {filename}: {e}")
+    return ProcessClassifier(backend=backend)
+
+
+def _benchmark(processes=(100, 1000, 10000), windows_per_process=3):
+    import random
+    import time
+    from backend import FakeBackend
+    rng = random.Random(0)
+    folders = ['C:\\Windows\\System32', 'C:\\Windows', 'C:\\Program Files\\App',
+               'C:\\Program Files (x86)\\Steam\\steamapps\\common\\Game', 'D:\\Games\\Thing']
+    for count in processes:
+        backend = FakeBackend(windows=0, processes=count)
+        table = {}
+        for pid, info in list(backend.processes.items()):
+            exe = f'{rng.choice(folders)}\\{info.name}'
+            info = info._replace(exe=exe)
+            backend.processes[pid] = info
+            # One process in ten is elevated and won't tell us its name or exe
+            table[pid] = info._replace(name=None, exe=None) if rng.random() < 0.1 else info
+        classifier = ProcessClassifier({'names': ['app7.exe']}, {'paths': ['D:\\Games']}, backend)
+        lookups = [(table[pid], rng.choice(['Chrome_WidgetWin_1', 'UnityWndClass', 'CabinetWClass']))
+                   for pid in table for _ in range(windows_per_process)]
+        cold = time.perf_counter()
+        allowed = sum(classifier.classify(info, window_class).allowed for info, window_class in lookups)
+        cold = time.perf_counter() - cold
+        warm = time.perf_counter()
+        for info, window_class in lookups:
+            classifier.classify(info, window_class)
+        warm = time.perf_counter() - warm
+        old = time.perf_counter()
+        old_allowed = 0
+        for info, window_class in lookups:
+            # The substring test this replaced
+            if not (info.name is None or info.exe is None or info.name.lower() in {'system', 'idle'}
+                    or 'system32' in info.exe.lower()):
+                old_allowed += 1
+        old = time.perf_counter() - old
+        del table[next(iter(table))]
+        pruned = classifier.prune(table)
+        print(f'{count} processes, {len(lookups)} windows: first refresh {cold * 1000:.2f} ms, '
+              f'later refreshes {warm * 1000:.2f} ms (substring test {old * 1000:.2f} ms); '
+              f'{allowed} shown vs {old_allowed} before; pruned {pruned}; {classifier.stats()}; '
+              f'process_image calls {backend.calls["process_image"]}')
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,201 @@
+"""
+Global hotkeys for toggling the foreground window without the GUI.
+
+A HotkeySource turns keypresses into names and a HotkeyDispatcher runs the
+action bound to each name. Run this module to time a toggle against the
+fake backend:
+
+    python hotkeys.py
+"""
+import threading
+import time
+
+MOD_ALT = 0x0001
+MOD_CONTROL = 0x0002
+MOD_SHIFT = 0x0004
+MOD_WIN = 0x0008
+MOD_NOREPEAT = 0x4000
+WM_HOTKEY = 0x0312
+WM_QUIT = 0x0012
+
+MODIFIERS = {'alt': MOD_ALT, 'ctrl': MOD_CONTROL, 'control': MOD_CONTROL, 'shift': MOD_SHIFT, 'win': MOD_WIN}
+KEYS = {
+    'backspace': 0x08, 'tab': 0x09, 'enter': 0x0D, 'return': 0x0D, 'pause': 0x13, 'esc': 0x1B,
+    'space': 0x20, 'pageup': 0x21, 'pagedown': 0x22, 'end': 0x23, 'home': 0x24,
+    'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28, 'insert': 0x2D, 'delete': 0x2E,
+    'scrolllock': 0x91,
+}
+
+
+def parse_hotkey(text):
+    """
+    Turn a hotkey like "ctrl+alt+enter" or "win+shift+f11" into the
+    (modifiers, virtual key) pair RegisterHotKey takes.
+    """
+    *mods, key = [part.strip().lower() for part in text.split('+')]
+    modifiers = 0
+    for mod in mods:
+        if mod not in MODIFIERS:
+            raise ValueError(f"Unknown modifier {mod!r} in hotkey {text!r}")
+        modifiers |= MODIFIERS[mod]
+    if len(key) == 1 and key.isalnum():
+        vk = ord(key.upper())
+    elif key[:1] == 'f' and key[1:].isdigit() and 1 <= int(key[1:]) <= 24:
+        vk = 0x70 + int(key[1:]) - 1
+    elif key in KEYS:
+        vk = KEYS[key]
+    else:
+        raise ValueError(f"Unknown key {key!r} in hotkey {text!r}")
+    return modifiers, vk
+
+
+class HotkeySource:
+    """
+    Calls `callback(name)` whenever one of the named hotkeys is pressed.
+    The callback runs on the source's own thread.
+    """
+
+    def start(self, callback):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class ScriptedHotkeySource(HotkeySource):
+    """
+    In-memory hotkey source: `press(name)` delivers a keypress
+    synchronously, for driving the dispatcher without Win32.
+    """
+
+    def __init__(self):
+        self.callback = None
+
+    def start(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+    def press(self, name):
+        if self.callback is not None:
+            self.callback(name)
+
+
+class WinHotkeySource(HotkeySource):
+    """
+    Hotkeys registered with RegisterHotKey, served by their own message
+    loop on a daemon thread. `hotkeys` maps names to hotkey strings.
+    """
+
+    def __init__(self, hotkeys):
+        self.hotkeys = {name: parse_hotkey(text) for name, text in hotkeys.items()}
+        self.thread = None
+        self.thread_id = None
+        self.failed = []  # Names another program had already registered
+        self.ready = threading.Event()
+
+    def start(self, callback):
+        self.thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self.thread.start()
+        self.ready.wait(1.0)
+
+    def _run(self, callback):
+        import ctypes
+        from ctypes.wintypes import BOOL, HWND, MSG, UINT
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        user32.RegisterHotKey.argtypes = [HWND, ctypes.c_int, UINT, UINT]
+        user32.RegisterHotKey.restype = BOOL
+
+        names = {}
+        for hotkey_id, (name, (modifiers, vk)) in enumerate(self.hotkeys.items(), 1):
+            if user32.RegisterHotKey(None, hotkey_id, modifiers | MOD_NOREPEAT, vk):
+                names[hotkey_id] = name
+            else:
+                self.failed.append(name)
+        self.thread_id = kernel32.GetCurrentThreadId()
+        self.ready.set()
+
+        msg = MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            if msg.message == WM_HOTKEY and msg.wParam in names:
+                callback(names[msg.wParam])
+        for hotkey_id in names:
+            user32.UnregisterHotKey(None, hotkey_id)
+
+    def stop(self):
+        if self.thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+            self.thread_id = None
+
+
+class HotkeyDispatcher:
+    """
+    Runs the action bound to each hotkey as soon as it is pressed, on the
+    hotkey thread, and keeps the time each took for `stats()`.
+    """
+
+    def __init__(self, actions, keep=1024):
+        self.actions = actions
+        self.keep = keep
+        self.presses = 0
+        self.latencies = []
+
+    def __call__(self, name):
+        action = self.actions.get(name)
+        if action is None:
+            return None
+        self.presses += 1
+        started = time.perf_counter()
+        try:
+            result = action()
+        except Exception as e:
+            print(f"Error running hotkey {name}: {e}")
+            result = None
+        self.latencies.append(time.perf_counter() - started)
+        del self.latencies[:-self.keep]
+        return result
+
+    def stats(self):
+        if not self.latencies:
+            return {'presses': 0}
+        ordered = sorted(self.latencies)
+        return {
+            'presses': self.presses,
+            'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3),
+        }
+
+
+def _benchmark(presses=1000, windows=(10, 1000), latency=0.0):
+    import os
+    import tempfile
+    import winops
+    from backend import FakeBackend, set_backend
+    from journal import StyleJournal
+    for count in windows:
+        backend = FakeBackend(windows=count, latency=latency)
+        set_backend(backend)
+        winops.monitor_topology = None
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = StyleJournal(os.path.join(tmp, 'windows.journal'))
+            winops.set_journal(journal)
+            source = ScriptedHotkeySource()
+            dispatcher = HotkeyDispatcher({'toggle': winops.toggle_foreground})
+            source.start(dispatcher)
+            hwnds = list(backend.windows)
+            for i in range(presses):
+                # Two presses per window: borderless, then restored
+                backend.foreground = hwnds[i // 2 % len(hwnds)]
+                source.press('toggle')
+            journal.close()
+            winops.set_journal(None)
+        calls = {name: backend.calls[name] for name in ('enum_windows', 'describe_process', 'list_processes', 'icon_bits')}
+        print(f'{count} windows: {dispatcher.stats()}, per press {sum(backend.calls.values()) / presses:.1f} calls, {calls}')
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,362 @@
+import os
+import struct
+import threading
+import weakref
+from collections import OrderedDict
+
+from profiler import profiler
+
+# Record header in the pack file: key length, data length
+_RECORD = struct.Struct('<HI')
+_MAGIC = b'BXICONS2'  # Bumped when the stored bitmap format changes
+
+
+class IconExtractor:
+    """
+    Turns an executable path into a decoded RGBA bitmap, ready for the list.
+
+    The cache only ever talks to this interface, so a fake extractor can
+    stand in for the Win32 one when running off Windows.
+    """
+
+    def extract(self, path):
+        """
+        Return the RGBA bytes for `path`, or None if it has no icon.
+        """
+        raise NotImplementedError
+
+    def extract_many(self, paths):
+        """
+        Return the RGBA bytes (or None) for each of `paths`. Extractors that
+        can decode in bulk override this.
+        """
+        return [self.extract(path) for path in paths]
+
+    def key(self, path):
+        """
+        Return the cache key for `path`, or None if it can't be cached.
+        """
+        return icon_key(path)
+
+
+def icon_key(path):
+    """
+    Return the cache key for `path`: (path, file size, mtime).
+    Returns None if the file can't be stat'ed.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (os.path.normcase(path), st.st_size, st.st_mtime_ns)
+
+
+def _encode_key(key):
+    return f'{key[0]}|{key[1]}|{key[2]}'.encode('utf-8')
+
+
+def _decode_key(raw):
+    path, size, mtime = raw.decode('utf-8').rsplit('|', 2)
+    return (path, int(size), int(mtime))
+
+
+class IconStore:
+    """
+    On-disk tier of the icon cache: a single append-only pack file of
+    (key, bitmap) records. The index is rebuilt by scanning the record
+    headers the first time the store is used, not when it is created, so
+    opening it costs nothing at startup. An empty bitmap records an
+    executable that has no icon, so it isn't extracted again.
+    """
+
+    def __init__(self, filename, max_bytes=4 * 1024 * 1024):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self._index = None  # key -> (offset, length), once loaded
+        self._size = 0
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._load_index()
+        return self._index
+
+    @index.setter
+    def index(self, index):
+        self._index = index
+
+    @property
+    def size(self):
+        if self._index is None:
+            self._load_index()
+        return self._size
+
+    @size.setter
+    def size(self, size):
+        self._size = size
+
+    def _load_index(self):
+        self._index = {}
+        try:
+            with open(self.filename, 'rb') as f:
+                if f.read(len(_MAGIC)) != _MAGIC:
+                    return
+                offset = len(_MAGIC)
+                while True:
+                    header = f.read(_RECORD.size)
+                    if len(header) < _RECORD.size:
+                        break
+                    key_len, data_len = _RECORD.unpack(header)
+                    raw_key = f.read(key_len)
+                    if len(raw_key) < key_len:
+                        break
+                    data_offset = offset + _RECORD.size + key_len
+                    f.seek(data_len, os.SEEK_CUR)
+                    if f.tell() != data_offset + data_len:
+                        break  # Truncated trailing record
+                    self.index[_decode_key(raw_key)] = (data_offset, data_len)
+                    offset = data_offset + data_len
+                self._size = offset
+        except (OSError, ValueError):
+            self._index = {}
+            self._size = 0
+
+    def get(self, key):
+        """
+        Return the stored bitmap for `key`, b'' for a known icon-less
+        executable, or None if the key isn't stored.
+        """
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        if length == 0:
+            return b''
+        try:
+            with open(self.filename, 'rb') as f:
+                f.seek(offset)
+                data = f.read(length)
+        except OSError:
+            return None
+        return data if len(data) == length else None
+
+    def put(self, key, data):
+        if self.size + _RECORD.size + len(data) > self.max_bytes:
+            self.compact()
+        raw_key = _encode_key(key)
+        try:
+            # An empty or unreadable store is started over from scratch
+            with open(self.filename, 'ab' if self.size else 'wb') as f:
+                if self.size == 0:
+                    f.write(_MAGIC)
+                    self.size = len(_MAGIC)
+                f.write(_RECORD.pack(len(raw_key), len(data)))
+                f.write(raw_key)
+                f.write(data)
+        except OSError as e:
+            print(f"Error writing icon cache {self.filename}: {e}")
+            return
+        self.index[key] = (self.size + _RECORD.size + len(raw_key), len(data))
+        self.size += _RECORD.size + len(raw_key) + len(data)
+
+    def compact(self):
+        """
+        Rewrite the pack file keeping only the newest record for each
+        executable, dropping the oldest ones until it fits in half the cap.
+        """
+        latest = {}
+        for key in self.index:
+            latest[key[0]] = key  # Index preserves insertion order
+        keys = list(latest.values())
+        records = [(k, self.get(k)) for k in keys]
+        records = [(k, d) for k, d in records if d is not None]
+
+        budget = self.max_bytes // 2
+        kept = []
+        total = len(_MAGIC)
+        for key, data in reversed(records):
+            total += _RECORD.size + len(_encode_key(key)) + len(data)
+            if total > budget:
+                break
+            kept.append((key, data))
+        kept.reverse()
+
+        tmp = self.filename + '.tmp'
+        index = {}
+        size = len(_MAGIC)
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(_MAGIC)
+                for key, data in kept:
+                    raw_key = _encode_key(key)
+                    f.write(_RECORD.pack(len(raw_key), len(data)))
+                    f.write(raw_key)
+                    f.write(data)
+                    index[key] = (size + _RECORD.size + len(raw_key), len(data))
+                    size += _RECORD.size + len(raw_key) + len(data)
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            print(f"Error compacting icon cache {self.filename}: {e}")
+            return
+        self.index = index
+        self.size = size
+
+
+class IconCache:
+    """
+    Two-tier icon cache keyed by (executable path, file size, mtime).
+
+    The memory tier is an LRU of decoded bitmaps; the disk tier is an
+    optional `IconStore` so icons are warm right after startup. PhotoImages
+    are only held weakly: executables with identical icons share one while
+    it is shown, and it is freed once no row uses it.
+    """
+
+    def __init__(self, extractor, store=None, max_entries=256):
+        self.extractor = extractor
+        self.store = store
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> bitmap
+        # bitmap -> photo, for as long as the list still shows the photo
+        self.photos = weakref.WeakValueDictionary()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _cached(self, key):
+        # Memory tier, then disk tier; None if neither has it. Called with
+        # the lock held.
+        bitmap = self.entries.get(key)
+        if bitmap is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return bitmap
+        bitmap = self.store.get(key) if self.store else None
+        if bitmap is not None:
+            self.disk_hits += 1
+            self._insert(key, bitmap)
+        return bitmap
+
+    def _lookup(self, key, path):
+        with self.lock:
+            bitmap = self._cached(key)
+        if bitmap is not None:
+            return bitmap
+        # Extract without the lock so other icons aren't held up
+        bitmap = self.extractor.extract(path) or b''
+        with self.lock:
+            self.misses += 1
+            if self.store:
+                self.store.put(key, bitmap)
+            return self._insert(key, bitmap)
+
+    def _insert(self, key, bitmap):
+        self.entries[key] = bitmap
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return bitmap
+
+    def peek(self, path):
+        """
+        Return the cached bitmap for `path` (b'' if it is known to have no
+        icon), or None if it would have to be extracted.
+        """
+        key = self.extractor.key(path)
+        if key is None:
+            return b''
+        with self.lock:
+            return self._cached(key)
+
+    def get_bitmap(self, path):
+        """
+        Return the RGBA bitmap for `path`, or None if it has no icon.
+        """
+        key = self.extractor.key(path)
+        if key is None:
+            return None
+        return self._lookup(key, path) or None
+
+    def get_bitmaps(self, paths):
+        """
+        `get_bitmap()` for each of `paths`, extracting the ones not cached
+        together in one `extract_many()` batch.
+        """
+        keys = [self.extractor.key(path) for path in paths]
+        bitmaps = [None] * len(paths)
+        missing = []
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key is None:
+                    continue
+                bitmap = self._cached(key)
+                if bitmap is None:
+                    missing.append(i)
+                else:
+                    bitmaps[i] = bitmap or None
+        if not missing:
+            return bitmaps
+        # Extract without the lock so other icons aren't held up
+        extracted = self.extractor.extract_many([paths[i] for i in missing])
+        with self.lock:
+            for i, bitmap in zip(missing, extracted):
+                bitmap = bitmap or b''
+                self.misses += 1
+                if self.store:
+                    self.store.put(keys[i], bitmap)
+                bitmaps[i] = self._insert(keys[i], bitmap) or None
+        return bitmaps
+
+    def get_photo(self, path, make_photo):
+        """
+        Return the PhotoImage for `path`, building it with
+        `make_photo(bitmap)` unless one is still alive for the same icon.
+        The caller keeps it alive. Must be called on the Tk thread.
+        """
+        key = self.extractor.key(path)
+        if key is None:
+            return None
+        bitmap = self._lookup(key, path)
+        if not bitmap:
+            return None
+        photo = self.photos.get(bitmap)
+        if photo is None:
+            photo = make_photo(bitmap)
+            self.photos[bitmap] = photo
+        return photo
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'photos': len(self.photos),
+            'disk_bytes': self.store.size if self.store else 0,
+        }
+
+
+class BackendIconExtractor(IconExtractor):
+    """
+    Extracts icons through the active window backend and decodes them in
+    batches with `icondecode`.
+    """
+
+    def extract(self, path):
+        return self.extract_many([path])[0]
+
+    def extract_many(self, paths):
+        from backend import get_backend
+        from icondecode import decode_icons
+        raws = get_backend().icon_bits_many(paths)
+        with profiler.stage('icon_decode'):
+            decoded = iter(decode_icons([raw for raw in raws if raw]))
+        return [next(decoded) if raw else None for raw in raws]
+
+    def key(self, path):
+        from backend import get_backend
+        stamp = get_backend().file_stamp(path)
+        return (os.path.normcase(path),) + stamp if stamp else None
@@ -0,0 +1,150 @@
+"""
+Batch decoding of raw icon DIBs into the RGBA bitmaps shown in the list.
+
+`decode_icons()` takes the 16x16 BGRA color bits and AND mask of every
+icon extracted in a refresh and decodes them together: channel swap,
+mask compositing for icons without an alpha channel, and a premultiplied
+16 -> 15 px area resample. With NumPy this is a handful of array
+operations over one (N, 16, 16, 4) array; without it each icon is decoded
+in pure Python.
+"""
+
+ICON_SIZE = 16  # Size of the extracted small icons
+LIST_SIZE = 15  # Size of the icons shown in the list
+
+
+def _resample_weights(src, dst):
+    # weights[i][j]: share of source pixel j in destination pixel i
+    scale = src / dst
+    weights = []
+    for i in range(dst):
+        lo, hi = i * scale, (i + 1) * scale
+        weights.append([max(0.0, min(hi, j + 1) - max(lo, j)) / scale for j in range(src)])
+    return weights
+
+
+WEIGHTS = _resample_weights(ICON_SIZE, LIST_SIZE)
+# (source pixel, weight) pairs with a non-zero weight, per destination pixel
+TAPS = [[(j, w) for j, w in enumerate(row) if w] for row in WEIGHTS]
+
+
+def decode_icons(raws):
+    """
+    Decode a list of (bgra, mask) DIB byte strings, as returned by the
+    backend's `icon_bits()`, into LIST_SIZE x LIST_SIZE RGBA byte strings.
+    `mask` may be None.
+    """
+    if not raws:
+        return []
+    try:
+        import numpy as np
+    except ImportError:
+        return [_decode_one(color, mask) for color, mask in raws]
+
+    n = len(raws)
+    color = np.frombuffer(b''.join(c for c, _ in raws), np.uint8).reshape(n, ICON_SIZE, ICON_SIZE, 4)
+    empty = bytes(ICON_SIZE * ICON_SIZE * 4)
+    mask = np.frombuffer(b''.join(m or empty for _, m in raws), np.uint8).reshape(n, ICON_SIZE, ICON_SIZE, 4)
+
+    rgba = color[..., [2, 1, 0, 3]].astype(np.float32) / 255
+    # Icons without an alpha channel rely on the AND mask: set bits are
+    # transparent, everything else opaque
+    has_alpha = color[..., 3].reshape(n, -1).any(axis=1)
+    mask_alpha = (mask[..., 0] == 0).astype(np.float32)
+    rgba[..., 3] = np.where(has_alpha[:, None, None], rgba[..., 3], mask_alpha)
+
+    # Resample premultiplied so transparent pixels don't bleed their color
+    rgba[..., :3] *= rgba[..., 3:]
+    weights = np.array(WEIGHTS, np.float32)
+    # Resample rows and columns as two matrix products over (N, 4, 16, 16)
+    # planes; a single einsum was ten times slower than the per-icon path
+    out = (weights @ rgba.transpose(0, 3, 1, 2) @ weights.T).transpose(0, 2, 3, 1)
+    alpha = out[..., 3:]
+    out[..., :3] = np.divide(out[..., :3], alpha, out=np.zeros_like(out[..., :3]), where=alpha > 0)
+    out = np.clip(out * 255 + 0.5, 0, 255).astype(np.uint8)
+    return [icon.tobytes() for icon in out]
+
+
+def _decode_one(color, mask):
+    size = ICON_SIZE
+    has_alpha = any(color[3::4])
+    pixels = []
+    for p in range(size * size):
+        b, g, r, a = color[p * 4:p * 4 + 4]
+        if has_alpha:
+            a = a / 255
+        else:
+            a = 0.0 if mask and mask[p * 4] else 1.0
+        pixels.append((r / 255 * a, g / 255 * a, b / 255 * a, a))
+
+    out = bytearray()
+    for taps_y in TAPS:
+        for taps_x in TAPS:
+            acc = [0.0, 0.0, 0.0, 0.0]
+            for y, fy in taps_y:
+                for x, fx in taps_x:
+                    f = fy * fx
+                    px = pixels[y * size + x]
+                    for c in range(4):
+                        acc[c] += px[c] * f
+            a = acc[3]
+            rgb = [c / a if a > 0 else 0.0 for c in acc[:3]]
+            out.extend(min(255, max(0, int(v * 255 + 0.5))) for v in rgb + [a])
+    return bytes(out)
+
+
+def _sample_icons(count, distinct, seed=0):
+    # `distinct` different icons repeated to `count`, half with an alpha
+    # channel and half relying on the AND mask, like a real desktop
+    import random
+    rng = random.Random(seed)
+    pool = []
+    for i in range(distinct):
+        color = bytearray(rng.randbytes(ICON_SIZE * ICON_SIZE * 4))
+        mask = None
+        if i % 2:
+            color[3::4] = bytes(ICON_SIZE * ICON_SIZE)
+            mask = b''.join(bytes((m, m, m, 0)) for m in rng.choices((0, 255), k=ICON_SIZE * ICON_SIZE))
+        pool.append((bytes(color), mask))
+    return [pool[i % distinct] for i in range(count)]
+
+
+def _benchmark(counts=(50, 500, 5000), runs=3):
+    import time
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+
+    def best(fn):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def per_icon_pil(raws):
+        # The path this replaced: swap in Python, then one PIL image and
+        # resize per icon, masks ignored
+        for color, _ in raws:
+            rgba = bytearray(color)
+            rgba[0::4], rgba[2::4] = rgba[2::4], rgba[0::4]
+            Image.frombytes('RGBA', (ICON_SIZE, ICON_SIZE), bytes(rgba)).resize((LIST_SIZE, LIST_SIZE))
+
+    for count in counts:
+        # A desktop shows many windows of the same few programs
+        raws = _sample_icons(count, distinct=max(1, count // 5))
+        batch = best(lambda: decode_icons(raws))
+        one = best(lambda: [_decode_one(color, mask) for color, mask in raws])
+        line = (f'{count} icons: batch {batch * 1000:.2f} ms ({batch / count * 1e6:.1f} us/icon), '
+                f'pure Python {one * 1000:.1f} ms')
+        if Image is not None:
+            pil = best(lambda: per_icon_pil(raws))
+            line += f', per-icon PIL {pil * 1000:.2f} ms'
+        photos = len(set(decode_icons(raws)))
+        print(f'{line}; {photos} PhotoImages instead of {count}')
+
+
+if __name__ == '__main__':
+    _benchmark()
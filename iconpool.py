@@ -0,0 +1,190 @@
+import math
+import queue
+import threading
+import time
+
+
+class IconPool:
+    """
+    Loads icons on a bounded pool of worker threads, so one slow
+    executable (a network share, a cold disk) never holds up the list.
+
+    `request(path)` queues `path` unless it is already queued or loading.
+    Each worker takes the queued paths in batches of up to `batch_size`
+    (shared out between the workers) and loads a batch with one
+    `load_many(paths)` call, so extraction can reuse one DC and decode
+    the batch together. The Tk thread calls `drain(on_ready, on_timeout)`
+    from `root.after`: `on_ready(path, result)` for each finished load,
+    and `on_timeout(path)` once for a load still running after `timeout`
+    seconds. A worker can't be interrupted, so a timed-out load keeps its
+    slot and its result is still delivered if it ever finishes.
+    `cancel()` drops every path no worker has taken yet and returns them,
+    so the caller can ask again for those still needed. The workers are
+    only started by the first request.
+    """
+
+    def __init__(self, load_many, workers=4, timeout=3.0, batch_size=32):
+        self.load_many = load_many
+        self.timeout = timeout
+        self.workers = workers
+        self.batch_size = batch_size
+        self.executor = None
+        self.lock = threading.Lock()
+        self.waiting = {}  # path -> None, queued in request order
+        self.pending = set()  # paths queued or loading
+        self.scheduled = 0  # worker tasks submitted but not started
+        self.started = {}  # path -> perf_counter when a worker picked it up
+        self.timed_out = set()
+        self.results = queue.Queue()
+        self.requests = 0
+        self.deduped = 0
+        self.batches = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.timeouts = 0
+
+    def request(self, path):
+        with self.lock:
+            if path in self.pending:
+                self.deduped += 1
+                return
+            self.requests += 1
+            self.pending.add(path)
+            self.waiting[path] = None
+            if self.scheduled >= self.workers:
+                return  # A worker that hasn't started yet will take it
+            if self.executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='icons')
+            self.scheduled += 1
+            self.executor.submit(self._run)
+
+    def _take(self):
+        # Called with the lock held: the next batch, split so every worker
+        # gets a share of a long queue
+        size = min(self.batch_size, max(1, math.ceil(len(self.waiting) / self.workers)))
+        batch = []
+        for path in self.waiting:
+            batch.append(path)
+            if len(batch) == size:
+                break
+        for path in batch:
+            del self.waiting[path]
+        now = time.perf_counter()
+        for path in batch:
+            self.started[path] = now
+        return batch
+
+    def _run(self):
+        with self.lock:
+            self.scheduled -= 1
+            batch = self._take()
+        while batch:
+            try:
+                results = self.load_many(batch)
+            except Exception as e:
+                print(f"Error loading icons for {', '.join(batch)}: {e}")
+                results = [None] * len(batch)
+            with self.lock:
+                self.batches += 1
+                for path in batch:
+                    self.pending.discard(path)
+                    self.started.pop(path, None)
+                    self.timed_out.discard(path)
+            for path, result in zip(batch, results):
+                self.results.put((path, result))
+            with self.lock:
+                batch = self._take()
+
+    def cancel(self):
+        """
+        Drop the loads still waiting for a worker, e.g. because the list is
+        being refreshed, and return their paths. Loads already running
+        finish normally.
+        """
+        with self.lock:
+            cancelled = list(self.waiting)
+            self.waiting.clear()
+            self.pending.difference_update(cancelled)
+            self.cancelled += len(cancelled)
+        return cancelled
+
+    def drain(self, on_ready, on_timeout=None):
+        while True:
+            try:
+                path, result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.completed += 1
+            on_ready(path, result)
+        now = time.perf_counter()
+        with self.lock:
+            late = [path for path, started in self.started.items()
+                    if now - started > self.timeout and path not in self.timed_out]
+            self.timed_out.update(late)
+            self.timeouts += len(late)
+        if on_timeout is not None:
+            for path in late:
+                on_timeout(path)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'deduped': self.deduped,
+            'batches': self.batches,
+            'completed': self.completed,
+            'cancelled': self.cancelled,
+            'timeouts': self.timeouts,
+            'in_flight': len(self.pending),
+        }
+
+    def shutdown(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+
+
+def _benchmark(windows=200, executables=50, latency=0.05, slow=1.0):
+    # Icon extraction is disk-bound on Windows: a cold executable takes tens
+    # of milliseconds and one on a sleeping network drive can take seconds
+    from backend import FakeBackend, set_backend
+    from iconcache import BackendIconExtractor, IconCache
+    backend = FakeBackend(windows=windows, processes=executables)
+    paths = list(backend.icons)
+    backend.icon_latency = {path: latency for path in paths}
+    backend.icon_latency.update({path: slow for path in paths[:2]})
+    set_backend(backend)
+    try:
+        rows = [backend.processes[w.pid].exe for w in backend.windows.values()]
+        start = time.perf_counter()
+        serial = IconCache(BackendIconExtractor())
+        for path in rows:
+            serial.get_bitmap(path)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pool = IconPool(IconCache(BackendIconExtractor()).get_bitmaps)
+        for path in rows:
+            pool.request(path)
+        loaded = set()
+        late = []
+        most = None
+        while len(loaded) < len(paths):
+            pool.drain(lambda path, _: loaded.add(path), late.append)
+            if most is None and sum(path in loaded for path in rows) >= 0.9 * len(rows):
+                most = time.perf_counter() - start
+            time.sleep(0.005)
+        pooled_time = time.perf_counter() - start
+        pool.shutdown()
+    finally:
+        set_backend(None)
+    stats = pool.stats()
+    print(f'{windows} rows over {len(paths)} executables, {latency * 1000:.0f} ms each, two at {slow:.1f} s:')
+    print(f'  serial on the Tk thread: {serial_time:.2f} s blocked')
+    print(f'  pool: 90% of rows in {most:.2f} s, all in {pooled_time:.2f} s, Tk never blocked')
+    print(f'  {stats["requests"]} requests, {stats["deduped"]} deduped, {stats["batches"]} batches, '
+          f'{len(late)} reported late')
+
+
+if __name__ == '__main__':
+    _benchmark()
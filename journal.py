@@ -0,0 +1,203 @@
+import contextlib
+import json
+import os
+import threading
+from collections import namedtuple
+
+# A window's original look, saved before BorderX first changes it
+SavedWindow = namedtuple('SavedWindow', ['hwnd', 'pid', 'create_time', 'style', 'exstyle', 'rect'])
+
+
+class StyleJournal:
+    """
+    Append-only journal of the original style and rect of every window
+    BorderX has changed, so borders can be put back exactly, even after a
+    crash.
+
+    Each change appends one JSON line ("save" before a window is first
+    changed, "drop" once it has been restored); replaying the file rebuilds
+    the live entries. Once the file holds `compact_after` more lines than
+    there are live entries it is rewritten with just the live ones.
+
+    The GUI, the command line and the hotkey daemon share one file. Every
+    lookup first reads what the others appended since, and writes and
+    compaction hold an OS lock on `filename + '.lock'`, so compacting
+    never drops another process's entries. The journal itself isn't kept
+    open between writes, so another process can always replace it.
+    """
+
+    def __init__(self, filename, compact_after=256):
+        self.filename = filename
+        self.compact_after = compact_after
+        self.entries = {}
+        self.lines = 0
+        self.lock = threading.Lock()
+        self.offset = 0  # Bytes of the file replayed so far
+        self.identity = None  # (st_dev, st_ino) of the file replayed
+        self.lock_file = None
+        self._catch_up()
+
+    def _catch_up(self):
+        # Replay the lines appended since the last call; start over if the
+        # file was replaced (compacted by another process) or removed
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            self.entries, self.lines, self.offset, self.identity = {}, 0, 0, None
+            return
+        except OSError as e:
+            print(f"Error reading window journal {self.filename}: {e}")
+            return
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self.identity or stat.st_size < self.offset:
+            self.entries, self.lines, self.offset, self.identity = {}, 0, 0, identity
+        if stat.st_size == self.offset:
+            return
+        try:
+            with open(self.filename, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except OSError as e:
+            print(f"Error reading window journal {self.filename}: {e}")
+            return
+        # A last line without its newline is still being written, or was
+        # cut short by a crash; it is replayed once it is finished
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by a crash
+            self._replay(record)
+            self.lines += 1
+        self.offset += end
+
+    def _replay(self, record):
+        if record.get('op') == 'save':
+            saved = SavedWindow(record['hwnd'], record['pid'], record['create_time'],
+                                record['style'], record['exstyle'], tuple(record['rect']))
+            self.entries[saved.hwnd] = saved
+        elif record.get('op') == 'drop':
+            self.entries.pop(record['hwnd'], None)
+
+    def _append(self, record):
+        # Called with the file lock held and the entries caught up
+        data = (json.dumps(record) + '\n').encode('utf-8')
+        try:
+            with open(self.filename, 'ab') as f:
+                if f.tell() > self.offset:
+                    f.write(b'\n')  # End a line cut short by a crash
+                f.write(data)
+                size = f.tell()
+                stat = os.fstat(f.fileno())
+        except OSError as e:
+            print(f"Error writing window journal {self.filename}: {e}")
+            return
+        self.lines += 1
+        self.offset, self.identity = size, (stat.st_dev, stat.st_ino)
+        if self.lines - len(self.entries) >= self.compact_after:
+            self._compact()
+
+    def __len__(self):
+        with self.lock:
+            self._catch_up()
+            return len(self.entries)
+
+    def get(self, hwnd):
+        with self.lock:
+            self._catch_up()
+            return self.entries.get(hwnd)
+
+    def record(self, saved):
+        with self.lock, self._file_lock():
+            self._catch_up()
+            self.entries[saved.hwnd] = saved
+            record = saved._asdict()
+            record['op'] = 'save'
+            self._append(record)
+
+    def forget(self, hwnd):
+        with self.lock, self._file_lock():
+            self._catch_up()
+            if self.entries.pop(hwnd, None) is not None:
+                self._append({'op': 'drop', 'hwnd': hwnd})
+
+    def compact(self):
+        """
+        Rewrite the journal with only the live entries.
+        """
+        with self.lock, self._file_lock():
+            self._catch_up()
+            self._compact()
+
+    def _compact(self):
+        # Called with the file lock held and the entries caught up
+        tmp = self.filename + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                for saved in self.entries.values():
+                    record = saved._asdict()
+                    record['op'] = 'save'
+                    f.write((json.dumps(record) + '\n').encode('utf-8'))
+                size = f.tell()
+                stat = os.fstat(f.fileno())
+            os.replace(tmp, self.filename)
+        except OSError as e:
+            print(f"Error compacting window journal {self.filename}: {e}")
+            return
+        self.lines = len(self.entries)
+        self.offset, self.identity = size, (stat.st_dev, stat.st_ino)
+
+    def reconcile(self, is_same_window):
+        """
+        Drop entries whose window is gone, checked with
+        `is_same_window(saved)`, and return the ones still live.
+        """
+        with self.lock, self._file_lock():
+            self._catch_up()
+            stale = [hwnd for hwnd, saved in self.entries.items() if not is_same_window(saved)]
+            for hwnd in stale:
+                del self.entries[hwnd]
+            if stale:
+                self._compact()
+            return list(self.entries.values())
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        # Held across processes while appending or compacting. The lock
+        # file is never replaced, so it can stay open
+        if self.lock_file is None:
+            try:
+                self.lock_file = open(self.filename + '.lock', 'a+b')
+            except OSError as e:
+                print(f"Error locking window journal {self.filename}: {e}")
+                yield
+                return
+        f = self.lock_file
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # Retries for ten seconds
+            except OSError as e:
+                print(f"Error locking window journal {self.filename}: {e}")
+                yield
+                return
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def close(self):
+        with self.lock:
+            if self.lock_file is not None:
+                self.lock_file.close()
+                self.lock_file = None
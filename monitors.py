@@ -0,0 +1,82 @@
+import threading
+from collections import namedtuple
+
+# rect and work_area are (x, y, width, height) in virtual-screen pixels
+Monitor = namedtuple('Monitor', ['index', 'rect', 'work_area', 'dpi', 'primary'])
+
+
+def overlap(a, b):
+    """
+    Return the area shared by two (x, y, width, height) rects.
+    """
+    w = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    h = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    return w * h if w > 0 and h > 0 else 0
+
+
+def _distance_sq(rect, x, y):
+    dx = max(rect[0] - x, 0, x - (rect[0] + rect[2]))
+    dy = max(rect[1] - y, 0, y - (rect[1] + rect[3]))
+    return dx * dx + dy * dy
+
+
+def order_monitors(monitors):
+    """
+    Number monitors the way rules refer to them: the primary monitor is 0,
+    the rest follow left to right, then top to bottom.
+    """
+    ordered = sorted(monitors, key=lambda m: (not m.primary, m.rect[0], m.rect[1]))
+    return [m._replace(index=i) for i, m in enumerate(ordered)]
+
+
+class MonitorTopology:
+    """
+    Cached monitor layout. Built on first use from `load()`, which returns
+    a list of Monitors, and rebuilt only after `invalidate()` (called on
+    display-change notifications).
+    """
+
+    def __init__(self, load):
+        self.load = load
+        self.lock = threading.Lock()
+        self.cached = None
+        self.builds = 0
+
+    def invalidate(self):
+        with self.lock:
+            self.cached = None
+
+    def monitors(self):
+        with self.lock:
+            if self.cached is None:
+                self.cached = order_monitors(self.load())
+                self.builds += 1
+            return self.cached
+
+    def get(self, index):
+        """
+        Return monitor `index`, or the primary monitor if there is no such
+        monitor.
+        """
+        monitors = self.monitors()
+        if index is not None and 0 <= index < len(monitors):
+            return monitors[index]
+        return monitors[0]
+
+    def monitor_for_rect(self, rect):
+        """
+        Return the monitor sharing the most area with `rect`, or the one
+        nearest to its centre if it is off screen.
+        """
+        monitors = self.monitors()
+        best, best_area = None, 0
+        for monitor in monitors:
+            area = overlap(monitor.rect, rect)
+            if area == rect[2] * rect[3] and area:
+                return monitor  # Entirely on this monitor
+            if area > best_area:
+                best, best_area = monitor, area
+        if best is not None:
+            return best
+        cx, cy = rect[0] + rect[2] // 2, rect[1] + rect[3] // 2
+        return min(monitors, key=lambda m: _distance_sq(m.rect, cx, cy))
@@ -0,0 +1,15 @@
+import os
+
+
+def data_dir():
+    """
+    Return the per-user directory BorderX keeps its caches and state in,
+    creating it if needed.
+    """
+    base = os.environ.get('LOCALAPPDATA')
+    if base:
+        path = os.path.join(base, 'BorderX')
+    else:
+        path = os.path.join(os.path.expanduser('~'), '.borderx')
+    os.makedirs(path, exist_ok=True)
+    return path
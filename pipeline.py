@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+
+
+class RefreshPipeline:
+    """
+    Runs a scan on a worker thread and streams what it yields back to the
+    Tk thread in batches.
+
+    `scan(cancelled)` is a generator that runs on the worker and should
+    stop early once the `cancelled` event is set. Starting a new refresh
+    cancels the one in flight, and anything it already queued is dropped.
+    The Tk thread calls `drain()` from `root.after` to consume results.
+    """
+
+    def __init__(self, scan, batch_size=16):
+        self.scan = scan
+        self.batch_size = batch_size
+        self.queue = queue.Queue()
+        self.generation = 0
+        self.cancelled = None
+        self.running = False
+        self.started_at = 0.0
+        self.first_batch_at = None
+        self.longest_drain = 0.0
+
+    def start(self):
+        if self.cancelled is not None:
+            self.cancelled.set()
+        self.generation += 1
+        self.cancelled = threading.Event()
+        self.running = True
+        self.started_at = time.perf_counter()
+        self.first_batch_at = None
+        self.longest_drain = 0.0
+        worker = threading.Thread(target=self._run, args=(self.generation, self.cancelled), daemon=True)
+        worker.start()
+        return self.generation
+
+    def _run(self, generation, cancelled):
+        batch = []
+        try:
+            for item in self.scan(cancelled):
+                if cancelled.is_set():
+                    return
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    self.queue.put((generation, batch))
+                    batch = []
+        except Exception as e:
+            print(f"Error scanning windows: {e}")
+        if not cancelled.is_set():
+            if batch:
+                self.queue.put((generation, batch))
+            self.queue.put((generation, None))  # End of this refresh
+
+    def drain(self, on_batch, on_done, budget=0.008):
+        """
+        Hand queued batches to `on_batch(items)` for at most `budget`
+        seconds, then call `on_done()` once the current refresh has
+        finished. Returns True while there is more to come.
+        """
+        began = time.perf_counter()
+        while self.running and time.perf_counter() - began < budget:
+            try:
+                generation, batch = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                continue  # Left over from a cancelled refresh
+            if batch is None:
+                self.running = False
+                on_done()
+            else:
+                if self.first_batch_at is None:
+                    self.first_batch_at = time.perf_counter()
+                on_batch(batch)
+        self.longest_drain = max(self.longest_drain, time.perf_counter() - began)
+        return self.running
+
+    def stats(self):
+        first = self.first_batch_at - self.started_at if self.first_batch_at else None
+        return {
+            'time_to_first_row_ms': round(first * 1000, 1) if first is not None else None,
+            'total_ms': round((time.perf_counter() - self.started_at) * 1000, 1),
+            'longest_ui_stall_ms': round(self.longest_drain * 1000, 1),
+        }
@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+from profiler import profiler
+
+ProcessInfo = namedtuple('ProcessInfo', ['pid', 'name', 'exe', 'create_time'])
+
+
+class ProcessSnapshot:
+    """
+    pid -> ProcessInfo for every running process, gathered in one pass.
+
+    Call `refresh()` once per window-list refresh. Entries whose
+    (pid, create_time) hasn't changed are carried over without asking the
+    process for its name and executable again; processes that have exited
+    are dropped.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.processes = {}
+
+    def _backend(self):
+        if self.backend is None:
+            from backend import get_backend
+            return get_backend()
+        return self.backend
+
+    def refresh(self):
+        backend = self._backend()
+        processes = {}
+        with profiler.stage('list_processes'):
+            listed = backend.list_processes()
+        for pid, create_time in listed:
+            known = self.processes.get(pid)
+            if known is not None and known.create_time == create_time:
+                processes[pid] = known
+                continue
+            with profiler.stage('describe_process'):
+                info = backend.describe_process(pid)
+            if info is not None:
+                # Keep the listed create_time so the entry is reused next time
+                processes[pid] = info._replace(create_time=create_time)
+        self.processes = processes
+        return self
+
+    def get(self, pid):
+        return self.processes.get(pid)
+
+    def resolve(self, pid):
+        """
+        Like `get()`, but queries a process started since the last refresh
+        and adds it to the snapshot.
+        """
+        info = self.processes.get(pid)
+        if info is None:
+            info = self._backend().describe_process(pid)
+            if info is not None:
+                self.processes[pid] = info
+        return info
+
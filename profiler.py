@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+
+# Returned by stage() while profiling is off, so a disabled profiler costs
+# one method call per stage
+_OFF = nullcontext()
+
+
+class _Timer:
+    __slots__ = ('profiler', 'name', 'exe', 'window', 'started')
+
+    def __init__(self, profiler, name, exe, window):
+        self.profiler = profiler
+        self.name = name
+        self.exe = exe
+        self.window = window
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.started, self.exe, self.window)
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _slowest(totals, top):
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{'name': str(name), 'total_ms': round(seconds * 1000, 3)} for name, seconds in ranked]
+
+
+class Profiler:
+    """
+    Per-stage timers for the refresh and toggle paths.
+
+        with profiler.stage('icon_bits', exe=path):
+            ...
+
+    Each stage keeps a call count, total time and its latest `keep`
+    samples for the p50/p95/max. Time is also totalled per executable and
+    per window to find the expensive apps.
+    """
+
+    def __init__(self, keep=4096):
+        self.enabled = False
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = defaultdict(int)
+            self.totals = defaultdict(float)
+            self.samples = defaultdict(lambda: deque(maxlen=self.keep))
+            self.exes = defaultdict(float)  # exe -> total seconds
+            self.windows = defaultdict(float)  # window -> total seconds
+            self.started_at = time.time()
+
+    def stage(self, name, exe=None, window=None):
+        if not self.enabled:
+            return _OFF
+        return _Timer(self, name, exe, window)
+
+    def record(self, name, seconds, exe=None, window=None):
+        with self.lock:
+            self.counts[name] += 1
+            self.totals[name] += seconds
+            self.samples[name].append(seconds)
+            if exe is not None:
+                self.exes[exe] += seconds
+            if window is not None:
+                self.windows[window] += seconds
+
+    def report(self, top=10):
+        with self.lock:
+            stages = {}
+            for name, samples in self.samples.items():
+                ordered = sorted(samples)
+                stages[name] = {
+                    'count': self.counts[name],
+                    'total_ms': round(self.totals[name] * 1000, 3),
+                    'p50_ms': round(_percentile(ordered, 0.50) * 1000, 3),
+                    'p95_ms': round(_percentile(ordered, 0.95) * 1000, 3),
+                    'max_ms': round(ordered[-1] * 1000, 3),
+                }
+            return {
+                'started_at': self.started_at,
+                'stages': stages,
+                'slowest_exes': _slowest(self.exes, top),
+                'slowest_windows': _slowest(self.windows, top),
+            }
+
+    def dump(self, filename):
+        """
+        Write `report()` to `filename` as JSON. Returns True on success.
+        """
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=2)
+        except OSError as e:
+            print(f"Error writing profile {filename}: {e}")
+            return False
+        return True
+
+
+profiler = Profiler()
@@ -0,0 +1,87 @@
+class WindowRecord:
+    """
+    What BorderX knows about one top-level window.
+    """
+    __slots__ = ('hwnd', 'pid', 'exe', 'title', 'window_class')
+
+    def __init__(self, hwnd, pid, exe, title, window_class=None):
+        self.hwnd = hwnd
+        self.pid = pid
+        self.exe = exe
+        self.title = title
+        self.window_class = window_class
+
+    def __repr__(self):
+        return (f'WindowRecord(hwnd={self.hwnd}, pid={self.pid}, exe={self.exe!r}, '
+                f'title={self.title!r}, window_class={self.window_class!r})')
+
+
+class WindowRegistry:
+    """
+    The windows currently in the list, indexed by hwnd with secondary
+    indexes by pid, executable and title. Only touched from the Tk thread.
+    """
+
+    def __init__(self):
+        self.by_hwnd = {}
+        self.by_pid = {}
+        self.by_exe = {}
+        self.by_title = {}
+
+    def __len__(self):
+        return len(self.by_hwnd)
+
+    def __contains__(self, hwnd):
+        return hwnd in self.by_hwnd
+
+    def get(self, hwnd):
+        return self.by_hwnd.get(hwnd)
+
+    def with_pid(self, pid):
+        return [self.by_hwnd[h] for h in self.by_pid.get(pid, ())]
+
+    def with_exe(self, exe):
+        return [self.by_hwnd[h] for h in self.by_exe.get(exe.lower(), ())]
+
+    def with_title(self, title):
+        return [self.by_hwnd[h] for h in self.by_title.get(title, ())]
+
+    def add(self, record):
+        """
+        Add `record`, replacing any existing record for the same hwnd.
+        """
+        self.remove(record.hwnd)
+        self.by_hwnd[record.hwnd] = record
+        _index(self.by_pid, record.pid, record.hwnd)
+        _index(self.by_exe, record.exe.lower() if record.exe else None, record.hwnd)
+        _index(self.by_title, record.title, record.hwnd)
+
+    def remove(self, hwnd):
+        """
+        Forget `hwnd`, returning its record if it was known.
+        """
+        record = self.by_hwnd.pop(hwnd, None)
+        if record is not None:
+            _unindex(self.by_pid, record.pid, hwnd)
+            _unindex(self.by_exe, record.exe.lower() if record.exe else None, hwnd)
+            _unindex(self.by_title, record.title, hwnd)
+        return record
+
+    def prune(self, live_hwnds):
+        """
+        Forget every window not in `live_hwnds` and return their records.
+        """
+        stale = [hwnd for hwnd in self.by_hwnd if hwnd not in live_hwnds]
+        return [self.remove(hwnd) for hwnd in stale]
+
+
+def _index(index, key, hwnd):
+    index.setdefault(key, set()).add(hwnd)
+
+
+def _unindex(index, key, hwnd):
+    hwnds = index.get(key)
+    if hwnds is not None:
+        hwnds.discard(hwnd)
+        if not hwnds:
+            del index[key]
@@ -0,0 +1,459 @@
+"""
+Record a real BorderX session and replay it anywhere.
+
+Recording (`borderx.py --record session.bxt`, or `borderx-cli --record
+session.bxt ...`) wraps the backend so every call is written to a
+gzip-compressed trace with its arguments, result and duration, along with
+window events and a mark for each refresh and toggle.
+
+Replaying feeds the trace through the window list, process lookup and
+toggle code against a ReplayBackend, an in-memory desktop that changes as
+the recorded one did, and reports the throughput and latency of each
+operation next to what was recorded:
+
+    python replay.py session.bxt [--speed 1.0] [--json]
+    python replay.py --synthetic churn.bxt
+
+Without --speed the trace runs as fast as possible; with it, records are
+replayed on their original schedule (scaled) and backend calls take their
+recorded time.
+"""
+import gzip
+import json
+import ntpath
+import time
+from collections import defaultdict
+
+from backend import WS_EX_TOOLWINDOW, WS_OVERLAPPEDWINDOW, WS_VISIBLE, FakeBackend, FakeWindow
+from monitors import Monitor
+from procsnap import ProcessInfo
+from tracing import FORMAT, VERSION, RecordingBackend, trace
+
+
+def _decode_bits(value):
+    if isinstance(value, dict):
+        return bytes(value['bytes'])
+    return value
+
+
+def read_trace(filename):
+    """
+    Yield the records of a trace, checking its header.
+    """
+    with gzip.open(filename, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline() or 'null')
+        if not isinstance(header, dict) or header.get('format') != FORMAT:
+            raise ValueError(f"{filename} is not a BorderX trace")
+        if header.get('version') != VERSION:
+            raise ValueError(f"{filename} is trace version {header.get('version')}, expected {VERSION}")
+        for line in f:
+            yield json.loads(line)
+
+
+class ReplayBackend(FakeBackend):
+    """
+    A FakeBackend whose desktop is rebuilt from recorded call results by
+    `observe()`. Calls the recorded session never made are answered from
+    the latest state. With `cost_scale` set, each call sleeps for the
+    average time that call took when recorded, times the scale.
+    """
+
+    def __init__(self, cost_scale=0.0):
+        super().__init__(windows=0, processes=0)
+        self.processes = {}
+        self.icons = {}
+        self.cost_scale = cost_scale
+        self.costs = defaultdict(lambda: [0.0, 0])  # method -> [total seconds, calls]
+        self.owed = 0.0
+
+    def _call(self, name):
+        with self.lock:
+            self.calls[name] += 1
+        if self.cost_scale:
+            total, count = self.costs.get(name, (0.0, 0))
+            if count:
+                # Most calls take microseconds, less than a sleep can; pay
+                # them off a millisecond at a time
+                self.owed += total / count * self.cost_scale
+                if self.owed >= 0.001:
+                    started = time.perf_counter()
+                    time.sleep(self.owed)
+                    self.owed -= time.perf_counter() - started
+
+    def _window(self, hwnd):
+        window = self.windows.get(hwnd)
+        if window is None:
+            window = FakeWindow(hwnd, 0, '', '', WS_OVERLAPPEDWINDOW | WS_VISIBLE, (0, 0, 800, 600))
+            self.windows[hwnd] = window
+        return window
+
+    def observe(self, name, args, result, duration):
+        cost = self.costs[name]
+        cost[0] += duration
+        cost[1] += 1
+        handler = getattr(self, '_observe_' + name, None)
+        if handler is not None:
+            handler(args, result)
+
+    def _observe_enum_windows(self, args, result):
+        listed = {hwnd: title for hwnd, title in result}
+        for hwnd, window in self.windows.items():
+            window.visible = hwnd in listed
+        for hwnd, title in listed.items():
+            self._window(hwnd).title = title
+
+    def _observe_list_windows(self, args, result):
+        listed = {row[0]: row for row in result}
+        for hwnd, window in self.windows.items():
+            window.visible = hwnd in listed
+        for hwnd, pid, title, window_class, rect in listed.values():
+            window = self._window(hwnd)
+            window.pid, window.title, window.window_class, window.rect = pid, title, window_class, tuple(rect)
+            window.exstyle &= ~WS_EX_TOOLWINDOW
+            window.cloaked = False
+
+    def _observe_is_cloaked(self, args, result):
+        self._window(args[0]).cloaked = result
+
+    def _observe_get_pid(self, args, result):
+        self._window(args[0]).pid = result
+
+    def _observe_get_title(self, args, result):
+        self._window(args[0]).title = result
+
+    def _observe_get_class(self, args, result):
+        self._window(args[0]).window_class = result
+
+    def _observe_is_window(self, args, result):
+        if not result:
+            self.remove_window(args[0])
+
+    def _observe_is_visible(self, args, result):
+        self._window(args[0]).visible = result
+
+    def _observe_get_style(self, args, result):
+        self._window(args[0]).style = result
+
+    def _observe_get_exstyle(self, args, result):
+        self._window(args[0]).exstyle = result
+
+    def _observe_get_window_rect(self, args, result):
+        self._window(args[0]).rect = tuple(result)
+
+    def _observe_get_foreground(self, args, result):
+        self.foreground = result
+
+    def _observe_screen_size(self, args, result):
+        self.screen = tuple(result)
+
+    def _observe_monitors(self, args, result):
+        self.monitor_layout = [Monitor(index, tuple(rect), tuple(work_area), dpi, primary)
+                               for index, rect, work_area, dpi, primary in result]
+
+    def _observe_list_processes(self, args, result):
+        listed = dict(result)
+        processes = {}
+        for pid, create_time in listed.items():
+            info = self.processes.get(pid)
+            if info is None or info.create_time != create_time:
+                info = ProcessInfo(pid, None, None, create_time)
+            processes[pid] = info
+        self.processes = processes
+        self.denied &= set(processes)
+
+    def _observe_describe_process(self, args, result):
+        pid = args[0]
+        if result is None:
+            self.processes.pop(pid, None)
+            return
+        info = ProcessInfo(*result)
+        if info.name is None:
+            self.denied.add(pid)
+            known = self.processes.get(pid)
+            self.processes[pid] = known or info
+        else:
+            self.denied.discard(pid)
+            self.processes[pid] = info
+
+    def _observe_process_started(self, args, result):
+        info = self.processes.get(args[0])
+        if result is not None and info is None:
+            self.processes[args[0]] = ProcessInfo(args[0], None, None, result)
+
+    def _observe_process_image(self, args, result):
+        pid = args[0]
+        if result is None:
+            return
+        info = self.processes.get(pid) or ProcessInfo(pid, None, None, None)
+        self.processes[pid] = info._replace(name=info.name or ntpath.basename(result), exe=result)
+
+    def _observe_icon_bits(self, args, result):
+        self.icons[args[0]] = tuple(_decode_bits(part) for part in result) if result else None
+
+    def _observe_icon_bits_many(self, args, result):
+        for path, bits in zip(args[0], result):
+            self._observe_icon_bits((path,), bits)
+
+    def _observe_file_stamp(self, args, result):
+        if result is not None and args[0] not in self.icons:
+            self.icons[args[0]] = None
+
+
+class Replayer:
+    """
+    Runs the recorded operations against a ReplayBackend: each refresh
+    mark becomes a window-list pass (process snapshot, classification and
+    registry update, as `scan_windows` does), each burst of window events
+    goes through the EventCoalescer and is resolved as
+    `poll_window_events` does, and each toggle mark re-runs its winops
+    call.
+    """
+
+    def __init__(self, speed=None):
+        import winops
+        from backend import set_backend
+        from classifier import ProcessClassifier
+        from procsnap import ProcessSnapshot
+        from profiler import Profiler
+        from registry import WindowRegistry
+        from winevents import EventCoalescer
+
+        self.speed = speed
+        self.backend = ReplayBackend(cost_scale=1.0 / speed if speed else 0.0)
+        set_backend(self.backend)
+        winops.set_journal(None)
+        winops.monitor_topology = None
+        self.winops = winops
+        self.snapshot = ProcessSnapshot(self.backend)
+        self.classifier = ProcessClassifier(backend=self.backend)
+        self.registry = WindowRegistry()
+        self.coalescer = EventCoalescer(debounce=0.0, max_delay=0.0)
+        self.replayed = Profiler()
+        self.recorded = Profiler()
+        self.replayed.enabled = self.recorded.enabled = True
+        self.events = 0
+
+    def run(self, records):
+        started = time.perf_counter()
+        pending_events = False
+        for record in records:
+            kind = record[0]
+            if self.speed:
+                delay = record[1] / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            if kind != 'e' and pending_events:
+                self._flush_events()
+                pending_events = False
+            if kind == 'c':
+                _, _, name, args, result, duration = record
+                self.backend.observe(name, args, result, duration)
+            elif kind == 'e':
+                from winevents import WindowEvent
+                self.coalescer.push(WindowEvent(record[2], record[3]))
+                self.events += 1
+                pending_events = True
+            elif kind == 'm':
+                _, _, action, args, duration = record
+                self.recorded.record(action, duration)
+                with self.replayed.stage(action):
+                    self._run_mark(action, args)
+        if pending_events:
+            self._flush_events()
+        return time.perf_counter() - started
+
+    def _describe(self, hwnd, title):
+        if not title or not self.winops.is_listable_window(hwnd):
+            return None
+        return self._classify(hwnd, title, self.backend.get_pid(hwnd), self.backend.get_class(hwnd))
+
+    def _classify(self, hwnd, title, pid, window_class):
+        from registry import WindowRecord
+        verdict = self.classifier.classify(self.snapshot.resolve(pid), window_class)
+        return WindowRecord(hwnd, pid, verdict.exe, title, window_class) if verdict.allowed else None
+
+    def _run_mark(self, action, args):
+        winops = self.winops
+        try:
+            if action == 'refresh':
+                windows = winops.get_window_list()
+                self.snapshot.refresh()
+                self.classifier.prune(self.snapshot.processes)
+                live = set()
+                for hwnd, pid, title, window_class, _ in windows.rows():
+                    record = self._classify(hwnd, title, pid, window_class)
+                    if record is not None:
+                        self.registry.add(record)
+                        live.add(hwnd)
+                self.registry.prune(live)
+            elif action == 'make_borderless':
+                winops.make_borderless(args[0], tuple(args[1]))
+            elif action == 'restore_borders':
+                winops.restore_borders(args[0], tuple(args[1]) if args[1] else None)
+            elif action == 'apply_many':
+                winops.apply_many(args[0], args[1])
+            elif action == 'restore_many':
+                winops.restore_many(args[0])
+        except Exception as e:
+            print(f"Error replaying {action}: {e}")
+
+    def _flush_events(self):
+        batch = self.coalescer.flush(force=True)
+        if not batch:
+            return
+        removed, dirty = batch
+        with self.replayed.stage('window_events'):
+            for hwnd in removed:
+                self.registry.remove(hwnd)
+            for hwnd in dirty:
+                record = None
+                if self.winops.is_live_window(hwnd):
+                    record = self._describe(hwnd, self.winops.get_window_text(hwnd))
+                if record is not None:
+                    self.registry.add(record)
+                else:
+                    self.registry.remove(hwnd)
+
+    def report(self, elapsed):
+        replayed = self.replayed.report()['stages']
+        recorded = self.recorded.report()['stages']
+        operations = sum(stage['count'] for stage in replayed.values())
+        return {
+            'elapsed_ms': round(elapsed * 1000, 3),
+            'operations': operations,
+            'operations_per_s': round(operations / elapsed, 1) if elapsed else None,
+            'window_events': self.events,
+            'windows_listed': len(self.registry),
+            'backend_calls': sum(self.backend.calls.values()),
+            'replayed': replayed,
+            'recorded': recorded,
+        }
+
+
+def replay(filename, speed=None):
+    """
+    Replay the trace in `filename` and return the report.
+    """
+    replayer = Replayer(speed)
+    elapsed = replayer.run(read_trace(filename))
+    return replayer.report(elapsed)
+
+
+def record_synthetic(filename, windows=300, rounds=20, seed=0):
+    """
+    Record a session against a FakeBackend with churn: windows opening,
+    closing and retitling and processes coming and going between
+    refreshes, with toggles in between. A stand-in for a real trace when
+    there is no Windows machine to record on.
+    """
+    import random
+    import winops
+    from backend import set_backend
+    from procsnap import ProcessSnapshot
+    from classifier import ProcessClassifier
+    from winevents import WindowEvent
+
+    rng = random.Random(seed)
+    fake = FakeBackend(windows=windows, latency=0.0, seed=seed)
+    recorder = trace
+    backend = RecordingBackend(fake, recorder)
+    set_backend(backend)
+    winops.set_journal(None)
+    winops.monitor_topology = None
+    snapshot = ProcessSnapshot(backend)
+    classifier = ProcessClassifier(backend=backend)
+    recorder.start(filename)
+    next_hwnd = max(fake.windows) + 2
+    try:
+        for _ in range(rounds):
+            with recorder.mark('refresh'):
+                listed = winops.get_window_list()
+                snapshot.refresh()
+                for _, pid, _, window_class, _ in listed.rows():
+                    classifier.classify(snapshot.resolve(pid), window_class)
+            for _ in range(rng.randrange(5, 30)):
+                roll = rng.random()
+                if roll < 0.4 and fake.windows:
+                    # Electron-style helpers retitling themselves
+                    hwnd = rng.choice(list(fake.windows))
+                    fake.windows[hwnd].title = f'Window {hwnd} ({rng.randrange(100)}%)'
+                    recorder.event(WindowEvent('name', hwnd))
+                    _look_up(backend, hwnd)
+                elif roll < 0.7:
+                    hwnd = next_hwnd
+                    next_hwnd += 2
+                    fake.add_window(FakeWindow(hwnd, rng.choice(list(fake.processes)), f'Helper {hwnd}',
+                                               'Chrome_WidgetWin_1', WS_OVERLAPPEDWINDOW | WS_VISIBLE, (0, 0, 640, 480)))
+                    recorder.event(WindowEvent('create', hwnd))
+                    _look_up(backend, hwnd)
+                elif fake.windows:
+                    hwnd = rng.choice(list(fake.windows))
+                    fake.remove_window(hwnd)
+                    recorder.event(WindowEvent('destroy', hwnd))
+            if rng.random() < 0.3:
+                # A process exits and another starts in its place
+                pid = rng.choice(list(fake.processes))
+                info = fake.processes.pop(pid)
+                fake.processes[pid + 2] = info._replace(pid=pid + 2, create_time=info.create_time + 1)
+            # winops marks its own toggles
+            hwnd = rng.choice(list(fake.windows))
+            winops.make_borderless(hwnd, winops.fullscreen_rect(hwnd))
+            winops.restore_borders(hwnd, winops.fullscreen_rect(hwnd))
+            batch = rng.sample(list(fake.windows), min(10, len(fake.windows)))
+            winops.apply_many(batch)
+            winops.restore_many(batch)
+    finally:
+        recorder.stop()
+    return recorder.records
+
+
+def _look_up(backend, hwnd):
+    # The calls the GUI makes for a window an event names
+    if backend.is_window(hwnd) and backend.is_visible(hwnd):
+        backend.get_title(hwnd)
+        backend.get_exstyle(hwnd)
+        backend.is_cloaked(hwnd)
+        backend.get_pid(hwnd)
+        backend.get_class(hwnd)
+
+
+def _format(report):
+    lines = [f"{report['operations']} operations in {report['elapsed_ms']:.1f} ms "
+             f"({report['operations_per_s']}/s), {report['window_events']} window events, "
+             f"{report['backend_calls']} backend calls, {report['windows_listed']} windows listed"]
+    lines.append(f"{'operation':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'recorded p50':>14}")
+    for name, stage in sorted(report['replayed'].items()):
+        recorded = report['recorded'].get(name)
+        lines.append(f"{name:<16}{stage['count']:>7}{stage['p50_ms']:>10.3f}{stage['p95_ms']:>10.3f}"
+                     f"{stage['max_ms']:>10.3f}{recorded['p50_ms'] if recorded else '-':>14}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(prog='replay', description="Replay a recorded BorderX session.")
+    parser.add_argument('trace', help="Trace file written by --record")
+    parser.add_argument('--speed', type=float, help="Replay on the recorded schedule, this many times faster")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    parser.add_argument('--synthetic', action='store_true', help="Record a synthetic session to TRACE first")
+    args = parser.parse_args(argv)
+    if args.synthetic:
+        started = time.perf_counter()
+        records = record_synthetic(args.trace)
+        print(f"Recorded {records} records in {(time.perf_counter() - started) * 1000:.0f} ms")
+    try:
+        report = replay(args.trace, args.speed)
+    except (OSError, ValueError) as e:
+        print(f"Error replaying {args.trace}: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        print(_format(report))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,430 @@
+"""
+Local control endpoint for a running BorderX, so scripts can drive it
+without a second copy of the GUI.
+
+Requests and responses are JSON-RPC 2.0 objects, one per line, over a
+named pipe on Windows or a Unix socket elsewhere:
+
+    {"jsonrpc": "2.0", "id": 1, "method": "apply", "params": {"hwnd": 1234}}
+    {"jsonrpc": "2.0", "id": 1, "result": {"hwnd": 1234, "borderless": true}}
+
+After `subscribe` the connection also receives window events as
+notifications ({"jsonrpc": "2.0", "method": "event", "params": {...}}).
+Run this module for a load test against the fake backend:
+
+    python rpc.py
+"""
+import asyncio
+import getpass
+import io
+import itertools
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+from paths import data_dir
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# A subscriber this far behind on events is disconnected
+MAX_BACKLOG = 1 << 20
+
+
+def default_address():
+    if sys.platform == 'win32':
+        return rf'\\.\pipe\BorderX-{getpass.getuser()}'
+    return os.path.join(data_dir(), 'borderx.sock')
+
+
+def _listening(address):
+    # True if a server already answers on `address`
+    if sys.platform == 'win32':
+        try:
+            open(address, 'r+b', buffering=0).close()
+        except FileNotFoundError:
+            return False
+        except OSError:
+            return True  # Every pipe instance is busy
+        return True
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(address)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def _error(request_id, code, message):
+    return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+
+class RpcServer:
+    """
+    Serves `handlers` (method name -> function taking the request's params
+    as keyword arguments) from an asyncio loop on its own thread.
+
+    Handlers never run on that thread: each call is queued and run by
+    `drain()` on the Tk thread, and the result is handed back to the loop.
+    `notify()`, if given, is called from the loop thread whenever a call
+    is queued, to get the Tk thread to drain. `publish(event)` sends an event to every
+    subscribed client and may be called from any thread.
+    """
+
+    def __init__(self, handlers, address=None, notify=None):
+        self.handlers = handlers
+        self.notify = notify
+        self.address = address or default_address()
+        self.calls = queue.Queue()
+        self.subscribers = set()
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.stopping = None
+        self.error = None
+        self.clients = 0
+        self.requests = 0
+        self.errors = 0
+        self.events = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='rpc', daemon=True)
+        self.thread.start()
+        self.ready.wait(2.0)
+        if self.error is not None:
+            print(f"Error starting control endpoint {self.address}: {self.error}")
+        return self.error is None
+
+    def _run(self):
+        try:
+            asyncio.run(self._serve())
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+
+    async def _serve(self):
+        if _listening(self.address):
+            raise RuntimeError("BorderX is already running")
+        self.loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+        if sys.platform == 'win32':
+            def protocol():
+                return asyncio.StreamReaderProtocol(asyncio.StreamReader(), self._client)
+            servers = await self.loop.start_serving_pipe(protocol, self.address)
+        else:
+            if os.path.exists(self.address):
+                os.unlink(self.address)  # Nobody listening: left by a copy that crashed
+            servers = [await asyncio.start_unix_server(self._client, self.address)]
+        self.ready.set()
+        try:
+            await self.stopping.wait()
+        finally:
+            for server in servers:
+                server.close()
+            for writer in list(self.subscribers):
+                writer.close()
+            if sys.platform != 'win32' and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def stop(self):
+        if self.loop is not None and self.stopping is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.stopping.set)
+            except RuntimeError:
+                return  # Loop already closed
+            self.thread.join(1.0)
+
+    async def _client(self, reader, writer):
+        self.clients += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._dispatch(line, writer)
+                if response is not None:
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # Client went away, or sent a line over the stream limit
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, line, writer):
+        self.requests += 1
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self.errors += 1
+            return _error(None, PARSE_ERROR, "Parse error")
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            self.errors += 1
+            return _error(None, INVALID_REQUEST, "Invalid request")
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params') or {}
+        if not isinstance(params, dict):
+            self.errors += 1
+            return _error(request_id, INVALID_PARAMS, "params must be an object")
+        if method == 'subscribe':
+            self.subscribers.add(writer)
+            result = True
+        elif method in self.handlers:
+            future = self.loop.create_future()
+            self.calls.put((self.handlers[method], params, future))
+            if self.notify is not None:
+                self.notify()
+            try:
+                result = await future
+            except TypeError as e:
+                self.errors += 1
+                return _error(request_id, INVALID_PARAMS, str(e))
+            except Exception as e:
+                self.errors += 1
+                return _error(request_id, SERVER_ERROR, str(e))
+        else:
+            self.errors += 1
+            return _error(request_id, METHOD_NOT_FOUND, f"Unknown method {method!r}")
+        if request_id is None:
+            return None  # A notification; no reply wanted
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    def drain(self, budget=None):
+        """
+        Run the queued calls; must be called on the thread that owns the
+        windows (the Tk thread). With a `budget` in seconds, stop once it
+        is used up and return True if calls are left.
+        """
+        started = time.perf_counter()
+        while True:
+            try:
+                handler, params, future = self.calls.get_nowait()
+            except queue.Empty:
+                return False
+            try:
+                result, error = handler(**params), None
+            except Exception as e:
+                result, error = None, e
+            try:
+                self.loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                return False  # Server stopped while the call was queued
+            if budget is not None and time.perf_counter() - started >= budget:
+                return not self.calls.empty()
+
+    def publish(self, event):
+        if self.subscribers and self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._broadcast, event)
+            except RuntimeError:
+                pass
+
+    def _broadcast(self, event):
+        data = json.dumps({'jsonrpc': '2.0', 'method': 'event', 'params': event}).encode() + b'\n'
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(data)
+            self.events += 1
+
+    def stats(self):
+        return {
+            'clients': self.clients,
+            'requests': self.requests,
+            'errors': self.errors,
+            'subscribers': len(self.subscribers),
+            'events': self.events,
+        }
+
+
+def _resolve(future, result, error):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class RpcClient:
+    """
+    Blocking client for scripts:
+
+        with RpcClient() as client:
+            client.call('apply_many', hwnds=[...], monitor=1)
+    """
+
+    def __init__(self, address=None):
+        address = address or default_address()
+        self.sock = None
+        if sys.platform == 'win32':
+            raw = open(address, 'r+b', buffering=0)
+            self.send = raw.write
+            self.reader = io.BufferedReader(raw)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(address)
+            self.send = sock.sendall
+            self.reader = sock.makefile('rb')
+            self.sock = sock
+        self.ids = itertools.count(1)
+        self.pending_events = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.reader.close()
+        if self.sock is not None:
+            self.sock.close()
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("BorderX closed the connection")
+        return json.loads(line)
+
+    def call(self, method, **params):
+        request_id = next(self.ids)
+        self.send(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}).encode() + b'\n')
+        while True:
+            message = self._read()
+            if message.get('id') == request_id:
+                break
+            if message.get('method') == 'event':
+                self.pending_events.append(message['params'])
+        if 'error' in message:
+            raise RpcError(message['error']['code'], message['error']['message'])
+        return message['result']
+
+    def events(self):
+        """
+        Yield window events forever; call `subscribe` first.
+        """
+        while True:
+            while self.pending_events:
+                yield self.pending_events.pop(0)
+            message = self._read()
+            if message.get('method') == 'event':
+                yield message['params']
+
+
+async def _open_connection(address):
+    if sys.platform == 'win32':
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        protocol = asyncio.StreamReaderProtocol(reader)
+        transport, _ = await loop.create_pipe_connection(lambda: protocol, address)
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+    return await asyncio.open_unix_connection(address)
+
+
+def _benchmark(clients=(1, 8, 32), requests=200, poll_ms=5):
+    import tempfile
+    import time
+    import winops
+    from backend import FakeBackend, set_backend
+    from uiqueue import ONCE, UiQueue
+
+    backend = FakeBackend(windows=200)
+    set_backend(backend)
+    hwnds = list(backend.windows)
+    handlers = {
+        'list': lambda: [{'hwnd': hwnd, 'title': title} for hwnd, title in backend.enum_windows()],
+        'apply': lambda hwnd: winops.make_borderless(hwnd, winops.fullscreen_rect(hwnd)),
+        'restore': lambda hwnd: winops.restore_borders(hwnd, winops.fullscreen_rect(hwnd)),
+        'apply_many': lambda hwnds: winops.apply_many(hwnds),
+    }
+
+    async def client(address, count, latencies):
+        reader, writer = await _open_connection(address)
+        for i in range(count):
+            method, params = [('list', {}), ('apply', {'hwnd': hwnds[i % len(hwnds)]}),
+                              ('restore', {'hwnd': hwnds[i % len(hwnds)]}),
+                              ('apply_many', {'hwnds': hwnds[i % 50:i % 50 + 10]})][i % 4]
+            started = time.perf_counter()
+            writer.write(json.dumps({'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}).encode() + b'\n')
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - started)
+            assert 'result' in response, response
+        writer.close()
+
+    async def run(address, count):
+        latencies = []
+        await asyncio.gather(*(client(address, requests, latencies) for _ in range(count)))
+        return latencies
+
+    async def burst(address, count):
+        # Each connection's calls run one at a time, so open `count` of
+        # them and send one call on each: they all queue up for the UI
+        # thread at once
+        connections = [await _open_connection(address) for _ in range(count)]
+        for i, (_, writer) in enumerate(connections):
+            writer.write(json.dumps({'jsonrpc': '2.0', 'id': i, 'method': 'apply_many',
+                                     'params': {'hwnds': hwnds[i % 50:i % 50 + 10]}}).encode() + b'\n')
+        for reader, writer in connections:
+            await reader.readline()
+            writer.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        address = rf'\\.\pipe\BorderX-benchmark-{os.getpid()}' if sys.platform == 'win32' else os.path.join(tmp, 'rpc.sock')
+        ui_queue = UiQueue()
+        server = RpcServer(handlers, address, notify=lambda: ui_queue.post('rpc'))
+
+        def drain_rpc():
+            if server.drain(ui_queue.remaining()):
+                ui_queue.post('rpc')
+        ui_queue.register('rpc', drain_rpc, ONCE)
+        server.start()
+        stop = threading.Event()
+
+        def ui_thread():
+            # Stands in for the Tk thread polling from root.after
+            while not stop.is_set():
+                if not ui_queue.drain():
+                    time.sleep(poll_ms / 1000)
+
+        ui = threading.Thread(target=ui_thread, daemon=True)
+        ui.start()
+        for count in clients:
+            started = time.perf_counter()
+            latencies = sorted(asyncio.run(run(address, count)))
+            elapsed = time.perf_counter() - started
+            print(f'{count} clients x {requests} requests: {len(latencies) / elapsed:.0f} req/s, '
+                  f'p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+                  f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+        ui_queue.longest_slice = 0.0
+        slices = ui_queue.slices
+        started = time.perf_counter()
+        asyncio.run(burst(address, requests))
+        print(f'burst of {requests} apply_many calls at once: {(time.perf_counter() - started) * 1000:.0f} ms, '
+              f'{ui_queue.slices - slices} UI slices, longest {ui_queue.longest_slice * 1000:.1f} ms')
+        stop.set()
+        server.stop()
+        print('Server:', server.stats())
+        print('UI queue:', ui_queue.stats())
+
+
+if __name__ == '__main__':
+    _benchmark()
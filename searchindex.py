@@ -0,0 +1,251 @@
+"""
+Incremental trigram index for filtering the window list as you type.
+
+Entries are added and removed as windows come and go; a search only
+touches the posting lists of the query's trigrams, and typo lookups only
+the words one or two deletions away, so it stays fast with thousands of
+windows. Run this module to time it:
+
+    python searchindex.py
+"""
+import re
+from collections import defaultdict
+
+# Terms of TYPO_MIN_LENGTH or more characters also match words one typo
+# (a wrong, missing, extra or swapped letter) away, and terms of
+# TYPO2_MIN_LENGTH or more two typos away, ranked below exact matches.
+# The first letter has to be right: otherwise "steam" would match "team".
+# Numbers (pids) only match exactly.
+TYPO_MIN_LENGTH = 5
+TYPO2_MIN_LENGTH = 9
+
+_WORD = re.compile(r'\w+')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def max_typos(term):
+    if term.isdigit():
+        return 0
+    if len(term) >= TYPO2_MIN_LENGTH:
+        return 2
+    return 1 if len(term) >= TYPO_MIN_LENGTH else 0
+
+
+def deletes(word, depth):
+    """
+    Return `word` and every string made by deleting up to `depth` of its
+    characters.
+    """
+    found = {word}
+    level = {word}
+    for _ in range(depth):
+        level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))}
+        found |= level
+    return found
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the optimal string alignment distance between `a` and `b`
+    (insertions, deletions, substitutions and adjacent swaps), or
+    `limit + 1` once it is known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, row = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(row[j] + 1, current[j - 1] + 1, row[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, row = row, current
+    return min(row[-1], limit + 1)
+
+
+class SearchIndex:
+    """
+    Maps keys (tree iids) to searchable text and finds the keys matching a
+    query. Each whitespace-separated query term must match, either as a
+    substring (found through the trigram postings for terms of three or
+    more characters) or, for longer terms, as a word within `max_typos()`
+    of it (found through the deletion variants of the indexed words).
+    Results are ranked by how well they match: an exact substring beats a
+    typo, and matching a whole word or its start beats matching inside
+    one.
+    """
+
+    def __init__(self):
+        self.texts = {}  # key -> lowercased text
+        self.order = {}  # key -> insertion number, to break ties stably
+        self.postings = defaultdict(set)  # trigram -> keys
+        self.words = {}  # word -> keys
+        self.variants = defaultdict(set)  # deletion variant -> words
+        self.added = 0
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, key, *fields):
+        """
+        Index `key` under `fields` (title, executable name, pid...),
+        replacing what it was indexed under before.
+        """
+        text = '\n'.join(str(field) for field in fields if field is not None).lower()
+        old = self.texts.get(key)
+        if old == text:
+            return
+        if old is not None:
+            self._unindex(key, old)
+        else:
+            self.order[key] = self.added
+            self.added += 1
+        self.texts[key] = text
+        for gram in trigrams(text):
+            self.postings[gram].add(key)
+        for word in set(_WORD.findall(text)):
+            if len(word) < TYPO_MIN_LENGTH - 1 or word.isdigit():
+                continue  # Never within max_typos() of a term
+            keys = self.words.get(word)
+            if keys is None:
+                keys = self.words[word] = set()
+                for variant in deletes(word, self._depth(word)):
+                    self.variants[variant].add(word)
+            keys.add(key)
+
+    @staticmethod
+    def _depth(word):
+        # Deep enough to meet every term within max_typos() of the word
+        return 2 if len(word) >= TYPO2_MIN_LENGTH - 2 else 1
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is not None:
+            self._unindex(key, text)
+            del self.order[key]
+
+    def _unindex(self, key, text):
+        for gram in trigrams(text):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+        for word in set(_WORD.findall(text)):
+            keys = self.words.get(word)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if not keys:
+                del self.words[word]
+                for variant in deletes(word, self._depth(word)):
+                    words = self.variants[variant]
+                    words.discard(word)
+                    if not words:
+                        del self.variants[variant]
+
+    def _match_term(self, term, candidates):
+        # Return key -> score for one term, limited to `candidates` if given:
+        # 1.0 for a substring, less for a word with typos
+        texts = self.texts
+        if len(term) < 3:
+            pool = candidates if candidates is not None else texts
+            return {key: 1.0 for key in pool if term in texts[key]}
+        pool = None
+        for gram in sorted(trigrams(term), key=lambda gram: len(self.postings.get(gram, ()))):
+            keys = self.postings.get(gram)
+            if not keys:
+                pool = set()
+                break
+            pool = set(keys) if pool is None else pool & keys
+            if not pool:
+                break
+        if candidates is not None:
+            pool &= candidates.keys()
+        scores = {key: 1.0 for key in pool if term in texts[key]}
+        typos = max_typos(term)
+        if not typos:
+            return scores
+        words = set()
+        for variant in deletes(term, typos):
+            words |= self.variants.get(variant, set())
+        for word in words:
+            if word[0] != term[0] or word == term:
+                continue
+            distance = edit_distance(term, word, typos)
+            if distance > typos:
+                continue
+            score = 1.0 - distance / len(term)
+            for key in self.words[word]:
+                if score > scores.get(key, 0.0) and (candidates is None or key in candidates):
+                    scores[key] = score
+        return scores
+
+    def search(self, query):
+        """
+        Return the keys matching `query`, best first. An empty query
+        matches everything, in insertion order.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return sorted(self.texts, key=self.order.__getitem__)
+        scores = None
+        # Longest terms first: they have the shortest candidate lists
+        for term in sorted(terms, key=len, reverse=True):
+            matched = self._match_term(term, scores)
+            for key in matched:
+                text = self.texts[key]
+                at = text.find(term)
+                if at >= 0:
+                    matched[key] += 1.0
+                    if at == 0 or not text[at - 1].isalnum():
+                        matched[key] += 0.5
+                        end = at + len(term)
+                        if end == len(text) or not text[end].isalnum():
+                            matched[key] += 0.5
+            if scores is None:
+                scores = matched
+            else:
+                scores = {key: scores[key] + score for key, score in matched.items()}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda key: (-scores[key], self.order[key]))
+
+
+def _benchmark(sizes=(100, 1000, 10000)):
+    import random
+    import time
+    words = ['chrome', 'visual', 'studio', 'code', 'terminal', 'explorer', 'steam', 'game',
+             'settings', 'discord', 'spotify', 'notepad', 'firefox', 'slack', 'obs', 'project']
+    rng = random.Random(0)
+    for size in sizes:
+        index = SearchIndex()
+        started = time.perf_counter()
+        for i in range(size):
+            title = ' '.join(rng.choice(words) for _ in range(4)) + f' {i}'
+            index.add(i, title, rng.choice(words) + '.exe', 1000 + i)
+        build = time.perf_counter() - started
+        results = []
+        for query in ('s', 'st', 'ste', 'steam', 'staem', 'vsual code', 'chrome 42'):
+            started = time.perf_counter()
+            runs = 20
+            for _ in range(runs):
+                hits = index.search(query)
+            results.append(f'{query!r}: {(time.perf_counter() - started) / runs * 1000:.2f} ms ({len(hits)} hits)')
+        started = time.perf_counter()
+        for i in range(0, size, 2):
+            index.remove(i)
+        churn = time.perf_counter() - started
+        print(f'{size} entries: build {build * 1000:.1f} ms, remove half {churn * 1000:.1f} ms')
+        for line in results:
+            print('   ', line)
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,164 @@
+import pytest
+
+import winops
+from backend import FakeBackend, set_backend
+
+
+class FakeTree:
+    """
+    Stands in for a ttk.Treeview with only top-level rows, following Tk's
+    semantics: `insert` and `move` take the index the row ends up at, and
+    unknown iids are an error. `height` rows fit in the view.
+    """
+
+    def __init__(self, height=20):
+        self.children = []
+        self.items = {}  # iid -> {'values': ..., 'image': ...}
+        self.height = height
+        self.top = 0
+        self.calls = 0
+
+    def _check(self, iid):
+        if iid not in self.items:
+            raise KeyError(f'Item {iid} not found')
+
+    def insert(self, parent, index, iid=None, values=(), image=''):
+        assert parent == ''
+        if iid in self.items:
+            raise ValueError(f'Item {iid} already exists')
+        self.calls += 1
+        index = len(self.children) if index == 'end' else index
+        self.children.insert(index, iid)
+        self.items[iid] = {'values': values, 'image': image}
+        return iid
+
+    def delete(self, *iids):
+        self.calls += 1
+        for iid in iids:
+            self._check(iid)
+            self.children.remove(iid)
+            del self.items[iid]
+
+    def move(self, iid, parent, index):
+        assert parent == ''
+        self._check(iid)
+        self.calls += 1
+        self.children.remove(iid)
+        self.children.insert(index, iid)
+
+    def item(self, iid, option=None, **options):
+        self._check(iid)
+        if option is not None:
+            return self.items[iid][option]
+        self.calls += 1
+        self.items[iid].update(options)
+
+    def get_children(self, parent=''):
+        return tuple(self.children)
+
+    def exists(self, iid):
+        return iid in self.items
+
+    def index(self, iid):
+        return self.children.index(iid)
+
+    def yview(self):
+        count = len(self.children)
+        if not count:
+            return 0.0, 1.0
+        return self.top / count, min(1.0, (self.top + self.height) / count)
+
+    def yview_moveto(self, fraction):
+        self.top = max(0, min(int(fraction * len(self.children)), len(self.children) - 1))
+
+    def identify_row(self, y):
+        return self.children[self.top] if self.children else ''
+
+
+class FakeClock:
+    """
+    Stands in for the time module where only perf_counter() and sleep()
+    are used: sleeping moves the clock on at once, so budgets and slices
+    are exact.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    import rpc
+    import uiqueue
+    clock = FakeClock()
+    monkeypatch.setattr(rpc, 'time', clock)
+    monkeypatch.setattr(uiqueue, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def fake_tree():
+    return FakeTree()
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    # paths.data_dir() prefers LOCALAPPDATA, so nothing is written to ~
+    monkeypatch.setenv('LOCALAPPDATA', str(tmp_path))
+    return tmp_path / 'BorderX'
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    """
+    A 100-window FakeBackend installed as the backend, with winops' journal
+    and monitor topology cleared around the test.
+    """
+    backend = FakeBackend(windows=100)
+    set_backend(backend)
+    monkeypatch.setattr(winops, 'journal', None)
+    monkeypatch.setattr(winops, 'monitor_topology', None)
+    yield backend
+    set_backend(None)
+
+
+@pytest.fixture
+def gui(fake_backend, data_dir, fake_tree, monkeypatch):
+    """
+    The borderx module with fresh state, its tree swapped for a FakeTree,
+    so the refresh and toggle paths run without Tk. Icons are "loaded" as
+    their executable path.
+    """
+    import borderx
+    from iconcache import BackendIconExtractor, IconCache
+    from procsnap import ProcessSnapshot
+    from registry import WindowRegistry
+    from searchindex import SearchIndex
+    from treediff import TreeModel
+    from viewport import LazyIcons
+    state = {
+        'borderless_windows': {},
+        'window_registry': WindowRegistry(),
+        'list_rows': [],
+        'refresh_rows': [],
+        'search_index': SearchIndex(),
+        'process_snapshot': ProcessSnapshot(),
+        'icon_cache': IconCache(BackendIconExtractor()),
+        'style_journal': None,
+        'process_filter': None,
+        'rules': None,
+        'tree': fake_tree,
+        'tree_model': TreeModel(fake_tree),
+        'lazy_icons': LazyIcons(fake_tree, lambda exe: exe),
+    }
+    for name, value in state.items():
+        monkeypatch.setattr(borderx, name, value, raising=False)
+    borderx.load_settings()
+    yield borderx
+    borderx.style_journal.close()
@@ -0,0 +1,127 @@
+"""
+Benchmarks of the refresh, toggle, icon and lookup paths against
+FakeBackend desktops of 10 to 5000 windows. CI compares them with the
+baseline stored in .benchmarks; see the README.
+"""
+import threading
+
+import pytest
+
+from backend import FakeBackend, set_backend
+from iconcache import BackendIconExtractor, IconCache, IconStore
+from icondecode import _sample_icons, decode_icons
+from rules import parse_rules
+
+import winops
+
+SIZES = [10, 500, 5000]
+
+
+@pytest.fixture(params=SIZES, ids=lambda n: f'{n}w')
+def fake_backend(request, monkeypatch):
+    backend = FakeBackend(windows=request.param)
+    set_backend(backend)
+    monkeypatch.setattr(winops, 'journal', None)
+    monkeypatch.setattr(winops, 'monitor_topology', None)
+    yield backend
+    set_backend(None)
+
+
+def refresh(gui):
+    # What populate_list() and poll_refresh() do, minus the worker thread:
+    # scan, stream the records in batches, then finish
+    gui.refresh_rows.clear()
+    records = list(gui.scan_windows(threading.Event()))
+    size = gui.refresh_pipeline.batch_size
+    for i in range(0, len(records), size):
+        gui.on_refresh_batch(records[i:i + size])
+    gui.on_refresh_done()
+
+
+def clear(gui):
+    for hwnd in list(gui.window_registry.by_hwnd):
+        gui.forget_window(hwnd)
+    gui.sync_rows([])
+
+
+def test_refresh_cold(benchmark, gui, fake_backend):
+    benchmark.pedantic(refresh, args=(gui,), setup=lambda: clear(gui), rounds=3)
+    assert len(gui.list_rows) == len(fake_backend.windows)
+    assert gui.tree.get_children() == tuple(str(hwnd) for hwnd in fake_backend.windows)
+
+
+def test_refresh_unchanged(benchmark, gui, fake_backend):
+    refresh(gui)
+    calls = gui.tree.calls
+    fake_backend.calls.clear()
+    benchmark.pedantic(refresh, args=(gui,), rounds=3)
+    # Nothing changed, so the tree isn't touched and windows aren't asked
+    # one by one for their pid or class
+    assert gui.tree.calls == calls
+    assert fake_backend.calls['get_pid'] == fake_backend.calls['get_class'] == 0
+    benchmark.extra_info['backend_calls_per_refresh'] = sum(fake_backend.calls.values()) // 3
+
+
+def test_toggle(benchmark, gui, fake_backend):
+    refresh(gui)
+    hwnd = next(iter(fake_backend.windows))
+    fake_backend.calls.clear()
+    benchmark.pedantic(gui.make_borderless_fullscreen, args=(hwnd,), rounds=20, iterations=2)
+    calls = sum(fake_backend.calls.values()) / 40
+    benchmark.extra_info['backend_calls_per_toggle'] = calls
+    # The same few calls however many windows there are
+    assert calls < 10
+    # The journal holds the original look exactly while it is borderless
+    assert gui.borderless_windows[hwnd] == (gui.style_journal.get(hwnd) is not None)
+
+
+def test_icon_load_cold(benchmark, fake_backend, tmp_path):
+    paths = list(fake_backend.icons)
+
+    def setup():
+        pack = tmp_path / 'icons.pack'
+        if pack.exists():
+            pack.unlink()
+        return (IconCache(BackendIconExtractor(), IconStore(str(pack))),), {}
+
+    def load_all(cache):
+        return [cache.get_bitmap(path) for path in paths]
+
+    bitmaps = benchmark.pedantic(load_all, setup=setup, rounds=3)
+    assert all(bitmaps)
+
+
+def test_icon_load_warm(benchmark, fake_backend, tmp_path):
+    paths = list(fake_backend.icons)
+    cache = IconCache(BackendIconExtractor(), IconStore(str(tmp_path / 'icons.pack')))
+    for path in paths:
+        cache.get_bitmap(path)
+    benchmark(lambda: [cache.get_bitmap(path) for path in paths])
+    assert cache.stats()['misses'] == len(paths)
+
+
+@pytest.mark.parametrize('count', [50, 500, 5000], ids=lambda n: f'{n}i')
+def test_icon_decode(benchmark, count):
+    raws = _sample_icons(count, distinct=max(1, count // 5))
+    icons = benchmark(decode_icons, raws)
+    assert len(icons) == count
+
+
+@pytest.mark.parametrize('count', [10, 1000, 5000], ids=lambda n: f'{n}r')
+def test_rule_match(benchmark, count):
+    # A mix of every kind of rule; half the windows match none of them
+    kinds = [lambda i: {'exe': f'C:\\Games\\Game{i}\\game{i}.exe'},
+             lambda i: {'name': f'tool{i}.exe', 'title': f'^Tool {i}'},
+             lambda i: {'class': f'Class{i}'},
+             lambda i: {'title': f'Project {i} -'}]
+    rules = parse_rules([{'match': kinds[i % 4](i)} for i in range(count)])
+    windows = [(f'C:\\Games\\Game{i}\\game{i}.exe', f'Project {i} - Editor', f'Class{i}')
+               for i in range(0, 2 * count, max(1, count // 50))]
+    hits = benchmark(lambda: [rules.match(*window) for window in windows])
+    assert any(hits) and not all(hits)
+
+
+def test_state_lookup(benchmark, gui, fake_backend):
+    refresh(gui)
+    listed = benchmark(gui.rpc_list)
+    assert len(listed) == len(fake_backend.windows)
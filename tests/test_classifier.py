@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from backend import FakeBackend
+from classifier import PathTrie, ProcessClassifier, load_filters
+from procsnap import ProcessInfo
+
+
+@pytest.fixture(autouse=True)
+def system_root(monkeypatch):
+    monkeypatch.setenv('SystemRoot', 'C:\\Windows')
+
+
+def process(exe, pid=10, create_time=1.0, name=None):
+    return ProcessInfo(pid, name or exe.rsplit('\\', 1)[-1], exe, create_time)
+
+
+def test_path_trie_matches_whole_components():
+    trie = PathTrie()
+    trie.add('C:\\Windows\\System32', 'deny')
+    trie.add('C:\\Windows\\System32\\Tools', 'allow')
+    assert trie.match('c:\\windows\\system32\\cmd.exe') == 'deny'
+    assert trie.match('C:\\Windows\\System32\\Tools\\x.exe') == 'allow'
+    assert trie.match('C:\\Windows\\System32x\\cmd.exe') is None
+
+
+def test_defaults_hide_system_processes():
+    classifier = ProcessClassifier()
+    assert classifier.classify(process('C:\\Windows\\System32\\svchost.exe', pid=1)).reason == 'path denied'
+    assert classifier.classify(ProcessInfo(4, 'System', 'C:\\System', 1.0)).reason == 'name denied'
+    assert classifier.classify(process('C:\\Windows\\notepad.exe', pid=2)).allowed
+    assert classifier.classify(None).reason == 'exited'
+
+
+def test_allow_beats_deny():
+    classifier = ProcessClassifier(allow={'names': ['mstsc.exe']}, deny={'paths': ['C:\\Tools']})
+    assert classifier.classify(process('C:\\Windows\\System32\\mstsc.exe')).allowed
+    assert classifier.classify(process('C:\\Tools\\mstsc.exe', pid=12)).allowed
+    assert not classifier.classify(process('C:\\Tools\\other.exe', pid=11)).allowed
+
+
+def test_longest_path_prefix_decides():
+    classifier = ProcessClassifier(allow={'paths': ['C:\\Apps']}, deny={'paths': ['C:\\Apps\\Launcher']})
+    assert classifier.classify(process('C:\\Apps\\Editor\\edit.exe', pid=1)).allowed
+    assert classifier.classify(process('C:\\Apps\\Launcher\\run.exe', pid=2)).reason == 'path denied'
+
+
+def test_class_rules():
+    classifier = ProcessClassifier(allow={'classes': ['ConsoleWindowClass']},
+                                   deny={'classes': ['Shell_TrayWnd'], 'names': ['game.exe']})
+    system = process('C:\\Windows\\System32\\cmd.exe', pid=1)
+    assert classifier.classify(system, 'ConsoleWindowClass').reason == 'class allowed'
+    assert classifier.classify(process('C:\\Apps\\app.exe', pid=2), 'Shell_TrayWnd').reason == 'class denied'
+    # A class allow shows the windows of a denied process too
+    assert classifier.classify(process('C:\\Games\\game.exe', pid=3), 'ConsoleWindowClass').allowed
+
+
+def test_explicit_allow_beats_class_deny():
+    classifier = ProcessClassifier(allow={'names': ['app.exe']}, deny={'classes': ['Cls']})
+    assert classifier.classify(process('C:\\Apps\\app.exe'), 'Cls').reason == 'allowed'
+
+
+def test_verdicts_are_memoized_per_process_start():
+    classifier = ProcessClassifier()
+    info = process('C:\\Apps\\app.exe')
+    classifier.classify(info)
+    classifier.classify(info, 'Other')
+    assert classifier.stats()['hits'] == 1 and classifier.stats()['misses'] == 1
+    # Same pid, new process
+    classifier.classify(info._replace(create_time=2.0))
+    assert classifier.stats()['misses'] == 2
+
+
+def test_prune_drops_exited_and_reused_pids():
+    classifier = ProcessClassifier()
+    a, b, c = (process(f'C:\\Apps\\{n}.exe', pid=pid) for n, pid in (('a', 1), ('b', 2), ('c', 3)))
+    for info in (a, b, c):
+        classifier.classify(info)
+    assert classifier.prune({1: a, 2: b._replace(create_time=9.0)}) == 2
+    assert list(classifier.verdicts) == [1]
+
+
+def test_process_image_fallback_for_denied_processes():
+    backend = FakeBackend(windows=0, processes=3)
+    pid, info = next(iter(backend.processes.items()))
+    classifier = ProcessClassifier(backend=backend)
+    verdict = classifier.classify(info._replace(name=None, exe=None))
+    assert verdict.allowed and verdict.exe == info.exe
+    assert classifier.stats()['fallbacks'] == backend.calls['process_image'] == 1
+    assert classifier.classify(ProcessInfo(99999, None, None, 1.0)).reason == 'access denied'
+
+
+def test_load_filters(tmp_path, capsys):
+    filename = tmp_path / 'filters.json'
+    filename.write_text(json.dumps({'deny': {'names': ['game.exe']}}), encoding='utf-8')
+    assert not load_filters(filename).classify(process('C:\\Games\\game.exe')).allowed
+    assert load_filters(tmp_path / 'missing.json').classify(process('C:\\Games\\game.exe')).allowed
+    filename.write_text('["not", "an", "object"]', encoding='utf-8')
+    assert load_filters(filename).classify(process('C:\\Games\\game.exe')).allowed
+    assert 'Error loading filters' in capsys.readouterr().out
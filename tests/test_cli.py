@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+import cli
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(capsys, *argv):
+    status = cli.main(list(argv))
+    return status, capsys.readouterr().out
+
+
+def test_list_json(fake_backend, data_dir, capsys):
+    status, out = run(capsys, 'list', '--json')
+    assert status == 0
+    windows = json.loads(out)
+    assert [w['hwnd'] for w in windows] == list(fake_backend.windows)
+    assert not any(w['borderless'] for w in windows)
+
+
+def test_apply_then_restore_puts_the_window_back(fake_backend, data_dir, capsys):
+    hwnd = next(iter(fake_backend.windows))
+    window = fake_backend.windows[hwnd]
+    original = (window.style, window.rect)
+    status, out = run(capsys, 'apply', '--hwnd', hex(hwnd), '--json')
+    assert status == 0 and json.loads(out)[0]['borderless']
+    assert window.rect == (0, 0) + fake_backend.screen
+    # A second run restores from the journal the first one wrote
+    status, out = run(capsys, 'restore', '--hwnd', str(hwnd))
+    assert status == 0
+    assert (window.style, window.rect) == original
+
+
+def test_no_match(fake_backend, data_dir, capsys):
+    assert cli.main(['toggle', '--exe', 'missing.exe']) == 1
+
+
+def test_cli_leaves_gui_modules_alone(data_dir):
+    code = ('import sys; from backend import FakeBackend, set_backend; set_backend(FakeBackend()); '
+            'import cli; cli.main(["toggle", "--exe", "app0.exe"]); '
+            'print(*[m for m in cli.GUI_MODULES if m in sys.modules], file=sys.stderr)')
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ),
+                            capture_output=True, text=True, check=True)
+    assert result.stderr.split() == []
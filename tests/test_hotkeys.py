@@ -0,0 +1,72 @@
+import pytest
+
+import winops
+from hotkeys import (MOD_ALT, MOD_CONTROL, MOD_SHIFT, MOD_WIN, HotkeyDispatcher, ScriptedHotkeySource,
+                     parse_hotkey)
+from journal import StyleJournal
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('ctrl+alt+enter', (MOD_CONTROL | MOD_ALT, 0x0D)),
+    ('Win + Shift + F11', (MOD_WIN | MOD_SHIFT, 0x7A)),
+    ('control+b', (MOD_CONTROL, ord('B'))),
+    ('alt+7', (MOD_ALT, ord('7'))),
+    ('f1', (0, 0x70)),
+    ('f24', (0, 0x87)),
+    ('pause', (0, 0x13)),
+])
+def test_parse_hotkey(text, expected):
+    assert parse_hotkey(text) == expected
+
+
+@pytest.mark.parametrize('text', ['hyper+a', 'ctrl+', 'ctrl+alt', 'f0', 'f25', 'ctrl+ab', 'ctrl+-'])
+def test_parse_hotkey_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        parse_hotkey(text)
+
+
+def test_dispatcher_runs_the_bound_action_and_times_it(capsys):
+    ran = []
+
+    def fail():
+        raise OSError('access denied')
+    dispatcher = HotkeyDispatcher({'toggle': lambda: ran.append('toggle') or 'done', 'fail': fail}, keep=2)
+    assert dispatcher.stats() == {'presses': 0}
+    assert dispatcher('toggle') == 'done'
+    assert dispatcher('unbound') is None
+    assert dispatcher('fail') is None
+    assert 'Error running hotkey fail: access denied' in capsys.readouterr().out
+    dispatcher('toggle')
+    assert ran == ['toggle', 'toggle']
+    stats = dispatcher.stats()
+    assert stats['presses'] == 3
+    assert stats['max_ms'] >= stats['p50_ms'] >= 0
+    assert len(dispatcher.latencies) == 2
+
+
+def test_toggle_round_trip(fake_backend, tmp_path):
+    journal = StyleJournal(str(tmp_path / 'journal.jsonl'))
+    winops.set_journal(journal)
+    hwnd = fake_backend.get_foreground()
+    window = fake_backend.windows[hwnd]
+    before = window.style, window.rect
+    source = ScriptedHotkeySource()
+    dispatcher = HotkeyDispatcher({'toggle': winops.toggle_foreground})
+    source.start(dispatcher)
+
+    fake_backend.calls.clear()
+    source.press('toggle')
+    assert winops.is_borderless(hwnd)
+    assert window.rect == winops.fullscreen_rect(hwnd)
+    assert journal.get(hwnd) is not None
+    # Straight from the hwnd: no window list, processes or icons
+    for name in ('enum_windows', 'list_windows', 'list_processes', 'icon_bits'):
+        assert fake_backend.calls[name] == 0
+
+    source.press('toggle')
+    assert (window.style, window.rect) == before
+    assert journal.get(hwnd) is None
+    source.stop()
+    source.press('toggle')
+    assert dispatcher.presses == 2
+    journal.close()
@@ -0,0 +1,36 @@
+import pytest
+
+from icondecode import ICON_SIZE, LIST_SIZE, _decode_one, _sample_icons, decode_icons
+
+PIXELS = ICON_SIZE * ICON_SIZE
+
+
+def solid(b, g, r, a):
+    return bytes((b, g, r, a)) * PIXELS
+
+
+def test_bgra_becomes_rgba():
+    [icon] = decode_icons([(solid(10, 20, 30, 255), None)])
+    assert len(icon) == LIST_SIZE * LIST_SIZE * 4
+    assert icon[:4] == bytes((30, 20, 10, 255))
+
+
+def test_and_mask_without_alpha():
+    transparent = bytes((255, 255, 255, 0)) * PIXELS
+    opaque = bytes(PIXELS * 4)
+    [clear, solid_icon] = decode_icons([(solid(10, 20, 30, 0), transparent), (solid(10, 20, 30, 0), opaque)])
+    assert set(clear[3::4]) == {0}
+    assert solid_icon[:4] == bytes((30, 20, 10, 255))
+
+
+def test_batch_matches_pure_python():
+    pytest.importorskip('numpy')
+    raws = _sample_icons(8, distinct=8)
+    for batch, (color, mask) in zip(decode_icons(raws), raws):
+        one = _decode_one(color, mask)
+        assert max(abs(a - b) for a, b in zip(batch, one)) <= 1
+
+
+def test_identical_icons_decode_identically():
+    raws = _sample_icons(20, distinct=4)
+    assert len(set(decode_icons(raws))) == 4
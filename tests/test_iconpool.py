@@ -0,0 +1,81 @@
+import threading
+import time
+
+from backend import FakeBackend, set_backend
+from iconcache import BackendIconExtractor, IconCache
+from iconpool import IconPool
+
+
+def wait_for(pool, count, timeout=5.0, on_timeout=None):
+    ready = []
+    deadline = time.perf_counter() + timeout
+    while len(ready) < count and time.perf_counter() < deadline:
+        pool.drain(lambda path, result: ready.append((path, result)), on_timeout)
+        time.sleep(0.005)
+    return ready
+
+
+def test_loads_are_batched_into_one_extraction_each(fake_backend):
+    # Several icons per icon_bits_many() call, so one DC and one decode each
+    paths = list(fake_backend.icons)
+    cache = IconCache(BackendIconExtractor())
+    queued = threading.Event()
+
+    def load_many(paths):
+        queued.wait(5)  # Every request is in before any load finishes
+        return cache.get_bitmaps(paths)
+    pool = IconPool(load_many, workers=4)
+    fake_backend.calls.clear()
+    for path in paths + paths:
+        pool.request(path)
+    queued.set()
+    ready = wait_for(pool, len(paths))
+    pool.shutdown()
+    assert sorted(path for path, _ in ready) == sorted(paths)
+    assert all(bitmap for _, bitmap in ready)
+    stats = pool.stats()
+    assert stats['deduped'] == len(paths)
+    assert fake_backend.calls['icon_bits_many'] == stats['batches'] < len(paths)
+    assert fake_backend.calls['icon_bits'] == len(paths)
+
+
+def test_a_slow_icon_does_not_hold_up_the_others():
+    from icondecode import _sample_icons, decode_icons
+    decode_icons(_sample_icons(1, 1))  # Import NumPy before timing anything
+    backend = FakeBackend(windows=40, processes=20)
+    paths = list(backend.icons)
+    backend.icon_latency = {paths[0]: 1.0}
+    set_backend(backend)
+    try:
+        cache = IconCache(BackendIconExtractor())
+        pool = IconPool(cache.get_bitmaps, workers=4, timeout=0.3, batch_size=1)
+        for path in paths:
+            pool.request(path)
+        late = []
+        started = time.perf_counter()
+        ready = wait_for(pool, len(paths) - 1, on_timeout=late.append)
+        assert time.perf_counter() - started < 0.5
+        assert paths[0] not in [path for path, _ in ready]
+        ready += wait_for(pool, 1, on_timeout=late.append)
+        assert late == [paths[0]]
+        assert sorted(path for path, _ in ready) == sorted(paths)
+        pool.shutdown()
+    finally:
+        set_backend(None)
+
+
+def test_cancel_returns_the_paths_no_worker_took():
+    release = threading.Event()
+
+    def load_many(paths):
+        release.wait(5)
+        return [b'icon'] * len(paths)
+    pool = IconPool(load_many, workers=1, batch_size=1)
+    for path in 'abcd':
+        pool.request(path)
+    time.sleep(0.05)  # The worker has taken 'a'
+    assert pool.cancel() == ['b', 'c', 'd']
+    pool.request('b')  # Requested again once it is needed
+    release.set()
+    assert sorted(path for path, _ in wait_for(pool, 2)) == ['a', 'b']
+    pool.shutdown()
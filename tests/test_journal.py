@@ -0,0 +1,126 @@
+import os
+
+import winops
+from journal import SavedWindow, StyleJournal
+
+
+def saved(hwnd, pid=1, create_time=100.0):
+    return SavedWindow(hwnd, pid, create_time, 0x14CF0000, 0, (10, 20, 800, 600))
+
+
+def test_save_and_drop_survive_reload(tmp_path):
+    filename = str(tmp_path / 'journal.jsonl')
+    journal = StyleJournal(filename)
+    journal.record(saved(1))
+    journal.record(saved(2))
+    journal.forget(1)
+    journal.close()
+    reloaded = StyleJournal(filename)
+    assert list(reloaded.entries) == [2]
+    assert reloaded.get(2) == saved(2)
+
+
+def test_line_cut_short_by_a_crash_is_skipped(tmp_path):
+    filename = str(tmp_path / 'journal.jsonl')
+    journal = StyleJournal(filename)
+    journal.record(saved(1))
+    journal.close()
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write('{"op": "save", "hwnd": 2, "pi')
+    assert list(StyleJournal(filename).entries) == [1]
+
+
+def test_compacts_once_dead_lines_pile_up(tmp_path):
+    filename = str(tmp_path / 'journal.jsonl')
+    journal = StyleJournal(filename, compact_after=8)
+    for hwnd in range(10):
+        journal.record(saved(hwnd))
+        if hwnd:
+            journal.forget(hwnd)
+    journal.close()
+    with open(filename, encoding='utf-8') as f:
+        assert len(f.readlines()) < 8
+    assert list(StyleJournal(filename).entries) == [0]
+    assert not os.path.exists(filename + '.tmp')
+
+
+def test_record_after_a_torn_line_survives(tmp_path):
+    filename = str(tmp_path / 'journal.jsonl')
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('{"op": "save", "hwnd": 2, "pi')
+    StyleJournal(filename).record(saved(1))
+    assert list(StyleJournal(filename).entries) == [1]
+
+
+def test_processes_sharing_a_journal_see_each_other(tmp_path):
+    # The GUI and the command line each have their own StyleJournal
+    filename = str(tmp_path / 'journal.jsonl')
+    gui, cli = StyleJournal(filename), StyleJournal(filename)
+    cli.record(saved(1))
+    assert gui.get(1) == saved(1)
+    gui.forget(1)
+    assert cli.get(1) is None and len(cli) == 0
+
+
+def test_compacting_keeps_entries_other_processes_added(tmp_path):
+    filename = str(tmp_path / 'journal.jsonl')
+    gui, cli = StyleJournal(filename, compact_after=4), StyleJournal(filename)
+    gui.record(saved(1))
+    cli.record(saved(2))
+    for hwnd in range(10, 14):  # Enough churn for the GUI to compact
+        gui.record(saved(hwnd))
+        gui.forget(hwnd)
+    with open(filename, encoding='utf-8') as f:
+        assert len(f.readlines()) < 6
+    assert sorted(StyleJournal(filename).entries) == [1, 2]
+    # The command line keeps writing to the compacted file
+    cli.record(saved(3))
+    assert gui.get(3) == saved(3)
+    assert sorted(StyleJournal(filename).entries) == [1, 2, 3]
+
+
+def test_reconcile_keeps_entries_added_since_loading(tmp_path):
+    filename = str(tmp_path / 'journal.jsonl')
+    gui, cli = StyleJournal(filename), StyleJournal(filename)
+    gui.record(saved(1))
+    cli.record(saved(2))
+    live = gui.reconcile(lambda s: s.hwnd != 1)
+    assert [s.hwnd for s in live] == [2]
+    assert list(StyleJournal(filename).entries) == [2]
+
+
+def make_all_borderless(backend):
+    hwnds = list(backend.windows)[:3]
+    winops.apply_many(hwnds)
+    return hwnds
+
+
+def test_reconcile_keeps_live_windows(fake_backend, tmp_path):
+    winops.set_journal(StyleJournal(str(tmp_path / 'journal.jsonl')))
+    hwnds = make_all_borderless(fake_backend)
+    assert [s.hwnd for s in winops.reconcile_journal()] == hwnds
+
+
+def test_reconcile_tolerates_start_times_from_another_source(fake_backend, tmp_path, monkeypatch):
+    # On Windows, describe_process() (psutil) and process_started()
+    # (GetProcessTimes) convert the same FILETIME to slightly different floats
+    monkeypatch.setattr(fake_backend, 'process_started',
+                        lambda pid: fake_backend.processes[pid].create_time + 3e-7)
+    winops.set_journal(StyleJournal(str(tmp_path / 'journal.jsonl')))
+    hwnds = make_all_borderless(fake_backend)
+    # ...and the next read can round differently again
+    monkeypatch.setattr(fake_backend, 'process_started',
+                        lambda pid: fake_backend.processes[pid].create_time - 2e-7)
+    assert [s.hwnd for s in winops.reconcile_journal()] == hwnds
+    assert len(winops.journal) == 3
+
+
+def test_reconcile_drops_closed_and_reused_windows(fake_backend, tmp_path):
+    winops.set_journal(StyleJournal(str(tmp_path / 'journal.jsonl')))
+    closed, reused, live = make_all_borderless(fake_backend)
+    del fake_backend.windows[closed]
+    # Same pid, but a new process started since
+    pid = fake_backend.get_pid(reused)
+    info = fake_backend.processes[pid]
+    fake_backend.processes[pid] = info._replace(create_time=info.create_time + 5)
+    assert [s.hwnd for s in winops.reconcile_journal()] == [live]
@@ -0,0 +1,56 @@
+from monitors import Monitor, MonitorTopology, order_monitors, overlap
+
+LEFT = Monitor(None, (-1920, 0, 1920, 1080), (-1920, 0, 1920, 1040), 96, False)
+PRIMARY = Monitor(None, (0, 0, 2560, 1440), (0, 0, 2560, 1400), 144, True)
+RIGHT = Monitor(None, (2560, 0, 1920, 1080), (2560, 0, 1920, 1040), 96, False)
+BELOW = Monitor(None, (2560, 1080, 1920, 1080), (2560, 1080, 1920, 1040), 96, False)
+
+
+def topology(*monitors):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return list(monitors)
+    return MonitorTopology(load), calls
+
+
+def test_primary_first_then_left_to_right_and_top_to_bottom():
+    ordered = order_monitors([BELOW, RIGHT, LEFT, PRIMARY])
+    assert [m.rect for m in ordered] == [PRIMARY.rect, LEFT.rect, RIGHT.rect, BELOW.rect]
+    assert [m.index for m in ordered] == [0, 1, 2, 3]
+
+
+def test_overlap():
+    assert overlap((0, 0, 10, 10), (5, 5, 10, 10)) == 25
+    assert overlap((0, 0, 10, 10), (10, 0, 10, 10)) == 0
+
+
+def test_monitor_for_rect():
+    monitors, _ = topology(LEFT, PRIMARY, RIGHT)
+    assert monitors.monitor_for_rect((100, 100, 800, 600)).primary
+    # Straddling two monitors picks the one holding most of the window
+    assert monitors.monitor_for_rect((2400, 100, 800, 600)).rect == RIGHT.rect
+    assert monitors.monitor_for_rect((-500, 100, 800, 600)).rect == LEFT.rect
+    # Entirely off screen picks the nearest monitor
+    assert monitors.monitor_for_rect((-5000, 100, 800, 600)).rect == LEFT.rect
+    assert monitors.monitor_for_rect((9000, 100, 800, 600)).rect == RIGHT.rect
+
+
+def test_get_falls_back_to_primary():
+    monitors, _ = topology(LEFT, PRIMARY)
+    assert monitors.get(1).rect == LEFT.rect
+    assert monitors.get(5).primary
+    assert monitors.get(None).primary
+    assert monitors.get(-1).primary
+
+
+def test_layout_is_cached_until_invalidated():
+    monitors, calls = topology(PRIMARY)
+    monitors.monitors()
+    monitors.get(0)
+    monitors.monitor_for_rect((0, 0, 10, 10))
+    assert len(calls) == monitors.builds == 1
+    monitors.invalidate()
+    monitors.get(0)
+    assert len(calls) == monitors.builds == 2
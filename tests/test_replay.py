@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+from collections import Counter
+
+import pytest
+
+from replay import Replayer, read_trace
+from tracing import FORMAT, VERSION, TraceRecorder
+from winevents import WindowEvent
+
+# Written by record_synthetic(path, windows=20, rounds=4)
+SYNTHETIC = os.path.join(os.path.dirname(__file__), 'data', 'synthetic.bxt')
+
+
+def test_replaying_the_synthetic_trace(fake_backend):
+    records = list(read_trace(SYNTHETIC))
+    marks = Counter(record[2] for record in records if record[0] == 'm')
+    assert marks == {'refresh': 4, 'make_borderless': 4, 'restore_borders': 4, 'apply_many': 4, 'restore_many': 4}
+
+    replayer = Replayer()
+    report = replayer.report(replayer.run(records))
+    replayed = {name: stage['count'] for name, stage in report['replayed'].items()}
+    assert replayed == dict(marks, window_events=31)
+    assert {name: stage['count'] for name, stage in report['recorded'].items()} == marks
+    assert report['operations'] == sum(replayed.values())
+    assert report['window_events'] == sum(record[0] == 'e' for record in records)
+    assert replayer.backend.calls['list_windows'] == marks['refresh']
+    # The windows still open at the end that the classifier lets through
+    assert report['windows_listed'] == len(replayer.registry) == 13
+    for hwnd in replayer.registry.by_hwnd:
+        assert replayer.backend.is_window(hwnd)
+
+
+def test_recorder_round_trip(tmp_path):
+    filename = str(tmp_path / 'session.bxt')
+    recorder = TraceRecorder()
+    with recorder.mark('refresh'):
+        pass  # Off until started: nothing written
+    recorder.start(filename)
+    recorder.call('get_pid', (0x10000,), 1000, recorder.started_at, 0.0001)
+    recorder.call('icon_bits', ('C:\\app.exe',), (b'\0' * 16, None), recorder.started_at, 0.002)
+    recorder.event(WindowEvent('create', 0x10002))
+    with recorder.mark('make_borderless', 0x10000, (0, 0, 1920, 1080)):
+        pass
+    recorder.stop()
+    recorder.event(WindowEvent('destroy', 0x10002))
+    assert recorder.records == 5
+
+    records = list(read_trace(filename))
+    assert [record[0] for record in records] == ['c', 'c', 'e', 'm']
+    assert records[0][2:] == ['get_pid', [0x10000], 1000, 0.0001]
+    assert records[1][2:5] == ['icon_bits', ['C:\\app.exe'], [{'bytes': 16}, None]]
+    assert records[2][2:] == ['create', 0x10002]
+    assert records[3][2:4] == ['make_borderless', [0x10000, [0, 0, 1920, 1080]]]
+
+
+@pytest.mark.parametrize('header, error', [
+    ({'format': FORMAT, 'version': VERSION + 1}, f'is trace version {VERSION + 1}, expected {VERSION}'),
+    ({'format': 'something-else', 'version': VERSION}, 'is not a BorderX trace'),
+    ([1, 2], 'is not a BorderX trace'),
+    (None, 'is not a BorderX trace'),
+])
+def test_read_trace_checks_the_header(tmp_path, header, error):
+    filename = str(tmp_path / 'session.bxt')
+    with gzip.open(filename, 'wt', encoding='utf-8') as f:
+        if header is not None:
+            f.write(json.dumps(header) + '\n')
+        f.write('["c",0.0,"get_foreground",[],65536,0.0001]\n')
+    with pytest.raises(ValueError, match=error):
+        list(read_trace(filename))
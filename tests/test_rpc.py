@@ -0,0 +1,151 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from rpc import RpcClient, RpcError, RpcServer
+from uiqueue import ONCE, UiQueue
+
+
+class Loop:
+    # Stands in for the server's event loop thread
+    def __init__(self):
+        self.resolved = []
+
+    def call_soon_threadsafe(self, fn, future, result, error):
+        self.resolved.append(result)
+
+
+def queued_server(calls, seconds, sleep=time.sleep):
+    server = RpcServer({'slow': lambda i: sleep(seconds) or i})
+    server.loop = Loop()
+    for i in range(calls):
+        server.calls.put((server.handlers['slow'], {'i': i}, None))
+    return server
+
+
+def test_drain_without_a_budget_runs_everything():
+    server = queued_server(5, 0)
+    assert server.drain() is False
+    assert server.loop.resolved == [0, 1, 2, 3, 4]
+
+
+def test_drain_stops_when_the_budget_is_spent():
+    server = queued_server(20, 0.002)
+    assert server.drain(0.005) is True
+    assert 0 < len(server.loop.resolved) < 20
+    while server.drain(0.005):
+        pass
+    assert server.loop.resolved == list(range(20))
+
+
+def test_rpc_calls_take_only_what_is_left_of_the_ui_slice(clock):
+    ui_queue = UiQueue()
+    server = queued_server(30, 0.002, clock.sleep)
+
+    def drain_rpc():
+        if server.drain(ui_queue.remaining()):
+            ui_queue.post('rpc')
+    ui_queue.register('rpc', drain_rpc, ONCE)
+    ui_queue.register('busy', lambda: clock.sleep(0.004))
+    ui_queue.post('busy')
+    ui_queue.post('rpc')
+    slices = 0
+    while ui_queue.drain(0.008):
+        slices += 1
+    assert server.loop.resolved == list(range(30))
+    assert slices > 3
+    # One call (2 ms) past the budget at most
+    assert ui_queue.longest_slice <= 0.008 + 0.002 + 1e-9
+    assert ui_queue.remaining() is None
+
+
+class Serving:
+    """
+    A server on a Unix socket in tmp_path, drained by a thread standing in
+    for the Tk thread.
+    """
+
+    def __init__(self, address, handlers):
+        self.ui_queue = UiQueue()
+        self.server = RpcServer(handlers, address, notify=lambda: self.ui_queue.post('rpc'))
+        self.ui_queue.register('rpc', self.server.drain, ONCE)
+        self.stopping = threading.Event()
+        self.ui = threading.Thread(target=self._ui_thread, daemon=True)
+
+    def _ui_thread(self):
+        while not self.stopping.is_set():
+            if not self.ui_queue.drain():
+                time.sleep(0.001)
+
+    def start(self):
+        self.ui.start()
+        return self.server.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.server.stop()
+        self.ui.join(1.0)
+
+
+@pytest.fixture
+def serve(tmp_path):
+    if sys.platform == 'win32':
+        pytest.skip('uses a Unix socket')
+    started = []
+
+    def serve(handlers, address=str(tmp_path / 'rpc.sock')):
+        serving = Serving(address, handlers)
+        started.append(serving)
+        serving.ok = serving.start()
+        return serving
+    yield serve
+    for serving in started:
+        serving.stop()
+
+
+def test_calls_round_trip(serve):
+    serving = serve({'add': lambda a, b: a + b})
+    assert serving.ok
+    with RpcClient(serving.server.address) as client:
+        assert client.call('add', a=1, b=2) == 3
+        with pytest.raises(RpcError):
+            client.call('add', a=1)
+        with pytest.raises(RpcError):
+            client.call('missing')
+
+
+def test_subscribers_get_published_events(serve):
+    serving = serve({'ping': lambda: 'pong'})
+    with RpcClient(serving.server.address) as client:
+        assert client.call('subscribe') is True
+        serving.server.publish({'event': 'borderless', 'hwnd': 1, 'borderless': True})
+        # Events arriving before a reply are kept for events()
+        assert client.call('ping') == 'pong'
+        serving.server.publish({'event': 'closed', 'hwnd': 1})
+        events = client.events()
+        assert next(events) == {'event': 'borderless', 'hwnd': 1, 'borderless': True}
+        assert next(events) == {'event': 'closed', 'hwnd': 1}
+
+
+def test_second_copy_leaves_the_first_one_reachable(serve, capsys):
+    first = serve({'who': lambda: 'first'})
+    second = serve({'who': lambda: 'second'})
+    assert first.ok and not second.ok
+    assert 'already running' in capsys.readouterr().out
+    second.stop()
+    with RpcClient(first.server.address) as client:
+        assert client.call('who') == 'first'
+
+
+def test_socket_left_by_a_crashed_copy_is_replaced(serve, tmp_path):
+    import socket
+    address = str(tmp_path / 'stale.sock')
+    crashed = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    crashed.bind(address)  # Bound but never listening, like a dead server
+    crashed.close()
+    serving = serve({'who': lambda: 'new'}, address)
+    assert serving.ok
+    with RpcClient(address) as client:
+        assert client.call('who') == 'new'
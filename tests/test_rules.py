@@ -0,0 +1,75 @@
+import pytest
+
+from rules import load_rules, parse_rules
+
+
+def test_first_matching_rule_wins_across_buckets():
+    rules = parse_rules([
+        {'match': {'title': 'Editor'}},
+        {'match': {'exe': 'C:\\Games\\Game\\game.exe'}, 'monitor': 1},
+        {'match': {'name': 'game.exe'}},
+    ])
+    assert rules.match('C:\\GAMES\\Game\\Game.exe', 'Main', 'Cls').index == 1
+    assert rules.match('C:\\Other\\game.exe', 'Main', 'Cls').index == 2
+    assert rules.match('C:\\Games\\Game\\game.exe', 'Level Editor', 'Cls').index == 0
+    assert rules.match('C:\\x.exe', 'Main', 'Cls') is None
+
+
+def test_every_key_must_match():
+    rules = parse_rules([{'match': {'name': 'obs64.exe', 'title': '^Projector'}, 'rect': [0, 0, 1280, 720]}])
+    assert rules.match('C:\\obs\\obs64.exe', 'Projector - Scene', None).rect == (0, 0, 1280, 720)
+    assert rules.match('C:\\obs\\obs64.exe', 'OBS 30', None) is None
+
+
+def test_class_rule():
+    rules = parse_rules([{'match': {'class': 'UnityWndClass'}}])
+    assert rules.match(None, None, 'UnityWndClass').index == 0
+    assert rules.match(None, None, 'Other') is None
+
+
+def test_title_rules_in_rule_order():
+    rules = parse_rules([{'match': {'title': 'Notepad$'}}, {'match': {'title': 'Untitled'}}])
+    assert rules.match(None, 'Untitled - Notepad', None).index == 0
+    assert rules.match(None, 'Untitled - Paint', None).index == 1
+
+
+@pytest.mark.parametrize('title', [r'(\w+) - \1', r'(?P<word>\w+) - (?P=word)'])
+def test_title_backreferences(title):
+    rules = parse_rules([{'match': {'title': r'(a)(b)(c)'}}, {'match': {'title': title}}])
+    assert rules.match(None, 'Game - Game', None).index == 1
+    assert rules.match(None, 'Game - Other', None) is None
+
+
+def test_title_rules_with_the_same_group_name():
+    rules = parse_rules([{'match': {'title': '(?P<n>x)y'}}, {'match': {'title': '(?P<n>a)b'}}])
+    assert rules.match(None, 'ab', None).index == 1
+
+
+def test_rule_without_keys_is_rejected():
+    with pytest.raises(ValueError):
+        parse_rules([{'match': {}}])
+
+
+def test_load_rules_reports_bad_files(tmp_path, capsys):
+    assert len(load_rules(tmp_path / 'missing.json')) == 0
+    bad = tmp_path / 'rules.json'
+    bad.write_text('[{"match": {"title": "("}}]', encoding='utf-8')
+    assert len(load_rules(bad)) == 0
+    assert 'Error loading rules' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('text, message', [
+    ('{"match": {"exe": "game.exe"}}', 'expected a list'),
+    ('["game.exe"]', 'Rule 1 must be an object'),
+    ('[{"match": "game.exe"}]', 'Rule 1: match must be an object'),
+    ('[{"match": {"name": "a.exe"}}, {"match": {"title": 5}}]', 'Rule 2: title must be a string'),
+    ('[{"match": {"name": "a.exe"}, "rect": 5}]', 'Rule 1: rect must be'),
+    ('[{"match": {"name": "a.exe"}, "rect": "0,0,1,1"}]', 'Rule 1: rect must be'),
+    ('[{"match": {"name": "a.exe"}, "monitor": "1"}]', 'Rule 1: monitor must be a number'),
+])
+def test_load_rules_rejects_malformed_files(tmp_path, capsys, text, message):
+    filename = tmp_path / 'rules.json'
+    filename.write_text(text, encoding='utf-8')
+    assert len(load_rules(filename)) == 0
+    out = capsys.readouterr().out
+    assert 'Error loading rules' in out and message in out
@@ -0,0 +1,76 @@
+import pytest
+
+from searchindex import SearchIndex, deletes, edit_distance
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add('steam', 'Steam', 'steam.exe', 1200)
+    index.add('team', 'Microsoft Teams', 'ms-teams.exe', 1301)
+    index.add('code', 'main.py - Visual Studio Code', 'Code.exe', 1302)
+    index.add('explorer', 'Documents', 'explorer.exe', 10423)
+    index.add('settings', 'Settings', 'SystemSettings.exe', 10424)
+    return index
+
+
+def test_empty_query_lists_everything_in_order(index):
+    assert index.search('  ') == ['steam', 'team', 'code', 'explorer', 'settings']
+
+
+def test_substring_and_word_ranking(index):
+    assert index.search('steam') == ['steam']
+    assert index.search('team') == ['team', 'steam']  # Whole word first
+    assert index.search('co') == ['code']
+
+
+@pytest.mark.parametrize('query', ['staem', 'stam', 'steams', 'stxam'])
+def test_one_typo_is_forgiven_from_five_letters(index, query):
+    if len(query) < 5:
+        assert index.search(query) == []
+    else:
+        assert index.search(query) == ['steam']
+
+
+def test_two_typos_from_nine_letters(index):
+    assert index.search('epxlroer') == []  # Eight letters: one typo only
+    assert index.search('explroere') == ['explorer']
+    assert index.search('sytsemsetigns') == []  # Three typos
+
+
+def test_first_letter_must_match(index):
+    assert index.search('xteam') == []
+    assert 'team' not in index.search('steam')
+
+
+def test_numbers_match_exactly(index):
+    assert index.search('10423') == ['explorer']
+
+
+def test_typos_rank_below_exact_matches(index):
+    index.add('studio', 'Visual Studio Installer', 'setup.exe', 1)
+    index.add('studo', 'studo notes', 'notes.exe', 2)
+    assert index.search('studo') == ['studo', 'code', 'studio']
+
+
+def test_every_term_must_match(index):
+    assert index.search('vsual code') == ['code']
+    assert index.search('visual steam') == []
+
+
+def test_remove_and_replace_unindex_words(index):
+    index.remove('steam')
+    assert index.search('staem') == []
+    index.add('code', 'notes.txt - Notepad')
+    assert index.search('visaul') == []
+    assert index.search('notepda') == ['code']
+    assert 'visual' not in index.words
+    assert not any('visual' in words for words in index.variants.values())
+
+
+def test_edit_distance():
+    assert edit_distance('steam', 'staem', 2) == 1  # Adjacent swap
+    assert edit_distance('steam', 'team', 2) == 1
+    assert edit_distance('kitten', 'sitting', 3) == 3
+    assert edit_distance('kitten', 'sitting', 1) == 2  # Gave up past the limit
+    assert deletes('abc', 1) == {'abc', 'bc', 'ac', 'ab'}
@@ -0,0 +1,86 @@
+import random
+
+from treediff import Row, TreeModel, diff_rows, stable_keys
+
+
+def rows(*iids, title=None):
+    return [Row(iid, (title or f'Window {iid}',), None) for iid in iids]
+
+
+def shown(tree):
+    return [(iid, tree.items[iid]['values']) for iid in tree.get_children()]
+
+
+def test_stable_keys_is_a_longest_unmoved_run():
+    assert stable_keys('abcd', 'abcd') == set('abcd')
+    assert stable_keys('xabc', 'abxc') == set('abc')
+    assert stable_keys('abc', 'cab') == set('ab')
+    assert stable_keys('abc', '') == set()
+
+
+def test_diff_rows():
+    old = rows('a', 'b', 'c', 'd')
+    new = rows('b', 'a', 'd', 'e')
+    new[2] = Row('d', ('Renamed',), None)
+    diff = diff_rows(old, new)
+    assert diff.added == ['e']
+    assert diff.removed == ['c']
+    assert diff.changed == ['d']
+    assert len(diff.moved) == 1 and diff.moved[0] in ('a', 'b')
+
+
+def test_unchanged_sync_touches_nothing(fake_tree):
+    model = TreeModel(fake_tree)
+    model.sync(rows(*'abcdef'))
+    calls = fake_tree.calls
+    model.sync(rows(*'abcdef'))
+    assert fake_tree.calls == calls
+    assert model.last_calls == 0
+
+
+def test_row_moving_down_lands_after_prev(fake_tree):
+    # Tk's move index doesn't count the moved row's old slot
+    model = TreeModel(fake_tree)
+    model.sync(rows('x', 'a', 'b', 'c'))
+    model.sync(rows('a', 'b', 'x', 'c'))
+    assert list(fake_tree.get_children()) == ['a', 'b', 'x', 'c']
+    assert model.last_calls == 1
+    model.sync(rows('a', 'b', 'c', 'x'))
+    assert list(fake_tree.get_children()) == ['a', 'b', 'c', 'x']
+
+
+def test_random_syncs_match_the_model(fake_tree):
+    rng = random.Random(0)
+    model = TreeModel(fake_tree)
+    current = []
+    next_iid = 0
+    for _ in range(2000):
+        new = list(current)
+        for _ in range(rng.randrange(4)):
+            if new and rng.random() < 0.4:
+                new.pop(rng.randrange(len(new)))
+            else:
+                new.insert(rng.randrange(len(new) + 1), Row(str(next_iid), (f'Window {next_iid}',), None))
+                next_iid += 1
+        for _ in range(rng.randrange(3)):
+            if len(new) > 1:
+                new.insert(rng.randrange(len(new)), new.pop(rng.randrange(len(new))))
+        if new and rng.random() < 0.3:
+            i = rng.randrange(len(new))
+            new[i] = new[i]._replace(values=(f'Retitled {rng.random()}',))
+        model.sync(new)
+        assert shown(fake_tree) == [(row.iid, row.values) for row in new]
+        current = new
+
+
+def test_sync_keeps_unchanged_rows(fake_tree):
+    # Rows that only shift because others came or went are never deleted
+    # and reinserted, so they keep their selection
+    model = TreeModel(fake_tree)
+    model.sync(rows(*'abcde'))
+    deleted = []
+    delete = fake_tree.delete
+    fake_tree.delete = lambda *iids: (deleted.extend(iids), delete(*iids))
+    model.sync(rows(*'zbcdy'))
+    assert deleted == ['a', 'e']
+    assert list(fake_tree.get_children()) == list('zbcdy')
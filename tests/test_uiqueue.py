@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from uiqueue import LATEST, ONCE, TOGGLE, UiQueue
+
+
+def recording_queue(**modes):
+    # A queue whose handlers append (kind, *args) to `ran`
+    ui_queue = UiQueue()
+    ran = []
+    for kind in ('work',) + tuple(modes):
+        ui_queue.register(kind, lambda *args, kind=kind: ran.append((kind,) + args), modes.get(kind))
+    return ui_queue, ran
+
+
+def test_toggle_pairs_cancel():
+    ui_queue, ran = recording_queue(toggle=TOGGLE)
+    ui_queue.post('toggle')
+    ui_queue.post('work', 1)
+    ui_queue.post('toggle')  # Show + hide is no change
+    assert ui_queue.drain() is False
+    assert ran == [('work', 1)]
+    for _ in range(3):
+        ui_queue.post('toggle')
+    ui_queue.drain()
+    assert ran == [('work', 1), ('toggle',)]
+    assert ui_queue.stats()['coalesced'] == 2
+
+
+def test_latest_keeps_its_place_with_the_newest_args():
+    ui_queue, ran = recording_queue(select=LATEST)
+    ui_queue.post('work', 1)
+    ui_queue.post('select', 'a')
+    ui_queue.post('work', 2)
+    ui_queue.post('select', 'b')
+    ui_queue.post('select', 'c')
+    assert len(ui_queue) == 3
+    ui_queue.drain()
+    assert ran == [('work', 1), ('select', 'c'), ('work', 2)]
+
+
+def test_once_is_queued_again_after_it_has_run():
+    ui_queue, ran = recording_queue(refresh=ONCE)
+    for _ in range(5):
+        ui_queue.post('refresh')
+    ui_queue.drain()
+    assert ran == [('refresh',)]
+    ui_queue.post('refresh')
+    ui_queue.drain()
+    assert ran == [('refresh',), ('refresh',)]
+
+    # A handler that posts itself again (to finish later) is queued anew
+    def refresh_in_parts():
+        ran.append(('part',))
+        if len(ran) < 5:
+            ui_queue.post('parts')
+    ui_queue.register('parts', refresh_in_parts, ONCE)
+    ui_queue.post('parts')
+    while ui_queue.drain():
+        pass
+    assert ran[2:] == [('part',)] * 3
+
+
+def test_drain_stops_once_the_budget_is_spent(clock):
+    ui_queue = UiQueue()
+    left = []
+
+    def work():
+        left.append(ui_queue.remaining())
+        clock.sleep(0.003)
+    ui_queue.register('work', work)
+    for _ in range(10):
+        ui_queue.post('work')
+    assert ui_queue.remaining() is None
+    assert ui_queue.drain(0.008) is True
+    # 3 ms each: the third runs past 8 ms and ends the slice
+    assert left == pytest.approx([0.008, 0.005, 0.002])
+    assert len(ui_queue) == 7
+    assert ui_queue.longest_slice == pytest.approx(0.009)
+    while ui_queue.drain(0.008):
+        pass
+    assert len(left) == 10
+    assert ui_queue.stats()['executed'] == 10
+    assert ui_queue.remaining() is None
+
+
+def test_errors_and_unknown_kinds(capsys):
+    ui_queue, ran = recording_queue()
+    ui_queue.register('broken', lambda: 1 / 0)
+    ui_queue.post('broken')
+    ui_queue.post('work', 1)
+    ui_queue.drain()
+    assert ran == [('work', 1)]
+    assert 'Error running broken: division by zero' in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        ui_queue.post('unregistered')
+
+
+def test_many_producers_lose_and_repeat_nothing():
+    ui_queue, ran = recording_queue(refresh=ONCE, select=LATEST, toggle=TOGGLE)
+    producers, posts = 8, 500
+    done = threading.Event()
+
+    def produce(seed):
+        for i in range(posts):
+            ui_queue.post('work', seed, i)
+            ui_queue.post(('refresh', 'select', 'toggle')[i % 3], *((seed, i) if i % 3 == 1 else ()))
+
+    def consume():
+        # Stands in for the Tk thread, draining while the producers post
+        while not done.is_set() or len(ui_queue):
+            if not ui_queue.drain(0.002):
+                time.sleep(0.0005)
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    threads = [threading.Thread(target=produce, args=(seed,)) for seed in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done.set()
+    consumer.join()
+
+    work = [entry for entry in ran if entry[0] == 'work']
+    assert sorted(work) == [('work', seed, i) for seed in range(producers) for i in range(posts)]
+    for seed in range(producers):
+        # Each producer's commands run in the order it posted them
+        assert [i for _, s, i in work if s == seed] == list(range(posts))
+    stats = ui_queue.stats()
+    assert stats['posted'] == producers * posts * 2
+    assert stats['executed'] == len(ran)
+    # Toggles cancel in pairs, so the window ends up shown or hidden as if
+    # every one had run
+    toggles = producers * len(range(2, posts, 3))
+    assert sum(entry[0] == 'toggle' for entry in ran) % 2 == toggles % 2
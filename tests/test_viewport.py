@@ -0,0 +1,116 @@
+import threading
+import time
+
+from iconpool import IconPool
+from viewport import LazyIcons
+
+
+def tracked(tree, rows=200, margin=5):
+    loaded = []
+
+    def load_photo(key):
+        loaded.append(key)
+        return f'photo:{key}'
+    icons = LazyIcons(tree, load_photo, margin=margin)
+    order = []
+    for i in range(rows):
+        iid = tree.insert('', 'end', iid=str(i))
+        icons.track(iid, f'app{i % 7}.exe')
+        order.append(iid)
+    return icons, order, loaded
+
+
+def test_only_rows_near_the_view_get_icons(fake_tree):
+    icons, order, loaded = tracked(fake_tree)
+    icons.update(order)
+    # 20 rows on screen plus a margin of 5 below
+    assert set(icons.attached) == set(order[:25])
+    assert fake_tree.item('0', 'image') == 'photo:app0.exe'
+    assert fake_tree.item('100', 'image') == ''
+    assert len(loaded) == 25
+
+
+def test_rows_far_out_of_view_are_released(fake_tree):
+    icons, order, _ = tracked(fake_tree)
+    icons.update(order)
+    fake_tree.yview_moveto(0.5)
+    icons.update(order)
+    assert '0' not in icons.attached
+    assert fake_tree.item('0', 'image') == ''
+    assert fake_tree.item('100', 'image') == 'photo:app2.exe'
+    assert icons.stats()['releases'] == 25
+
+
+def test_reload_loads_that_key_again(fake_tree):
+    icons, order, loaded = tracked(fake_tree)
+    icons.update(order)
+    loaded.clear()
+    icons.reload('app3.exe')
+    icons.update(order)
+    assert loaded == ['app3.exe'] * 4  # Rows 3, 10, 17 and 24
+
+
+def test_cancelled_icon_loads_are_requested_again(gui, fake_backend, monkeypatch):
+    # A single worker stuck on the first icon, so the rest stay queued
+    release = threading.Event()
+
+    def load_many(paths):
+        release.wait(5)
+        return [None] * len(paths)
+    pool = IconPool(load_many, workers=1, batch_size=1)
+    monkeypatch.setattr(gui, 'icon_pool', pool)
+    monkeypatch.setattr(gui, 'placeholder_icon', lambda: 'placeholder')
+    monkeypatch.setattr(gui, 'make_icon_photo', lambda rgba: 'icon')
+    monkeypatch.setattr(gui, 'lazy_icons', LazyIcons(gui.tree, gui.load_icon))
+    records = list(gui.scan_windows(threading.Event()))
+    gui.on_refresh_batch(records)
+    gui.on_refresh_done()
+    while not pool.started:
+        time.sleep(0.001)  # Wait for the worker to take its path
+    queued = pool.stats()['in_flight']
+    assert queued > 1
+
+    class Pipeline:
+        running = True
+
+        def start(self):
+            pass
+    monkeypatch.setattr(gui, 'refresh_pipeline', Pipeline())
+    gui.populate_list()
+    assert pool.stats()['cancelled'] == queued - 1
+    # The next update queues the rows still on screen again
+    gui.update_icons()
+    assert pool.stats()['in_flight'] == queued
+
+    release.set()
+    pool.shutdown()
+    pool.executor.shutdown(wait=True)
+
+
+def test_rows_removed_by_a_filter_are_dropped(fake_tree):
+    icons, order, loaded = tracked(fake_tree)
+    icons.update(order)
+    # Filtering deletes the rows that don't match; they stay tracked
+    hidden = [iid for iid in order[:25] if int(iid) % 2]
+    fake_tree.delete(*hidden)
+    shown = [iid for iid in order if iid not in hidden]
+    icons.update(shown)
+    assert not set(hidden) & set(icons.attached)
+    # Back again once the filter is cleared, with their icon reloaded
+    loaded.clear()
+    for iid in hidden:
+        fake_tree.insert('', int(iid), iid=iid)
+    icons.update(order)
+    assert fake_tree.item(hidden[0], 'image') == f'photo:app{int(hidden[0]) % 7}.exe'
+    assert sorted(loaded) == sorted(f'app{int(iid) % 7}.exe' for iid in hidden)
+
+
+def test_filtering_after_icons_are_attached(gui, fake_backend, monkeypatch):
+    monkeypatch.setattr(gui, 'filter_query', '')
+    records = list(gui.scan_windows(threading.Event()))
+    gui.on_refresh_batch(records)
+    gui.on_refresh_done()
+    assert gui.lazy_icons.attached
+    monkeypatch.setattr(gui, 'filter_query', records[3].title)
+    gui.sync_rows(gui.list_rows)
+    assert set(gui.lazy_icons.attached) <= set(gui.tree.get_children())
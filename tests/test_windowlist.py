@@ -0,0 +1,64 @@
+import winops
+from backend import WS_EX_TOOLWINDOW, WS_OVERLAPPEDWINDOW, WS_VISIBLE, FakeWindow
+from windowlist import WindowList
+
+ROWS = [
+    (0x10000, 1000, 'Editor', 'Notepad', (0, 0, 800, 600)),
+    (0x20000000002, 4294967295, 'Ünïcode — title', 'Chrome_WidgetWin_1', (-1920, -8, 1936, 1056)),
+    (0x10004, 1004, 'Game', 'UnityWndClass', (0, 0, 2560, 1440)),
+]
+
+
+def test_rows_and_rects_give_back_what_was_appended():
+    windows = WindowList()
+    for row in ROWS:
+        windows.append(*row)
+    assert len(windows) == 3
+    assert list(windows.rows()) == ROWS
+    assert [windows.rect(i) for i in range(3)] == [row[4] for row in ROWS]
+    # Iterates like enum_windows()
+    assert list(windows) == [(row[0], row[2]) for row in ROWS]
+
+
+def test_from_rows():
+    windows = WindowList.from_rows(ROWS)
+    assert list(windows.rows()) == ROWS
+    assert list(WindowList.from_rows(windows.rows()).rows()) == ROWS
+    assert len(WindowList.from_rows([])) == 0
+
+
+def add_hidden_windows(backend):
+    # One window for each reason list_windows() leaves it out
+    pid = next(iter(backend.processes))
+    style = WS_OVERLAPPEDWINDOW | WS_VISIBLE
+    left_out = {
+        0x900000: FakeWindow(0x900000, pid, 'Hidden', 'Helper', style, (0, 0, 10, 10), visible=False),
+        0x900002: FakeWindow(0x900002, pid, '', 'Untitled', style, (0, 0, 10, 10)),
+        0x900004: FakeWindow(0x900004, pid, 'Tool', 'Tooltip', style, (0, 0, 10, 10), exstyle=WS_EX_TOOLWINDOW),
+        0x900006: FakeWindow(0x900006, pid, 'Cloaked', 'ApplicationFrameWindow', style, (0, 0, 10, 10),
+                             cloaked=True),
+    }
+    for window in left_out.values():
+        backend.add_window(window)
+    return left_out
+
+
+def test_list_windows_leaves_out_hidden_untitled_tool_and_cloaked_windows(fake_backend):
+    left_out = add_hidden_windows(fake_backend)
+    listed = fake_backend.list_windows()
+    hwnds = set(listed.hwnds)
+    assert not hwnds & set(left_out)
+    assert hwnds == set(fake_backend.windows) - set(left_out)
+    for hwnd, pid, title, window_class, rect in listed.rows():
+        window = fake_backend.windows[hwnd]
+        assert (pid, title, window_class, rect) == (window.pid, window.title, window.window_class, window.rect)
+
+
+def test_the_per_window_checks_agree_with_list_windows(fake_backend):
+    # The checks the GUI makes for a window a window event names
+    add_hidden_windows(fake_backend)
+    listed = set(winops.get_window_list().hwnds)
+    for hwnd in fake_backend.windows:
+        listable = (winops.is_live_window(hwnd) and bool(winops.get_window_text(hwnd))
+                    and winops.is_listable_window(hwnd))
+        assert listable == (hwnd in listed), hex(hwnd)
@@ -0,0 +1,43 @@
+from treediff import Row
+from winevents import EventCoalescer, ScriptedEventSource, apply_changes
+
+
+def coalesce(events, **options):
+    coalescer = EventCoalescer(**options)
+    source = ScriptedEventSource()
+    source.start(coalescer.push)
+    source.play(events)
+    return coalescer
+
+
+def test_burst_folds_into_net_changes():
+    coalescer = coalesce([('create', 1), ('name', 1), ('name', 2), ('destroy', 3),
+                          ('create', 4), ('destroy', 4), ('hide', 3)])
+    removed, dirty = coalescer.flush(force=True)
+    assert removed == {3}  # Hidden after being destroyed: still gone
+    assert dirty == {1, 2}  # 4 came and went inside the burst
+    assert coalescer.flush(force=True) is None
+
+
+def test_reused_hwnd_is_looked_up_again():
+    removed, dirty = coalesce([('destroy', 5), ('create', 5)]).flush(force=True)
+    assert removed == set()
+    assert dirty == {5}
+
+
+def test_flush_waits_for_a_quiet_spell():
+    coalescer = coalesce([('name', 1)], debounce=60, max_delay=120)
+    assert coalescer.flush() is None
+    assert coalescer.flush(force=True) == (set(), {1})
+
+
+def test_storm_is_flushed_after_max_delay():
+    coalescer = coalesce([('name', 1)], debounce=60, max_delay=0)
+    assert coalescer.flush() == (set(), {1})
+
+
+def test_apply_changes_updates_in_place_and_appends():
+    rows = [Row(iid, (iid,), None) for iid in ('1', '2', '3', '4')]
+    resolved = {'2': Row('2', ('Renamed',), None), '3': None, '9': Row('9', ('New',), None)}
+    result = apply_changes(rows, {'4'}, resolved)
+    assert [(row.iid, row.values) for row in result] == [('1', ('1',)), ('2', ('Renamed',)), ('9', ('New',))]
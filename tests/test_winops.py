@@ -0,0 +1,107 @@
+import pytest
+
+import winops
+from journal import StyleJournal
+
+
+@pytest.fixture
+def journal(fake_backend, tmp_path):
+    journal = StyleJournal(str(tmp_path / 'journal.jsonl'))
+    winops.set_journal(journal)
+    return journal
+
+
+def looks(backend, hwnds):
+    return [(backend.windows[hwnd].style, backend.windows[hwnd].rect) for hwnd in hwnds]
+
+
+def test_apply_many_moves_every_window_in_one_batch(fake_backend, journal):
+    hwnds = list(fake_backend.windows)[:10]
+    before = looks(fake_backend, hwnds)
+    fake_backend.calls.clear()
+    assert winops.apply_many(hwnds) == hwnds
+    assert fake_backend.calls['set_positions'] == 1
+    assert fake_backend.calls['set_position'] == 0
+    for hwnd in hwnds:
+        assert winops.is_borderless(hwnd)
+        assert fake_backend.windows[hwnd].rect == winops.fullscreen_rect(hwnd)
+    assert len(journal) == 10
+
+    fake_backend.calls.clear()
+    assert winops.restore_many(hwnds) == hwnds
+    assert fake_backend.calls['set_positions'] == 1
+    assert looks(fake_backend, hwnds) == before
+    assert len(journal) == 0
+
+
+def test_windows_already_in_the_target_state_are_skipped(fake_backend, journal):
+    hwnds = list(fake_backend.windows)[:10]
+    winops.apply_many(hwnds[:4])
+    fake_backend.calls.clear()
+    assert winops.apply_many(hwnds) == hwnds[4:]
+    assert fake_backend.calls['set_positions'] == 1
+    winops.restore_many(hwnds)
+    fake_backend.calls.clear()
+    assert winops.restore_many(hwnds) == []
+    assert fake_backend.calls['set_positions'] == 0
+    assert fake_backend.calls['set_style'] == 0
+
+
+class DeferApi:
+    # BeginDeferWindowPos & co., failing the `fail_at`th DeferWindowPos
+    def __init__(self, fail_at):
+        self.fail_at = fail_at
+        self.deferred = []
+        self.ended = []
+
+    def BeginDeferWindowPos(self, count):
+        return 1
+
+    def DeferWindowPos(self, hdwp, hwnd, *args):
+        if len(self.deferred) == self.fail_at:
+            return 0  # Windows has freed the batch, moves deferred so far included
+        self.deferred.append(hwnd)
+        return hdwp
+
+    def EndDeferWindowPos(self, hdwp):
+        self.ended.extend(self.deferred)
+        return True
+
+
+@pytest.mark.parametrize('fail_at', [None, 0, 2])
+def test_win32_set_positions_makes_every_move_when_a_batch_fails(monkeypatch, fail_at):
+    import backend
+    api = DeferApi(fail_at)
+    monkeypatch.setattr(backend, '_user32', api)
+    win32 = object.__new__(backend.Win32Backend)  # No pywin32 here
+    single = []
+    monkeypatch.setattr(win32, 'set_position', lambda hwnd, *rect: single.append(hwnd), raising=False)
+    moves = [(hwnd, 0, 0, 100, 100) for hwnd in range(1, 5)]
+    win32.set_positions(moves)
+    if fail_at is None:
+        assert api.ended == [1, 2, 3, 4] and single == []
+    else:
+        assert api.ended == [] and single == [1, 2, 3, 4]
+
+
+@pytest.mark.parametrize('reuse', ['other process', 'restarted process'])
+def test_toggle_ignores_a_saved_look_for_a_reused_hwnd(fake_backend, journal, reuse):
+    hwnd = fake_backend.get_foreground()
+    assert winops.toggle_foreground() == (hwnd, True)
+    # The window closes and its hwnd turns up again on a new window
+    window = fake_backend.windows[hwnd]
+    window.style |= winops.BORDER_STYLE
+    window.rect = (10, 20, 300, 200)
+    if reuse == 'other process':
+        window.pid = next(pid for pid in fake_backend.processes if pid != window.pid)
+    else:
+        info = fake_backend.processes[window.pid]
+        fake_backend.processes[window.pid] = info._replace(create_time=info.create_time + 60)
+
+    assert winops.toggle_foreground() == (hwnd, True)
+    assert winops.is_borderless(hwnd)
+    saved = journal.get(hwnd)
+    assert saved.rect == (10, 20, 300, 200)
+    assert winops.toggle_foreground() == (hwnd, False)
+    assert window.rect == (10, 20, 300, 200)
+    assert journal.get(hwnd) is None
@@ -0,0 +1,132 @@
+"""
+Session recording: the trace every backend call, window event and
+refresh or toggle goes into.
+
+`trace` is off until `start(filename)`; while it is off a `mark()` or
+`event()` costs one check, so winops and the entry points can mark
+their operations unconditionally. `RecordingBackend` wraps the backend
+to write each call. replay.py reads the traces back and is only needed
+to replay them.
+"""
+import json
+import threading
+import time
+from contextlib import nullcontext
+
+FORMAT = 'borderx-trace'
+VERSION = 1
+
+_OFF = nullcontext()
+
+
+def _encode(value):
+    # JSON-able form of a backend argument or result; icon bits are kept
+    # only as their length, callbacks not at all
+    if isinstance(value, (bytes, bytearray)):
+        return {'bytes': len(value)}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if callable(value):
+        return None
+    if hasattr(value, 'rows'):
+        return [_encode(row) for row in value.rows()]  # A WindowList
+    return value
+
+
+class _Mark:
+    __slots__ = ('recorder', 'action', 'args', 'started')
+
+    def __init__(self, recorder, action, args):
+        self.recorder = recorder
+        self.action = action
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Written when the operation ends, after the calls it made, so a
+        # replay has seen what the operation saw before it re-runs it
+        duration = time.perf_counter() - self.started
+        self.recorder._write(['m', self.recorder._offset(self.started), self.action,
+                              _encode(self.args), duration])
+
+
+class TraceRecorder:
+    """
+    Writes the trace. Off until `start(filename)`; `mark()` and `event()`
+    cost one check while it is off.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.file = None
+        self.lock = threading.Lock()
+        self.started_at = 0.0
+        self.records = 0
+
+    def start(self, filename):
+        import gzip
+        self.file = gzip.open(filename, 'wt', encoding='utf-8', compresslevel=6)
+        self.started_at = time.perf_counter()
+        self.records = 0
+        self.enabled = True
+        self._write({'format': FORMAT, 'version': VERSION, 'recorded_at': time.time()})
+
+    def stop(self):
+        self.enabled = False
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def _offset(self, when):
+        return round(when - self.started_at, 6)
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line)
+                self.records += 1
+
+    def call(self, name, args, result, started, duration):
+        self._write(['c', self._offset(started), name, _encode(args), _encode(result), round(duration, 7)])
+
+    def event(self, event):
+        if self.enabled:
+            self._write(['e', self._offset(time.perf_counter()), event.kind, event.hwnd])
+
+    def mark(self, action, *args):
+        if not self.enabled:
+            return _OFF
+        return _Mark(self, action, args)
+
+
+trace = TraceRecorder()
+
+
+class RecordingBackend:
+    """
+    Wraps another backend and records every public call made through it.
+    """
+
+    def __init__(self, inner, recorder=None):
+        self.inner = inner
+        self.recorder = recorder or trace
+
+    def __getattr__(self, name):
+        attr = getattr(self.inner, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        recorder = self.recorder
+
+        def call(*args):
+            started = time.perf_counter()
+            result = attr(*args)
+            recorder.call(name, args, result, started, time.perf_counter() - started)
+            return result
+
+        setattr(self, name, call)  # Found directly from now on
+        return call
@@ -0,0 +1,190 @@
+"""
+Keyed diffing of the window list, so a refresh only sends Tk the inserts,
+deletes, moves and item updates that changed. Run this module to count
+the Tk calls per refresh under churn:
+
+    python treediff.py
+"""
+from bisect import bisect_left
+from collections import namedtuple
+
+# One row of the window list: `iid` is the Treeview item id (the hwnd),
+# `values` the column values and `image` the icon, or None to leave the
+# row's image to whoever manages it (see viewport.LazyIcons).
+Row = namedtuple('Row', ['iid', 'values', 'image'])
+
+Diff = namedtuple('Diff', ['added', 'removed', 'changed', 'moved'])
+
+
+def stable_keys(old_order, new_order):
+    """
+    Return the set of keys that can stay where they are when going from
+    `old_order` to `new_order`: the longest run of surviving keys whose
+    relative order is unchanged. Every other surviving key has to move.
+    """
+    position = {key: i for i, key in enumerate(old_order)}
+    seq = [key for key in new_order if key in position]
+    # Patience sort over old positions, keeping back-pointers
+    tails = []
+    tail_index = []
+    parent = [None] * len(seq)
+    for i, key in enumerate(seq):
+        p = position[key]
+        j = bisect_left(tails, p)
+        if j == len(tails):
+            tails.append(p)
+            tail_index.append(i)
+        else:
+            tails[j] = p
+            tail_index[j] = i
+        parent[i] = tail_index[j - 1] if j else None
+    stable = set()
+    i = tail_index[-1] if tail_index else None
+    while i is not None:
+        stable.add(seq[i])
+        i = parent[i]
+    return stable
+
+
+def diff_rows(old_rows, new_rows):
+    """
+    Compare two ordered lists of rows and return a Diff of iids that were
+    added, removed, changed (values or image) and moved.
+    """
+    old = {row.iid: row for row in old_rows}
+    new_iids = [row.iid for row in new_rows]
+    new_set = set(new_iids)
+    stable = stable_keys([row.iid for row in old_rows], new_iids)
+    added = [row.iid for row in new_rows if row.iid not in old]
+    removed = [row.iid for row in old_rows if row.iid not in new_set]
+    changed = [row.iid for row in new_rows if row.iid in old and old[row.iid] != row]
+    moved = [iid for iid in new_iids if iid in old and iid not in stable]
+    return Diff(added, removed, changed, moved)
+
+
+class TreeModel:
+    """
+    Keyed view model for a ttk.Treeview (or anything with the same
+    insert/delete/item/move methods). `sync()` brings the tree in line with
+    a new list of rows using only the calls the diff requires, so rows that
+    didn't change keep their selection and the view doesn't jump.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.rows = []
+        self.by_iid = {}
+        self.last_calls = 0  # Tree calls issued by the latest sync
+
+    def sync(self, new_rows):
+        diff = diff_rows(self.rows, new_rows)
+        tree = self.tree
+        calls = 0
+        if diff.removed:
+            tree.delete(*diff.removed)
+            calls += 1
+
+        removed = set(diff.removed)
+        order = [row.iid for row in self.rows if row.iid not in removed]
+        added = set(diff.added)
+        changed = set(diff.changed)
+        moved = set(diff.moved)
+        prev = None
+        prev_at = -1  # Best guess of prev's position in `order`
+        for row in new_rows:
+            iid = row.iid
+            if iid in added or iid in moved:
+                if prev is not None and order[prev_at:prev_at + 1] != [prev]:
+                    prev_at = order.index(prev)
+                index = prev_at + 1 if prev is not None else 0
+            if iid in added:
+                options = {'image': row.image} if row.image is not None else {}
+                tree.insert('', index, iid=iid, values=row.values, **options)
+                order.insert(index, iid)
+                calls += 1
+                prev_at = index
+            else:
+                if iid in changed:
+                    options = {'image': row.image} if row.image is not None else {}
+                    tree.item(iid, values=row.values, **options)
+                    calls += 1
+                if iid in moved and order[index:index + 1] != [iid]:
+                    # Tk's index is where the row ends up, counted without
+                    # the row itself: one less when it moves down
+                    at = order.index(iid)
+                    del order[at]
+                    if at < index:
+                        index -= 1
+                    tree.move(iid, '', index)
+                    order.insert(index, iid)
+                    prev_at = index
+                    calls += 1
+                else:
+                    prev_at += 1  # Usually right after prev; checked before use
+            prev = iid
+
+        self.rows = list(new_rows)
+        self.by_iid = {row.iid: row for row in self.rows}
+        self.last_calls = calls
+        return diff
+
+
+class _CountingTree:
+    # Just enough of a Treeview, with Tk's index semantics, to count calls
+    def __init__(self):
+        self.children = []
+        self.calls = 0
+
+    def insert(self, parent, index, iid=None, **options):
+        self.calls += 1
+        self.children.insert(len(self.children) if index == 'end' else index, iid)
+
+    def delete(self, *iids):
+        self.calls += 1
+        gone = set(iids)
+        self.children = [iid for iid in self.children if iid not in gone]
+
+    def item(self, iid, **options):
+        self.calls += 1
+
+    def move(self, iid, parent, index):
+        self.calls += 1
+        self.children.remove(iid)
+        self.children.insert(index, iid)
+
+
+def _benchmark(sizes=(100, 1000, 5000), refreshes=20, churn=0.01):
+    import random
+    import time
+    for size in sizes:
+        rng = random.Random(size)
+        current = [Row(str(i), (f'Window {i}',), None) for i in range(size)]
+        next_iid = size
+        tree = _CountingTree()
+        model = TreeModel(tree)
+        model.sync(current)
+        tree.calls = 0
+        elapsed = 0.0
+        for _ in range(refreshes):
+            # `churn` of the windows each close, open, retitle and move
+            new = list(current)
+            changes = max(1, int(size * churn))
+            for _ in range(changes):
+                new.pop(rng.randrange(len(new)))
+                new.insert(rng.randrange(len(new) + 1), Row(str(next_iid), (f'Window {next_iid}',), None))
+                next_iid += 1
+                i = rng.randrange(len(new))
+                new[i] = new[i]._replace(values=(f'Retitled {rng.random():.3f}',))
+                new.insert(rng.randrange(len(new)), new.pop(rng.randrange(len(new))))
+            started = time.perf_counter()
+            model.sync(new)
+            elapsed += time.perf_counter() - started
+            assert tree.children == [row.iid for row in new]
+            current = new
+        # Deleting every row and inserting them again costs 1 + size calls
+        print(f'{size} rows, {changes} of each change per refresh: {tree.calls / refreshes:.1f} Tk calls '
+              f'per refresh (rebuilding: {1 + size}), sync {elapsed / refreshes * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    _benchmark()
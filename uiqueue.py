@@ -0,0 +1,206 @@
+"""
+One queue for everything other threads want done on the Tk thread.
+
+Tk may only be touched from the thread that created it, so the tray,
+the control endpoint and any other worker post commands here instead,
+and the Tk thread runs them from `root.after` a slice at a time. Run this
+module for a stress test with many producer threads:
+
+    python uiqueue.py
+"""
+import threading
+import time
+from collections import deque
+
+# How a command posted while one of its kind is still queued is handled
+ONCE = 'once'  # Dropped: one refresh does the work of five
+LATEST = 'latest'  # Replaces the queued one's arguments, keeping its place
+TOGGLE = 'toggle'  # Cancels the queued one: show + hide is no change
+
+
+class _Command:
+    __slots__ = ('kind', 'args', 'posted_at', 'cancelled')
+
+    def __init__(self, kind, args, posted_at):
+        self.kind = kind
+        self.args = args
+        self.posted_at = posted_at
+        self.cancelled = False
+
+
+class UiQueue:
+    """
+    Commands are registered by kind with `register(kind, handler,
+    coalesce)` and posted from any thread with `post(kind, *args)`.
+    `drain(budget)` runs them in order on the Tk thread, stopping once
+    `budget` seconds have gone so a flood can't freeze the window, and
+    returns True if some are left. A handler that can stop part way asks
+    `remaining()` how much of the slice is left and posts itself again
+    for the rest.
+
+    Posting takes a lock only long enough to append; `stats()` gives the
+    queue depth and how long commands waited before running.
+    """
+
+    def __init__(self, keep=1024):
+        self.handlers = {}
+        self.modes = {}
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.pending = {}  # kind -> queued command, for coalescing kinds
+        self.waits = deque(maxlen=keep)
+        self.posted = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.max_depth = 0
+        self.slices = 0
+        self.longest_slice = 0.0
+        self.deadline = None
+
+    def register(self, kind, handler, coalesce=None):
+        self.handlers[kind] = handler
+        self.modes[kind] = coalesce
+
+    def __len__(self):
+        return len(self.queue)
+
+    def post(self, kind, *args):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown UI command {kind!r}")
+        mode = self.modes[kind]
+        with self.lock:
+            self.posted += 1
+            if mode is not None:
+                queued = self.pending.get(kind)
+                if queued is not None:
+                    self.coalesced += 1
+                    if mode == LATEST:
+                        queued.args = args
+                    elif mode == TOGGLE:
+                        queued.cancelled = True
+                        del self.pending[kind]
+                    return
+            command = _Command(kind, args, time.perf_counter())
+            if mode is not None:
+                self.pending[kind] = command
+            self.queue.append(command)
+            if len(self.queue) > self.max_depth:
+                self.max_depth = len(self.queue)
+
+    def remaining(self):
+        """
+        Return the seconds left of the slice `drain()` is running, or None
+        outside of one.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def drain(self, budget=0.008):
+        started = time.perf_counter()
+        self.deadline = started + budget
+        queue = self.queue
+        while queue:
+            with self.lock:
+                command = queue.popleft()
+                if self.pending.get(command.kind) is command:
+                    del self.pending[command.kind]
+            if command.cancelled:
+                continue
+            now = time.perf_counter()
+            self.waits.append(now - command.posted_at)
+            self.executed += 1
+            try:
+                self.handlers[command.kind](*command.args)
+            except Exception as e:
+                print(f"Error running {command.kind}: {e}")
+            if time.perf_counter() - started >= budget:
+                break
+        self.deadline = None
+        elapsed = time.perf_counter() - started
+        self.slices += 1
+        self.longest_slice = max(self.longest_slice, elapsed)
+        return bool(queue)
+
+    def stats(self):
+        waits = sorted(self.waits)
+        stats = {
+            'depth': len(self.queue),
+            'max_depth': self.max_depth,
+            'posted': self.posted,
+            'coalesced': self.coalesced,
+            'executed': self.executed,
+            'longest_slice_ms': round(self.longest_slice * 1000, 3),
+        }
+        if waits:
+            stats['wait_p50_ms'] = round(waits[len(waits) // 2] * 1000, 3)
+            stats['wait_p99_ms'] = round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3)
+            stats['wait_max_ms'] = round(waits[-1] * 1000, 3)
+        return stats
+
+
+def _benchmark(producers=(1, 8, 64), posts=2000, poll_ms=5):
+    import random
+    for count in producers:
+        ui_queue = UiQueue(keep=posts * count)
+        ran = []
+        state = {'visible': True, 'refreshes': 0, 'latest': None}
+        ui_queue.register('work', ran.append)
+        ui_queue.register('refresh', lambda: state.update(refreshes=state['refreshes'] + 1), ONCE)
+        ui_queue.register('select', lambda value: state.update(latest=value), LATEST)
+        ui_queue.register('toggle', lambda: state.update(visible=not state['visible']), TOGGLE)
+        toggles = [0]
+        toggles_lock = threading.Lock()
+
+        def produce(seed):
+            rng = random.Random(seed)
+            for i in range(posts):
+                roll = rng.random()
+                if roll < 0.5:
+                    ui_queue.post('work', (seed, i))
+                elif roll < 0.8:
+                    ui_queue.post('refresh')
+                elif roll < 0.9:
+                    ui_queue.post('select', (seed, i))
+                else:
+                    with toggles_lock:
+                        toggles[0] += 1
+                    ui_queue.post('toggle')
+
+        done = threading.Event()
+
+        def consume():
+            # Stands in for the Tk thread's root.after loop
+            while True:
+                more = ui_queue.drain()
+                if not more:
+                    if done.is_set() and not len(ui_queue):
+                        return
+                    time.sleep(poll_ms / 1000)
+
+        consumer = threading.Thread(target=consume)
+        consumer.start()
+        threads = [threading.Thread(target=produce, args=(seed,)) for seed in range(count)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        consumer.join()
+        elapsed = time.perf_counter() - started
+        expected = sum(1 for seed in range(count) for roll in _rolls(seed, posts) if roll < 0.5)
+        assert len(ran) == expected == len(set(ran)), 'work commands lost or repeated'
+        assert state['visible'] == (toggles[0] % 2 == 0), 'toggles miscounted'
+        print(f'{count} producers x {posts} posts: {ui_queue.posted / elapsed:.0f} posts/s, '
+              f'{state["refreshes"]} refreshes run, {ui_queue.stats()}')
+
+
+def _rolls(seed, posts):
+    import random
+    rng = random.Random(seed)
+    return [rng.random() for _ in range(posts)]
+
+
+if __name__ == '__main__':
+    _benchmark()
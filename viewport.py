@@ -0,0 +1,72 @@
+import math
+
+
+class LazyIcons:
+    """
+    Attaches icons only to the rows of a Treeview that are on screen or
+    within `margin` rows of it, and detaches them again once a row is more
+    than twice that far away. The list holds no other reference to its
+    PhotoImages, so icons scrolled far out of view are freed.
+
+    `load_photo(key)` returns the PhotoImage for a row's key (or None);
+    rows are given with `track(iid, key)` and the view is brought up to
+    date by `update(order)` with the iids in display order.
+    """
+
+    def __init__(self, tree, load_photo, margin=20):
+        self.tree = tree
+        self.load_photo = load_photo
+        self.margin = margin
+        self.keys = {}  # iid -> key passed to load_photo
+        self.attached = {}  # iid -> PhotoImage shown on the row
+        self.loads = 0
+        self.releases = 0
+
+    def track(self, iid, key):
+        if self.keys.get(iid) != key:
+            self.keys[iid] = key
+            self.attached.pop(iid, None)  # Reloaded on the next update
+
+    def reload(self, key):
+        """
+        Load the icon of every row showing `key` again on the next update,
+        e.g. once a placeholder's real icon is ready.
+        """
+        for iid in [iid for iid in self.attached if self.keys.get(iid) == key]:
+            del self.attached[iid]
+
+    def forget(self, iid):
+        self.keys.pop(iid, None)
+        self.attached.pop(iid, None)
+
+    def visible_range(self, count):
+        """
+        Return the (first, last) row indexes currently on screen.
+        """
+        top, bottom = self.tree.yview()
+        return int(top * count), min(count, math.ceil(bottom * count))
+
+    def update(self, order):
+        count = len(order)
+        if not count:
+            return
+        first, last = self.visible_range(count)
+        keep = set(order[max(0, first - 2 * self.margin):last + 2 * self.margin])
+        for iid in [iid for iid in self.attached if iid not in keep]:
+            del self.attached[iid]
+            # Still a row, just far out of view; rows the filter hid are
+            # gone from the tree and get their icon again if they return
+            if iid in self.keys and self.tree.exists(iid):
+                self.tree.item(iid, image='')
+                self.releases += 1
+        for iid in order[max(0, first - self.margin):last + self.margin]:
+            if iid in self.attached:
+                continue
+            photo = self.load_photo(self.keys.get(iid))
+            self.tree.item(iid, image=photo or '')
+            self.attached[iid] = photo
+            self.loads += 1
+
+    def stats(self):
+        return {'rows': len(self.keys), 'attached': len(self.attached),
+                'loads': self.loads, 'releases': self.releases}
@@ -0,0 +1,112 @@
+"""
+Compact record set for one pass over the top-level windows.
+
+`backend.list_windows()` fills a WindowList from a single EnumWindows
+callback, dropping invisible, untitled, tool and cloaked windows before
+reading any strings. Run this module to compare it with enumerating and
+then asking for each window's pid and class:
+
+    python windowlist.py
+"""
+from array import array
+
+
+class WindowList:
+    """
+    Columns rather than one object per window: hwnds, pids and rects live
+    in arrays, titles and classes in two lists. Iterating gives (hwnd,
+    title) like `enum_windows()`; `rows()` gives every column.
+    """
+    __slots__ = ('hwnds', 'pids', 'rects', 'titles', 'classes')
+
+    def __init__(self):
+        self.hwnds = array('Q')
+        self.pids = array('L')
+        self.rects = array('i')  # x, y, width, height per window
+        self.titles = []
+        self.classes = []
+
+    def append(self, hwnd, pid, title, window_class, rect):
+        self.hwnds.append(hwnd)
+        self.pids.append(pid)
+        self.rects.extend(rect)
+        self.titles.append(title)
+        self.classes.append(window_class)
+
+    def __len__(self):
+        return len(self.hwnds)
+
+    def __iter__(self):
+        return zip(self.hwnds, self.titles)
+
+    def rect(self, index):
+        return tuple(self.rects[index * 4:index * 4 + 4])
+
+    def rows(self):
+        """
+        Yield (hwnd, pid, title, window_class, rect) for each window.
+        """
+        for index, hwnd in enumerate(self.hwnds):
+            yield hwnd, self.pids[index], self.titles[index], self.classes[index], self.rect(index)
+
+    @classmethod
+    def from_rows(cls, rows):
+        windows = cls()
+        for hwnd, pid, title, window_class, rect in rows:
+            windows.append(hwnd, pid, title, window_class, rect)
+        return windows
+
+
+def _benchmark(windows=(100, 1000, 5000), latency=0.0, runs=5):
+    import sys
+    import time
+    import tracemalloc
+    from backend import WS_EX_TOOLWINDOW, WS_OVERLAPPEDWINDOW, FakeBackend, FakeWindow
+
+    def old_path(backend):
+        # enum_windows, then a pid and class lookup per titled window
+        return [(hwnd, title, backend.get_pid(hwnd), backend.get_class(hwnd))
+                for hwnd, title in backend.enum_windows() if title]
+
+    def measure(function, backend):
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        result = function(backend)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        stats = after.compare_to(before, 'filename')
+        blocks = sum(stat.count_diff for stat in stats)
+        kib = sum(stat.size_diff for stat in stats) / 1024
+        calls = getattr(backend, 'calls', None)  # Only the fake counts its calls
+        if calls is not None:
+            calls.clear()
+        started = time.perf_counter()
+        for _ in range(runs):
+            result = function(backend)
+        elapsed = (time.perf_counter() - started) / runs
+        calls = sum(calls.values()) // runs if calls is not None else '?'
+        return len(result), elapsed, calls, blocks, kib
+
+    if sys.platform == 'win32':
+        from backend import Win32Backend
+        backends = [('desktop', Win32Backend())]
+    else:
+        backends = []
+        for count in windows:
+            backend = FakeBackend(windows=count, latency=latency)
+            # Like a real desktop: most top-level windows are hidden, tool or cloaked
+            for i in range(count * 3):
+                hwnd = 0x800000 + i * 2
+                backend.add_window(FakeWindow(hwnd, 1000, '' if i % 3 else f'Tool {i}', 'Helper',
+                                              WS_OVERLAPPEDWINDOW, (0, 0, 0, 0), visible=i % 2 == 0,
+                                              exstyle=WS_EX_TOOLWINDOW))
+            backends.append((f'{count} listed of {count * 4}', backend))
+    for name, backend in backends:
+        for label, function in (('enum + lookups', old_path), ('list_windows', lambda b: b.list_windows())):
+            count, elapsed, calls, blocks, kib = measure(function, backend)
+            print(f'{name}: {label:<15} {count} windows, {elapsed * 1000:.2f} ms, {calls} calls, '
+                  f'{blocks} blocks / {kib:.0f} KiB allocated')
+
+
+if __name__ == '__main__':
+    _benchmark()
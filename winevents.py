@@ -0,0 +1,293 @@
+"""
+Window create/destroy/rename/show/hide events, and the coalescing that
+folds bursts of them into one update of the window list. Run this module
+for synthetic event storms against the scripted source:
+
+    python winevents.py
+"""
+import threading
+import time
+from collections import namedtuple
+
+# kind is one of 'create', 'destroy', 'name', 'show' or 'hide'
+WindowEvent = namedtuple('WindowEvent', ['kind', 'hwnd'])
+
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+GA_ROOT = 2
+WM_QUIT = 0x0012
+
+EVENT_KINDS = {
+    EVENT_OBJECT_CREATE: 'create',
+    EVENT_OBJECT_DESTROY: 'destroy',
+    EVENT_OBJECT_SHOW: 'show',
+    EVENT_OBJECT_HIDE: 'hide',
+    EVENT_OBJECT_NAMECHANGE: 'name',
+}
+
+
+class EventSource:
+    """
+    Delivers WindowEvents for top-level windows to a callback, which may
+    be called from any thread.
+    """
+
+    def start(self, callback):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+
+class ScriptedEventSource(EventSource):
+    """
+    In-memory event source: events are delivered synchronously by `emit()`
+    and `play()`, for driving the coalescer without Win32.
+    """
+
+    def __init__(self):
+        self.callback = None
+
+    def start(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+    def emit(self, kind, hwnd):
+        if self.callback is not None:
+            self.callback(WindowEvent(kind, hwnd))
+
+    def play(self, events):
+        for kind, hwnd in events:
+            self.emit(kind, hwnd)
+
+
+class WinEventSource(EventSource):
+    """
+    Event source backed by SetWinEventHook, running its own message loop
+    on a daemon thread.
+    """
+
+    def __init__(self):
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+
+    def start(self, callback):
+        self.thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self.thread.start()
+        self.ready.wait(1.0)
+
+    def _run(self, callback):
+        import ctypes
+        from ctypes.wintypes import DWORD, HANDLE, HWND, LONG, MSG
+
+        user32 = ctypes.WinDLL('user32', use_last_error=True)
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        WinEventProc = ctypes.WINFUNCTYPE(None, HANDLE, DWORD, HWND, LONG, LONG, DWORD, DWORD)
+        user32.SetWinEventHook.argtypes = [DWORD, DWORD, HANDLE, WinEventProc, DWORD, DWORD, DWORD]
+        user32.SetWinEventHook.restype = HANDLE
+        user32.GetAncestor.argtypes = [HWND, ctypes.c_uint]
+        user32.GetAncestor.restype = HWND
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, time_ms):
+            if id_object != OBJID_WINDOW or id_child != CHILDID_SELF or not hwnd:
+                return
+            # Destroyed windows no longer have an ancestor to check
+            if event != EVENT_OBJECT_DESTROY and user32.GetAncestor(hwnd, GA_ROOT) != hwnd:
+                return
+            callback(WindowEvent(EVENT_KINDS[event], hwnd))
+
+        proc = WinEventProc(on_event)  # Keep a reference for the hook's lifetime
+        hooks = [
+            user32.SetWinEventHook(EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE, None, proc, 0, 0,
+                                   WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS),
+            user32.SetWinEventHook(EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE, None, proc, 0, 0,
+                                   WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS),
+        ]
+        self.thread_id = kernel32.GetCurrentThreadId()
+        self.ready.set()
+
+        msg = MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        if self.thread_id is not None:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+            self.thread_id = None
+
+
+class EventCoalescer:
+    """
+    Folds bursts of WindowEvents into one net change set.
+
+    Each hwnd ends up either removed or dirty (created or changed, needing
+    its details looked up again); a window created and destroyed inside
+    the same burst disappears entirely. `flush()` hands out the batch once
+    no event has arrived for `debounce` seconds, or once the burst has
+    lasted `max_delay` seconds so a steady stream can't starve the UI.
+    """
+
+    def __init__(self, debounce=0.05, max_delay=0.25):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.created = set()
+        self.dirty = set()
+        self.removed = set()
+        self.first_event = None
+        self.last_event = None
+        self.events = 0
+
+    def push(self, event):
+        now = time.monotonic()
+        hwnd = event.hwnd
+        with self.lock:
+            self.events += 1
+            if self.first_event is None:
+                self.first_event = now
+            self.last_event = now
+            if event.kind == 'destroy':
+                self.dirty.discard(hwnd)
+                if hwnd in self.created:
+                    self.created.discard(hwnd)
+                else:
+                    self.removed.add(hwnd)
+            elif event.kind == 'create':
+                if hwnd in self.removed:
+                    # A reused hwnd: the old window goes, the new one is looked up
+                    self.removed.discard(hwnd)
+                else:
+                    self.created.add(hwnd)
+                self.dirty.add(hwnd)
+            elif hwnd not in self.removed:
+                self.dirty.add(hwnd)
+
+    def flush(self, force=False):
+        """
+        Return (removed, dirty) hwnd sets if a batch is due, else None.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if self.first_event is None:
+                return None
+            quiet = now - self.last_event >= self.debounce
+            overdue = now - self.first_event >= self.max_delay
+            if not (force or quiet or overdue):
+                return None
+            batch = (self.removed, self.dirty)
+            self.created = set()
+            self.dirty = set()
+            self.removed = set()
+            self.first_event = None
+            self.last_event = None
+        return batch
+
+
+def apply_changes(rows, removed, resolved):
+    """
+    Apply a coalesced batch to an ordered list of treediff Rows.
+
+    `removed` holds iids to drop and `resolved` maps each dirty iid to its
+    fresh Row, or None if the window no longer belongs in the list.
+    Existing rows are updated in place and new ones appended.
+    """
+    result = []
+    for row in rows:
+        if row.iid in removed:
+            continue
+        if row.iid in resolved:
+            row = resolved[row.iid]
+            if row is None:
+                continue
+        result.append(row)
+    present = {row.iid for row in rows}
+    result.extend(row for iid, row in resolved.items() if row is not None and iid not in present)
+    return result
+
+
+def _benchmark(rates=(1000, 10000, 50000), seconds=1.0, windows=500, poll_ms=50):
+    import random
+    from treediff import Row
+    for rate in rates:
+        rng = random.Random(rate)
+        source = ScriptedEventSource()
+        coalescer = EventCoalescer()
+        source.start(coalescer.push)
+        live = set(range(1, windows + 1))  # What the desktop really has
+        rows = [Row(str(hwnd), (f'Window {hwnd}',), None) for hwnd in sorted(live)]
+        done = threading.Event()
+        pushed = [0, 0.0]  # events, seconds spent pushing
+
+        def produce():
+            next_hwnd = windows + 1
+            count = int(rate * seconds)
+            started = time.perf_counter()
+            for i in range(count):
+                roll = rng.random()
+                if roll < 0.15:
+                    hwnd, kind = next_hwnd, 'create'
+                    next_hwnd += 1
+                    live.add(hwnd)
+                elif roll < 0.3 and live:
+                    hwnd, kind = rng.choice(tuple(live)), 'destroy'
+                    live.discard(hwnd)
+                else:
+                    hwnd, kind = rng.randrange(1, next_hwnd), rng.choice(('name', 'show', 'hide'))
+                began = time.perf_counter()
+                source.emit(kind, hwnd)
+                pushed[1] += time.perf_counter() - began
+                pushed[0] += 1
+                if i % 100 == 0:
+                    # Keep to the target rate
+                    ahead = started + i / rate - time.perf_counter()
+                    if ahead > 0:
+                        time.sleep(ahead)
+            done.set()
+
+        producer = threading.Thread(target=produce)
+        started = time.perf_counter()
+        producer.start()
+        applies = []
+        updates = 0
+        while True:
+            finished = done.is_set()
+            batch = coalescer.flush(force=finished)
+            if batch:
+                began = time.perf_counter()
+                removed, dirty = batch
+                # Stands in for looking each dirty window up again
+                resolved = {str(hwnd): Row(str(hwnd), (f'Window {hwnd}',), None) if hwnd in live else None
+                            for hwnd in dirty}
+                rows = apply_changes(rows, {str(hwnd) for hwnd in removed}, resolved)
+                applies.append(time.perf_counter() - began)
+                updates += len(removed) + len(dirty)
+            if finished:
+                break
+            time.sleep(poll_ms / 1000)
+        producer.join()
+        elapsed = time.perf_counter() - started
+        assert {int(row.iid) for row in rows} == live, 'list out of step with the desktop'
+        applies.sort()
+        print(f'{pushed[0] / elapsed:.0f} events/s for {elapsed:.1f} s: {len(applies)} batches, '
+              f'{pushed[0] / max(1, updates):.1f} events per row update, '
+              f'push {pushed[1] / pushed[0] * 1e6:.2f} us/event, '
+              f'apply p50 {applies[len(applies) // 2] * 1000:.2f} ms, max {applies[-1] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,241 @@
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from ctypes import byref, memset, sizeof
+from ctypes import c_int, c_void_p, POINTER
+from ctypes.wintypes import *
+from enum import Enum
+from functools import lru_cache
+from typing import Optional
+import ctypes
+import threading
+
+from profiler import profiler
+
+BI_RGB = 0
+DIB_RGB_COLORS = 0
+
+
+class ICONINFO(ctypes.Structure):
+    _fields_ = [
+        ("fIcon", BOOL),
+        ("xHotspot", DWORD),
+        ("yHotspot", DWORD),
+        ("hbmMask", HBITMAP),
+        ("hbmColor", HBITMAP)
+    ]
+
+
+class RGBQUAD(ctypes.Structure):
+    _fields_ = [
+        ("rgbBlue", BYTE),
+        ("rgbGreen", BYTE),
+        ("rgbRed", BYTE),
+        ("rgbReserved", BYTE),
+    ]
+
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", DWORD),
+        ("biWidth", LONG),
+        ("biHeight", LONG),
+        ("biPlanes", WORD),
+        ("biBitCount", WORD),
+        ("biCompression", DWORD),
+        ("biSizeImage", DWORD),
+        ("biXPelsPerMeter", LONG),
+        ("biYPelsPerMeter", LONG),
+        ("biClrUsed", DWORD),
+        ("biClrImportant", DWORD)
+    ]
+
+
+class BITMAPINFO(ctypes.Structure):
+    _fields_ = [
+        ("bmiHeader", BITMAPINFOHEADER),
+        ("bmiColors", RGBQUAD * 1),
+    ]
+
+
+@lru_cache(maxsize=None)
+def icon_api():
+    """
+    Load shell32/user32/gdi32 and declare the functions used for icon
+    extraction. Done on first use rather than at import to keep startup fast.
+    """
+    shell32 = ctypes.WinDLL("shell32", use_last_error=True)
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    gdi32 = ctypes.WinDLL("gdi32", use_last_error=True)
+
+    gdi32.CreateCompatibleDC.argtypes = [HDC]
+    gdi32.CreateCompatibleDC.restype = HDC
+    gdi32.DeleteDC.argtypes = [HDC]
+    gdi32.DeleteDC.restype = BOOL
+    gdi32.GetDIBits.argtypes = [
+        HDC, HBITMAP, UINT, UINT, LPVOID, c_void_p, UINT
+    ]
+    gdi32.GetDIBits.restype = c_int
+    gdi32.DeleteObject.argtypes = [HGDIOBJ]
+    gdi32.DeleteObject.restype = BOOL
+    shell32.ExtractIconExW.argtypes = [
+        LPCWSTR, c_int, POINTER(HICON), POINTER(HICON), UINT
+    ]
+    shell32.ExtractIconExW.restype = UINT
+    user32.GetIconInfo.argtypes = [HICON, POINTER(ICONINFO)]
+    user32.GetIconInfo.restype = BOOL
+    user32.DestroyIcon.argtypes = [HICON]
+    user32.DestroyIcon.restype = BOOL
+    return shell32, user32, gdi32
+
+
+class IconSize(Enum):
+    SMALL = 1
+    LARGE = 2
+
+    @classmethod
+    def to_wh(cls, size: "IconSize") -> tuple[int, int]:
+        """
+        Return the actual (width, height) values for the specified icon size.
+        """
+        size_table = {
+            cls.SMALL: (16, 16),
+            cls.LARGE: (32, 32)
+        }
+        return size_table[size]
+
+
+# Live GDI/USER handles opened by icon extraction, by kind. Every handle
+# is released by the context that opened it, so outside an extraction
+# these should all be back at zero.
+live_handles = Counter()
+_handles_lock = threading.Lock()  # Icons are extracted on several threads
+
+
+@contextmanager
+def _handle(kind, handle, release):
+    with _handles_lock:
+        live_handles[kind] += 1
+    try:
+        yield handle
+    finally:
+        release(handle)
+        with _handles_lock:
+            live_handles[kind] -= 1
+
+
+class IconExtraction:
+    """
+    Extracts any number of icons with one memory DC and one preallocated
+    BITMAPINFO and pixel buffer per icon size, all released when the
+    context closes:
+
+        with IconExtraction() as extraction:
+            for path in paths:
+                bits = extraction.extract(path, IconSize.SMALL)
+    """
+
+    def __init__(self):
+        self.shell32, self.user32, self.gdi32 = icon_api()
+        self.stack = ExitStack()
+        self.dc = None
+        self.buffers = {}  # (w, h) -> (BITMAPINFO, color buffer, mask buffer)
+
+    def __enter__(self):
+        gdi32 = self.gdi32
+        dc: HDC = gdi32.CreateCompatibleDC(0)
+        if dc == 0:
+            raise ctypes.WinError()
+        self.dc = self.stack.enter_context(_handle('dc', dc, gdi32.DeleteDC))
+        return self
+
+    def __exit__(self, *exc):
+        self.stack.close()
+        self.dc = None
+
+    def _buffers(self, w, h):
+        buffers = self.buffers.get((w, h))
+        if buffers is None:
+            bmi: BITMAPINFO = BITMAPINFO()
+            memset(byref(bmi), 0, sizeof(bmi))
+            buffers = (bmi, ctypes.create_string_buffer(w * h * 4), ctypes.create_string_buffer(w * h * 4))
+            self.buffers[(w, h)] = buffers
+        return buffers
+
+    def _get_bits(self, bitmap, w, h, bmi, bits):
+        header = bmi.bmiHeader
+        # GetDIBits may write back into the header, so fill it in every time
+        memset(byref(bmi), 0, sizeof(bmi))
+        header.biSize = sizeof(BITMAPINFOHEADER)
+        header.biWidth = w
+        header.biHeight = -h
+        header.biPlanes = 1
+        header.biBitCount = 32
+        header.biCompression = BI_RGB
+        header.biSizeImage = w * h * 4
+        return self.gdi32.GetDIBits(self.dc, bitmap, 0, h, bits, byref(bmi), DIB_RGB_COLORS) != 0
+
+    def extract(self, filename: str, size: IconSize) -> Optional[tuple[bytes, Optional[bytes]]]:
+        """
+        Extract the icon from the specified `filename`, which might be
+        either an executable or an `.ico` file. Returns the BGRA color bits
+        and the AND mask bits (None if the icon has no mask), or None if
+        the file has no icon.
+        """
+        shell32, user32, gdi32 = self.shell32, self.user32, self.gdi32
+        hicon: HICON = HICON()
+        extracted_icons: UINT = shell32.ExtractIconExW(
+            filename,
+            0,
+            byref(hicon) if size == IconSize.LARGE else None,
+            byref(hicon) if size == IconSize.SMALL else None,
+            1
+        )
+        if extracted_icons != 1:
+            print(f"Error extracting icon from {filename}, returned {extracted_icons} icons instead of one.")
+            return None
+
+        with ExitStack() as handles:
+            handles.enter_context(_handle('icon', hicon, user32.DestroyIcon))
+            icon_info: ICONINFO = ICONINFO(0, 0, 0, 0, 0)
+            if not user32.GetIconInfo(hicon, byref(icon_info)):
+                raise ctypes.WinError()
+            # GetIconInfo hands us copies of both bitmaps to delete
+            for bitmap in (icon_info.hbmColor, icon_info.hbmMask):
+                if bitmap:
+                    handles.enter_context(_handle('bitmap', bitmap, gdi32.DeleteObject))
+
+            w, h = IconSize.to_wh(size)
+            bmi, bits, mask_bits = self._buffers(w, h)
+            if not self._get_bits(icon_info.hbmColor, w, h, bmi, bits):
+                raise RuntimeError(f"Error copying bitmap bits from icon in {filename}.")
+            # The AND mask, read at 32 bpp: set bits come back white
+            has_mask = bool(icon_info.hbmMask) and self._get_bits(icon_info.hbmMask, w, h, bmi, mask_bits)
+            # The buffers are reused for the next icon, so hand out copies
+            return bits.raw, mask_bits.raw if has_mask else None
+
+
+def extract_icon(filename: str, size: IconSize) -> Optional[tuple[bytes, Optional[bytes]]]:
+    """
+    Extract a single icon; see `IconExtraction.extract()`. Prefer an
+    `IconExtraction` when extracting several.
+    """
+    with IconExtraction() as extraction:
+        return extraction.extract(filename, size)
+
+
+def extract_dibs(paths):
+    """
+    Extract the small icons of `paths` as raw 16x16 (BGRA, AND mask)
+    bytes, None for a path without one, sharing one DC and set of buffers.
+    Decoding is left to `icondecode`, which does the whole batch at once.
+    """
+    dibs = []
+    with IconExtraction() as extraction:
+        for path in paths:
+            with profiler.stage('icon_bits', exe=path):
+                try:
+                    dibs.append(extraction.extract(path, IconSize.SMALL))
+                except (OSError, RuntimeError) as e:
+                    print(f"Error extracting icon from {path}: {e}")
+                    dibs.append(None)
+    return dibs
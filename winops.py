@@ -0,0 +1,265 @@
+from backend import WS_CAPTION, WS_EX_TOOLWINDOW, WS_THICKFRAME, get_backend
+from journal import SavedWindow
+from monitors import MonitorTopology
+from profiler import profiler
+from tracing import trace
+
+# Window style bits removed to make a window borderless
+BORDER_STYLE = WS_CAPTION | WS_THICKFRAME
+# The desktop and taskbar; the foreground window when nothing else is
+SHELL_CLASSES = {'Progman', 'WorkerW', 'Shell_TrayWnd', 'Shell_SecondaryTrayWnd'}
+
+
+def get_open_windows():
+    """
+    Return (hwnd, title) for every visible top-level window.
+    """
+    with profiler.stage('enum_windows'):
+        return get_backend().enum_windows()
+
+
+def get_window_list():
+    """
+    Return a WindowList of the visible, titled, uncloaked top-level
+    windows with their pid and class, gathered in one pass.
+    """
+    with profiler.stage('enum_windows'):
+        return get_backend().list_windows()
+
+
+def get_process_id(hwnd):
+    return get_backend().get_pid(hwnd)
+
+
+def get_window_text(hwnd):
+    return get_backend().get_title(hwnd)
+
+
+def get_class_name(hwnd):
+    return get_backend().get_class(hwnd)
+
+
+def window_exists(hwnd):
+    return get_backend().is_window(hwnd)
+
+
+def is_live_window(hwnd):
+    # Still exists and is shown
+    backend = get_backend()
+    return backend.is_window(hwnd) and backend.is_visible(hwnd)
+
+
+def is_listable_window(hwnd):
+    # Not a tool window or cloaked, the windows get_window_list() leaves out
+    backend = get_backend()
+    return not backend.get_exstyle(hwnd) & WS_EX_TOOLWINDOW and not backend.is_cloaked(hwnd)
+
+
+monitor_topology = None
+
+
+def get_monitor_topology():
+    # Built on first use; display-change notifications invalidate it
+    global monitor_topology
+    if monitor_topology is None:
+        monitor_topology = MonitorTopology(lambda: get_backend().monitors())
+        get_backend().watch_display_changes(monitor_topology.invalidate)
+    return monitor_topology
+
+
+def fullscreen_rect(hwnd, monitor=None):
+    """
+    Return the (x, y, width, height) of monitor `monitor`, or of the
+    monitor the window is currently on.
+    """
+    if monitor is not None:
+        return get_monitor_topology().get(monitor).rect
+    return _monitor_rect(get_backend().get_window_rect(hwnd), None)
+
+
+def _monitor_rect(window_rect, monitor):
+    topology = get_monitor_topology()
+    if monitor is not None:
+        return topology.get(monitor).rect
+    return topology.monitor_for_rect(window_rect).rect
+
+
+def is_borderless(hwnd):
+    return not get_backend().get_style(hwnd) & WS_CAPTION
+
+
+journal = None
+
+
+def set_journal(style_journal):
+    """
+    Record original styles and rects in `style_journal` before changing
+    windows, and restore from it.
+    """
+    global journal
+    journal = style_journal
+
+
+def _remember(backend, hwnd, style, rect):
+    # Save the window's original look before BorderX first changes it
+    if journal is None:
+        return
+    pid = backend.get_pid(hwnd)
+    saved = journal.get(hwnd)
+    if saved is not None and saved.pid == pid:
+        return  # Already borderless; keep the original, not the fullscreen look
+    journal.record(SavedWindow(hwnd, pid, backend.process_started(pid),
+                               style, backend.get_exstyle(hwnd), tuple(rect)))
+
+
+def _saved(hwnd):
+    return journal.get(hwnd) if journal is not None else None
+
+
+def make_borderless(hwnd, rect):
+    backend = get_backend()
+    with profiler.stage('make_borderless'), trace.mark('make_borderless', hwnd, rect):
+        style = backend.get_style(hwnd)
+        _remember(backend, hwnd, style, backend.get_window_rect(hwnd))
+        style &= ~BORDER_STYLE
+        backend.set_style(hwnd, style)
+        backend.set_position(hwnd, *rect)
+
+
+def restore_borders(hwnd, rect):
+    """
+    Put back the style and rect the window had before it was made
+    borderless. Without a saved copy the border bits are added back and
+    the window is sized to `rect`.
+    """
+    backend = get_backend()
+    with profiler.stage('restore_borders'), trace.mark('restore_borders', hwnd, rect):
+        saved = _saved(hwnd)
+        if saved is not None:
+            backend.set_style(hwnd, saved.style)
+            backend.set_exstyle(hwnd, saved.exstyle)
+            backend.set_position(hwnd, *saved.rect)
+            journal.forget(hwnd)
+            return
+        style = backend.get_style(hwnd)
+        style |= BORDER_STYLE
+        backend.set_style(hwnd, style)
+        backend.set_position(hwnd, *rect)
+
+
+def toggle_foreground(monitor=None):
+    """
+    Toggle borderless fullscreen on the foreground window, straight from
+    its hwnd: no window list, process snapshot or icons. Returns
+    (hwnd, borderless) or None when there is nothing to toggle.
+    """
+    backend = get_backend()
+    with profiler.stage('toggle_foreground'):
+        hwnd = backend.get_foreground()
+        if not hwnd or backend.get_class(hwnd) in SHELL_CLASSES:
+            return None
+        saved = _saved(hwnd)
+        if saved is not None and not _is_same_window(backend, saved):
+            journal.forget(hwnd)  # The hwnd now belongs to another window
+            saved = None
+        if saved is not None:
+            restore_borders(hwnd, None)  # Goes back to the saved rect
+            return hwnd, False
+        if journal is None and is_borderless(hwnd):
+            restore_borders(hwnd, fullscreen_rect(hwnd))
+            return hwnd, False
+        make_borderless(hwnd, fullscreen_rect(hwnd, monitor))
+        return hwnd, True
+
+
+def _set_many(hwnds, borderless, monitor=None):
+    # Work out every style and rect change first, then commit all the
+    # moves in one deferred batch
+    backend = get_backend()
+    moves = []
+    restored = []
+    for hwnd in hwnds:
+        style = backend.get_style(hwnd)
+        current = backend.get_window_rect(hwnd)
+        if borderless:
+            rect = _monitor_rect(current, monitor)
+            if not style & BORDER_STYLE and tuple(current) == tuple(rect):
+                continue  # Already in the target state
+            _remember(backend, hwnd, style, current)
+            backend.set_style(hwnd, style & ~BORDER_STYLE)
+        else:
+            saved = _saved(hwnd)
+            if saved is not None:
+                backend.set_style(hwnd, saved.style)
+                backend.set_exstyle(hwnd, saved.exstyle)
+                rect = saved.rect
+                restored.append(hwnd)
+            elif style & BORDER_STYLE == BORDER_STYLE:
+                continue  # Already in the target state
+            else:
+                backend.set_style(hwnd, style | BORDER_STYLE)
+                rect = _monitor_rect(current, None)
+        moves.append((hwnd,) + tuple(rect))
+    if moves:
+        with profiler.stage('set_positions'):
+            backend.set_positions(moves)
+    for hwnd in restored:
+        journal.forget(hwnd)
+    return [move[0] for move in moves]
+
+
+def apply_many(hwnds, monitor=None):
+    """
+    Make every window in `hwnds` borderless fullscreen on its own monitor
+    (or on `monitor`), repositioning them all at once. Returns the hwnds
+    that changed.
+    """
+    with trace.mark('apply_many', hwnds, monitor):
+        return _set_many(hwnds, True, monitor)
+
+
+def restore_many(hwnds):
+    """
+    Restore borders on every window in `hwnds` in one batch. Returns the
+    hwnds that changed.
+    """
+    with trace.mark('restore_many', hwnds):
+        return _set_many(hwnds, False)
+
+
+def _same_start(a, b):
+    # Start times are floats from FILETIME ticks; allow for rounding
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) < 1e-3
+
+
+def _is_same_window(backend, saved):
+    # The journal entry still describes the window behind its hwnd
+    if not backend.is_window(saved.hwnd):
+        return False
+    pid = backend.get_pid(saved.hwnd)
+    if pid != saved.pid:
+        return False
+    # The same source _remember() saved, not describe_process(): psutil
+    # converts the FILETIME differently and the floats don't compare equal
+    return _same_start(backend.process_started(pid), saved.create_time)
+
+
+def reconcile_journal():
+    """
+    Drop journal entries for windows that no longer exist (or whose hwnd
+    now belongs to another process) and return the ones still live.
+    """
+    if journal is None:
+        return []
+    backend = get_backend()
+    return journal.reconcile(lambda saved: _is_same_window(backend, saved))
+
+
+def restore_all():
+    """
+    Restore every window in the journal in one pass. Returns the hwnds
+    that changed.
+    """
+    return restore_many([saved.hwnd for saved in reconcile_journal()])